@@ -242,12 +242,15 @@ async function getAllArticles(databaseId: string): Promise<NotionPage[]> {
 
 function getSlugFromArticle(article: NotionPage): string {
   const title = getTitleFromArticle(article);
-  return title
+  // Same algorithm as create_slug in bot/web_publisher.py: slugs in public/data/news
+  // and posts/*.html must resolve to the same article
+  const slug = title
+    .replace(/<[^>]+>/g, "")
     .toLowerCase()
-    .replace(/[^\w\s-]/g, "")
+    .replace(/[^\p{L}\p{N}_\s-]/gu, "")
     .replace(/[-\s]+/g, "-")
-    .trim()
-    .substring(0, 80);
+    .replace(/^-+|-+$/g, "");
+  return Array.from(slug).slice(0, 80).join("").replace(/-+$/, "");
 }
 
 function getTitleFromArticle(article: NotionPage): string {
@@ -0,0 +1,61 @@
+"""
+Модуль для запуска блокирующих функций (requests, SQLite, SDK) из async кода.
+Использует общий пул потоков с ограниченным числом воркеров, чтобы
+event loop не блокировался, а независимые этапы могли выполняться параллельно.
+"""
+import os
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Максимальное количество одновременно выполняемых блокирующих операций
+BLOCKING_IO_WORKERS = int(os.getenv("BLOCKING_IO_WORKERS", "8"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Возвращает общий пул потоков (создается при первом обращении).
+
+    Returns:
+        ThreadPoolExecutor с BLOCKING_IO_WORKERS воркерами
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=BLOCKING_IO_WORKERS, thread_name_prefix="blocking-io")
+    return _executor
+
+
+async def run_blocking(func: Callable, *args, **kwargs) -> Any:
+    """
+    Выполняет блокирующую функцию в общем пуле потоков и ждет результат.
+
+    Args:
+        func: Блокирующая функция
+        *args: Позиционные аргументы функции
+        **kwargs: Именованные аргументы функции
+
+    Returns:
+        Результат функции (исключения пробрасываются как есть)
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_executor(wait: bool = True):
+    """
+    Останавливает общий пул потоков.
+
+    Args:
+        wait: Ждать завершения выполняющихся задач
+    """
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=wait)
+        _executor = None
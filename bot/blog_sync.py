@@ -7,13 +7,15 @@ import re
 import json
 import subprocess
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 from html import escape, unescape
 from dotenv import load_dotenv
 import requests
 import hashlib
 
+from notion_fetcher import fetch_page, fetch_block_children, fetch_block_tree, fetch_concurrently
+
 load_dotenv()
 
 NOTION_API_KEY = os.getenv("NOTION_API_KEY")
@@ -58,40 +60,15 @@ def fetch_blog_pages() -> List[Dict]:
         print("   Формат: UUID (например, 2f05f382-1e21-8e99-cdef-21e05a7a624)")
         return []
     
-    headers = {
-        "Authorization": f"Bearer {NOTION_API_KEY}",
-        "Content-Type": "application/json",
-        "Notion-Version": "2022-06-28"
-    }
-    
-    # Получаем дочерние страницы родительской страницы блога
-    all_pages = []
-    start_cursor = None
-    
-    while True:
-        url = f"{NOTION_API_URL}/blocks/{NOTION_BLOG_PAGE_ID}/children"
-        if start_cursor:
-            url += f"?start_cursor={start_cursor}"
-        
-        try:
-            response = requests.get(url, headers=headers, timeout=30)
-            response.raise_for_status()
-            data = response.json()
-            
-            # Фильтруем только страницы (type == "child_page")
-            pages = [block for block in data.get("results", []) if block.get("type") == "child_page"]
-            all_pages.extend(pages)
-            
-            if not data.get("has_more"):
-                break
-            
-            start_cursor = data.get("next_cursor")
-            
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Ошибка получения страниц блога из Notion: {e}")
-            if hasattr(e, 'response') and e.response is not None:
-                print(f"   Response: {e.response.text}")
-            break
+    # Получаем дочерние страницы родительской страницы блога (только type == "child_page")
+    try:
+        blocks = fetch_block_children(NOTION_BLOG_PAGE_ID)
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Ошибка получения страниц блога из Notion: {e}")
+        if hasattr(e, 'response') and e.response is not None:
+            print(f"   Response: {e.response.text}")
+        return []
+    all_pages = [block for block in blocks if block.get("type") == "child_page"]
     
     print(f"✅ Получено {len(all_pages)} страниц блога из Notion")
     return all_pages
@@ -106,20 +83,8 @@ def fetch_page_details(page_id: str) -> Optional[Dict]:
     Returns:
         Словарь с данными страницы или None
     """
-    headers = {
-        "Authorization": f"Bearer {NOTION_API_KEY}",
-        "Content-Type": "application/json",
-        "Notion-Version": "2022-06-28"
-    }
-    
     try:
-        response = requests.get(
-            f"{NOTION_API_URL}/pages/{page_id}",
-            headers=headers,
-            timeout=30
-        )
-        response.raise_for_status()
-        return response.json()
+        return fetch_page(page_id)
     except requests.exceptions.RequestException as e:
         print(f"❌ Ошибка получения деталей страницы {page_id}: {e}")
         return None
@@ -157,39 +122,23 @@ def create_slug(title: str) -> str:
         slug = slug[:80].rstrip('-')
     return slug
 
-def fetch_page_blocks(page_id: str) -> List[Dict]:
-    """Получает все блоки страницы из Notion."""
-    headers = {
-        "Authorization": f"Bearer {NOTION_API_KEY}",
-        "Content-Type": "application/json",
-        "Notion-Version": "2022-06-28"
-    }
-    
-    all_blocks = []
-    start_cursor = None
-    
-    while True:
-        url = f"{NOTION_API_URL}/blocks/{page_id}/children"
-        if start_cursor:
-            url += f"?start_cursor={start_cursor}"
-        
-        try:
-            response = requests.get(url, headers=headers, timeout=30)
-            response.raise_for_status()
-            data = response.json()
-            
-            all_blocks.extend(data.get("results", []))
-            
-            if not data.get("has_more"):
-                break
-            
-            start_cursor = data.get("next_cursor")
-            
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Ошибка получения блоков страницы {page_id}: {e}")
-            break
-    
-    return all_blocks
+def fetch_page_blocks(page_id: str, last_edited_time: Optional[str] = None) -> List[Dict]:
+    """
+    Получает все блоки страницы из Notion (с вложенными блоками, кэш по last_edited_time).
+    Вызывается из потоков fetch_concurrently, поэтому уровни дерева загружаются последовательно.
+    """
+    try:
+        return fetch_block_tree(page_id, last_edited_time, workers=1)
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Ошибка получения блоков страницы {page_id}: {e}")
+        return []
+
+def fetch_page_content(page_id: str) -> Tuple[Optional[Dict], List[Dict]]:
+    """Загружает детали и блоки страницы (для параллельной загрузки)."""
+    page_details = fetch_page_details(page_id)
+    if not page_details:
+        return None, []
+    return page_details, fetch_page_blocks(page_id, page_details.get("last_edited_time"))
 
 def download_and_save_image(image_url: str, repo_path: Path, slug: str, image_index: int = 0) -> Optional[str]:
     """
@@ -247,116 +196,135 @@ def download_and_save_image(image_url: str, repo_path: Path, slug: str, image_in
         # В случае ошибки возвращаем оригинальный URL (может работать временно)
         return image_url
 
+def get_text(rich_text_array: List[Dict]) -> str:
+    """Конвертирует rich_text массив Notion в HTML (форматирование и ссылки)."""
+    if not rich_text_array:
+        return ""
+    text_parts = []
+    for rt in rich_text_array:
+        text = rt.get("plain_text", "")
+        annotations = rt.get("annotations", {})
+        
+        # Применяем форматирование
+        if annotations.get("bold"):
+            text = f"<strong>{text}</strong>"
+        if annotations.get("italic"):
+            text = f"<em>{text}</em>"
+        if annotations.get("code"):
+            text = f"<code>{text}</code>"
+        
+        # Ссылки
+        if rt.get("href"):
+            text = f'<a href="{rt["href"]}">{text}</a>'
+        
+        text_parts.append(text)
+    return "".join(text_parts)
+
 def convert_blocks_to_html(blocks: List[Dict], repo_path: Optional[Path] = None, slug: Optional[str] = None) -> str:
     """
     Конвертирует Notion blocks в HTML.
+    Вложенные блоки (поле children) рендерятся рекурсивно: вложенные списки,
+    toggle, колонки, содержимое цитат.
     
     Args:
         blocks: Список блоков из Notion
         repo_path: Путь к репозиторию (для сохранения изображений)
         slug: Slug статьи (для имен файлов изображений)
     """
-    html_parts = []
     image_index = 0
-    
-    for block in blocks:
-        block_type = block.get("type")
-        if not block_type:
-            continue
-        
-        block_data = block.get(block_type, {})
-        
-        # Получаем текст из rich_text
-        def get_text(rich_text_array):
-            if not rich_text_array:
-                return ""
-            text_parts = []
-            for rt in rich_text_array:
-                text = rt.get("plain_text", "")
-                annotations = rt.get("annotations", {})
-                
-                # Применяем форматирование
-                if annotations.get("bold"):
-                    text = f"<strong>{text}</strong>"
-                if annotations.get("italic"):
-                    text = f"<em>{text}</em>"
-                if annotations.get("code"):
-                    text = f"<code>{text}</code>"
-                
-                # Ссылки
-                if rt.get("href"):
-                    text = f'<a href="{rt["href"]}">{text}</a>'
-                
-                text_parts.append(text)
-            return "".join(text_parts)
-        
-        if block_type == "paragraph":
-            text = get_text(block_data.get("rich_text", []))
-            if text:
-                html_parts.append(f"<p>{text}</p>")
-        
-        elif block_type == "heading_1":
-            text = get_text(block_data.get("rich_text", []))
-            if text:
-                html_parts.append(f"<h1>{text}</h1>")
-        
-        elif block_type == "heading_2":
-            text = get_text(block_data.get("rich_text", []))
-            if text:
-                html_parts.append(f"<h2>{text}</h2>")
-        
-        elif block_type == "heading_3":
-            text = get_text(block_data.get("rich_text", []))
-            if text:
-                html_parts.append(f"<h3>{text}</h3>")
-        
-        elif block_type == "bulleted_list_item":
-            text = get_text(block_data.get("rich_text", []))
-            if text:
-                html_parts.append(f"<li>{text}</li>")
-        
-        elif block_type == "numbered_list_item":
-            text = get_text(block_data.get("rich_text", []))
-            if text:
-                html_parts.append(f"<li>{text}</li>")
-        
-        elif block_type == "quote":
-            text = get_text(block_data.get("rich_text", []))
-            if text:
-                html_parts.append(f"<blockquote>{text}</blockquote>")
-        
-        elif block_type == "code":
-            text = get_text(block_data.get("rich_text", []))
-            language = block_data.get("language", "")
-            if text:
-                html_parts.append(f'<pre><code class="language-{language}">{escape(text)}</code></pre>')
-        
-        elif block_type == "divider":
-            html_parts.append("<hr />")
-        
-        elif block_type == "image":
-            image_data = block_data.get("file") or block_data.get("external")
-            if image_data:
-                image_url = image_data.get("url", "")
-                caption = get_text(block_data.get("caption", []))
-                
-                # Скачиваем и сохраняем изображение локально
-                if repo_path and slug:
-                    saved_url = download_and_save_image(image_url, repo_path, slug, image_index)
-                    if saved_url:
-                        image_url = saved_url
-                        image_index += 1
-                
-                html_parts.append(f'<img src="{image_url}" alt="{escape(caption)}" />')
-                if caption:
-                    html_parts.append(f"<p><em>{caption}</em></p>")
-    
-    # Обертываем списки
-    html = "".join(html_parts)
-    html = re.sub(r'(<li>.*?</li>)', r'<ul>\1</ul>', html, flags=re.DOTALL)
-    html = re.sub(r'</ul>\s*<ul>', '', html)  # Убираем дублирующиеся <ul>
-    
-    return html
+    list_tags = {"bulleted_list_item": "ul", "numbered_list_item": "ol"}
+    
+    def render(blocks: List[Dict]) -> str:
+        nonlocal image_index
+        html_parts = []
+        # Открытый список (ul/ol): соседние элементы списка объединяются в один
+        list_tag = None
+        
+        for block in blocks:
+            block_type = block.get("type")
+            if not block_type:
+                continue
+            
+            block_list_tag = list_tags.get(block_type)
+            if list_tag and block_list_tag != list_tag:
+                html_parts.append(f"</{list_tag}>")
+                list_tag = None
+            if block_list_tag and not list_tag:
+                html_parts.append(f"<{block_list_tag}>")
+                list_tag = block_list_tag
+            
+            block_data = block.get(block_type, {})
+            children_html = render(block.get("children", []))
+            
+            if block_type == "paragraph":
+                text = get_text(block_data.get("rich_text", []))
+                if text:
+                    html_parts.append(f"<p>{text}</p>")
+                html_parts.append(children_html)
+            
+            elif block_type in ("heading_1", "heading_2", "heading_3"):
+                text = get_text(block_data.get("rich_text", []))
+                tag = f"h{block_type[-1]}"
+                if text:
+                    html_parts.append(f"<{tag}>{text}</{tag}>")
+                # Раскрывающийся заголовок: содержимое выводится под ним
+                html_parts.append(children_html)
+            
+            elif block_type in list_tags:
+                text = get_text(block_data.get("rich_text", []))
+                if text or children_html:
+                    html_parts.append(f"<li>{text}{children_html}</li>")
+            
+            elif block_type == "toggle":
+                text = get_text(block_data.get("rich_text", []))
+                html_parts.append(f"<details><summary>{text}</summary>{children_html}</details>")
+            
+            elif block_type == "quote":
+                text = get_text(block_data.get("rich_text", []))
+                if text or children_html:
+                    html_parts.append(f"<blockquote>{text}{children_html}</blockquote>")
+            
+            elif block_type == "column_list":
+                html_parts.append(f'<div class="columns">{children_html}</div>')
+            
+            elif block_type == "column":
+                html_parts.append(f'<div class="column">{children_html}</div>')
+            
+            elif block_type == "synced_block":
+                html_parts.append(children_html)
+            
+            elif block_type == "code":
+                text = get_text(block_data.get("rich_text", []))
+                language = block_data.get("language", "")
+                if text:
+                    html_parts.append(f'<pre><code class="language-{language}">{escape(text)}</code></pre>')
+            
+            elif block_type == "divider":
+                html_parts.append("<hr />")
+            
+            elif block_type == "image":
+                image_data = block_data.get("file") or block_data.get("external")
+                if image_data:
+                    image_url = image_data.get("url", "")
+                    caption = get_text(block_data.get("caption", []))
+                    
+                    # Скачиваем и сохраняем изображение локально
+                    if repo_path and slug:
+                        saved_url = download_and_save_image(image_url, repo_path, slug, image_index)
+                        if saved_url:
+                            image_url = saved_url
+                            image_index += 1
+                    
+                    html_parts.append(f'<img src="{image_url}" alt="{escape(caption)}" />')
+                    if caption:
+                        html_parts.append(f"<p><em>{caption}</em></p>")
+        
+        if list_tag:
+            html_parts.append(f"</{list_tag}>")
+        
+        return "".join(html_parts)
+    
+    return render(blocks)
 
 def generate_blog_html(article: Dict, repo_path: Path) -> Optional[str]:
     """Генерирует HTML файл для статьи блога."""
@@ -521,15 +489,14 @@ def sync_blog():
     
     articles = []
     
-    for page in blog_pages:
-        page_id = page.get("id")
-        if not page_id:
-            continue
-        
+    # Детали и блоки всех страниц загружаются параллельно (с лимитом частоты Notion API)
+    page_ids = [page.get("id") for page in blog_pages if page.get("id")]
+    print(f"📥 Загрузка {len(page_ids)} страниц блога...")
+    contents = fetch_concurrently(fetch_page_content, page_ids)
+    
+    for page_id, (page_details, blocks) in zip(page_ids, contents):
         print(f"\n📄 Обработка страницы: {page_id[:8]}...")
         
-        # Получаем детали страницы
-        page_details = fetch_page_details(page_id)
         if not page_details:
             continue
         
@@ -537,8 +504,7 @@ def sync_blog():
         title = extract_page_title(page_details)
         slug = create_slug(title)
         
-        # Получаем контент
-        blocks = fetch_page_blocks(page_id)
+        # Конвертируем контент
         html_content = convert_blocks_to_html(blocks, repo_path, slug)
         
         # Получаем дату публикации
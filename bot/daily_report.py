@@ -12,8 +12,9 @@ from dotenv import load_dotenv
 from telegram import Bot
 from telegram.error import TelegramError
 
-from market_data_collector import collect_coal_market_data
+from market_snapshot import get_market_data, invalidate_snapshot
 from daily_report_generator import create_daily_market_report
+from async_io import run_blocking
 from typing import Optional
 
 
@@ -146,9 +147,14 @@ async def send_message_via_bot_api(text: str, chat_id: str, media_path: Optional
         return False
 
 
-async def publish_daily_report():
+async def publish_daily_report(force_refresh: bool = False):
     """
     Собирает данные по угольному рынку и публикует ежедневную сводку.
+    Повторный запуск в тот же день (после сбоя Telegram или вручную) использует
+    снимок рыночных данных и не повторяет поисковые запросы.
+    
+    Args:
+        force_refresh: Собрать рыночные данные заново, игнорируя снимок
     """
     # Проверка конфигурации
     if not TG_BOT_TOKEN:
@@ -183,7 +189,7 @@ async def publish_daily_report():
     try:
         # Собираем данные по рынку
         print("🔍 Собираю данные по угольному рынку...")
-        market_data = collect_coal_market_data()
+        market_data = await run_blocking(get_market_data, force_refresh)
         
         if not market_data.get("benchmarks") and not market_data.get("spreads"):
             print("⚠️  Данные по рынку не найдены")
@@ -194,7 +200,7 @@ async def publish_daily_report():
         
         # Генерируем отчет
         print("📝 Генерирую ежедневную сводку...")
-        report_text = create_daily_market_report(market_data)
+        report_text = await run_blocking(create_daily_market_report, market_data)
         print(f"✅ Отчет создан ({len(report_text)} символов)")
         
         # Публикуем в Telegram БЕЗ изображения (бенчмарки публикуются без картинок)
@@ -218,11 +224,16 @@ async def publish_daily_report():
 if __name__ == "__main__":
     import sys
     
+    # --refresh-market-data: инвалидировать снимок и собрать данные заново
+    force_refresh = "--refresh-market-data" in sys.argv
+    if force_refresh:
+        invalidate_snapshot()
+    
     # Проверяем флаг --once
     if "--once" in sys.argv:
         print("🚀 Запуск публикации ежедневной сводки")
-        asyncio.run(publish_daily_report())
+        asyncio.run(publish_daily_report(force_refresh))
     else:
         # По умолчанию запускаем один раз
-        asyncio.run(publish_daily_report())
+        asyncio.run(publish_daily_report(force_refresh))
 
@@ -4,12 +4,15 @@
 Использует OpenRouter API для доступа к Claude (как в post_generator.py).
 """
 import os
-import time
-import requests
 from datetime import datetime
 from typing import Dict
 from dotenv import load_dotenv
 
+from model_router import route_completion
+from market_timeseries import apply_local_changes
+from market_data_collector import compute_spreads
+from market_analytics import get_market_analytics_text
+
 # Загружаем переменные окружения
 load_dotenv()
 
@@ -32,38 +35,35 @@ def create_daily_market_report(market_data: Dict, max_retries: int = 3) -> str:
     if not api_key:
         raise ValueError("ANTHROPIC_API_KEY not set in environment")
     
-    # Используем OpenRouter API для доступа к Claude (как в post_generator.py)
-    url = "https://openrouter.ai/api/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    
-    # Используем правильное имя модели для OpenRouter
-    model = os.getenv("ANTHROPIC_MODEL", "anthropic/claude-3.5-haiku")
-    if not model.startswith("anthropic/"):
-        model = f"anthropic/{model}"
-    
     today = datetime.now()
     date_str = today.strftime("%B %d, %Y")
     week_num = market_data.get("week", today.isocalendar()[1])
     
-    # Формируем данные для промпта
+    # Изменения (день к дню, неделя к неделе) считаются по локальной истории цен, а не моделью
+    apply_local_changes(market_data)
     benchmarks = market_data.get("benchmarks", [])
-    spreads = market_data.get("spreads", [])
+    spreads = compute_spreads(benchmarks)
     summary = market_data.get("summary", "")
+    # Скользящие средние, волатильность и z-оценки по истории - готовыми цифрами
+    analytics_text = get_market_analytics_text(market_data.get("date"))
+    
+    def format_change(change, change_pct) -> str:
+        if change is None:
+            return "n/a"
+        return f"{change:+.2f}, {change_pct:+.1f}%" if change_pct is not None else f"{change:+.2f}"
     
     # Форматируем бенчмарки в более читаемом виде с выравниванием
     benchmarks_text = "\n".join([
         f"{b.get('name', ''):<15} {b.get('value') or 'N/A':>7} USD/t "
-        f"({'+' if (b.get('change') or 0) >= 0 else ''}{b.get('change') or 0:.2f}, "
-        f"{'+' if (b.get('change_pct') or 0) >= 0 else ''}{b.get('change_pct') or 0:.1f}%)"
+        f"(d/d: {format_change(b.get('change'), b.get('change_pct'))}; "
+        f"w/w: {format_change(b.get('change_1w'), b.get('change_pct_1w'))})"
         for b in benchmarks
     ])
     
     # Форматируем спреды
     spreads_text = "\n".join([
-        f"{s.get('name', ''):<30} {s.get('value') or 'N/A':>7} USD/t"
+        f"{s.get('name', ''):<30} {s.get('value') if s.get('value') is not None else 'N/A':>7} USD/t"
+        f" (d/d: {format_change(s.get('change'), None)})"
         for s in spreads
     ])
     
@@ -123,6 +123,9 @@ Benchmarks:
 Spreads:
 {spreads_text if spreads_text else "No spread data available"}
 
+Price analytics (computed from stored prices: MA = moving average, vol30 = 30-day volatility of daily changes, z30 = deviation from the 30-day mean in standard deviations):
+{analytics_text if analytics_text else "No price history yet"}
+
 Market Summary Context:
 {summary if summary else "No summary provided"}
 
@@ -130,6 +133,8 @@ IMPORTANT:
 - Be EXTREMELY CONCISE - every word counts
 - Focus on KEY numbers and facts
 - If change is 0.0%, write "stable" or "unchanged" instead of showing 0.0%
+- Day-over-day (d/d) and week-over-week (w/w) changes are precomputed from stored prices - use them as given, do not recalculate; "n/a" means no history, omit the change
+- Use the price analytics for trend statements (e.g. above/below the 30-day average, unusual moves with |z30| >= 2)
 - Market Summary: 2-3 SHORT sentences with specific facts
 - Outlook: 1-2 sentences maximum
 - NO general statements like "markets remain stable" without specific context
@@ -137,65 +142,17 @@ IMPORTANT:
 
 Create a professional daily update following the structure above."""
     
-    backoff = 1
-    last_error = None
+    # Используем OpenRouter API для доступа к Claude (как в post_generator.py)
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
     
-    for attempt in range(max_retries):
-        try:
-            payload = {
-                "model": model,
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": system_prompt
-                    },
-                    {
-                        "role": "user",
-                        "content": user_prompt
-                    }
-                ],
-                "max_tokens": 2000,
-                "temperature": 0.7
-            }
-            
-            response = requests.post(url, headers=headers, json=payload, timeout=60)
-            
-            if response.status_code != 200:
-                error_text = response.text[:500] if response.text else "No error details"
-                print(f"   ⚠️  Ошибка API: {response.status_code} - {error_text}")
-            
-            response.raise_for_status()
-            data = response.json()
-            
-            if 'choices' in data and len(data['choices']) > 0:
-                result = data['choices'][0]['message']['content'].strip()
-            else:
-                result = str(data)
-            
-            return result
-            
-        except requests.exceptions.HTTPError as e:
-            last_error = e
-            if attempt == 0:
-                try:
-                    error_data = e.response.json() if e.response else {}
-                    print(f"   ⚠️  Детали ошибки: {error_data}")
-                except:
-                    print(f"   ⚠️  Ответ сервера: {e.response.text[:300] if e.response else 'N/A'}")
-            if attempt < max_retries - 1:
-                wait_time = backoff * (2 ** attempt)
-                print(f"Ошибка создания отчета (попытка {attempt + 1}/{max_retries}): {e}. Ожидание {wait_time} секунд...")
-                time.sleep(wait_time)
-            else:
-                raise Exception(f"Не удалось создать отчет после {max_retries} попыток: {last_error}") from last_error
-        except Exception as e:
-            last_error = e
-            if attempt < max_retries - 1:
-                wait_time = backoff * (2 ** attempt)
-                print(f"Ошибка создания отчета (попытка {attempt + 1}/{max_retries}): {e}. Ожидание {wait_time} секунд...")
-                time.sleep(wait_time)
-            else:
-                raise Exception(f"Не удалось создать отчет после {max_retries} попыток: {last_error}") from last_error
+    try:
+        # Модель (ANTHROPIC_MODEL) и резерв выбирает маршрутизатор
+        response = route_completion("daily_report", messages, max_tokens=2000, temperature=0.7,
+                                    timeout=60, max_retries=max_retries, cache_system=True)
+    except Exception as e:
+        raise Exception(f"Не удалось создать отчет после {max_retries} попыток: {e}") from e
     
-    raise Exception(f"Не удалось создать отчет: {last_error}")
-
+    return response["text"] or str(response["raw"])
@@ -0,0 +1,329 @@
+"""
+Модуль негативного кэша доменов (domain health).
+Запоминает домены, которые отдают 403, пэйволл или таймауты, и держит их
+в карантине на время cooldown, чтобы не тратить 10-15 секунд на заведомо
+неудачные запросы при каждом запуске.
+Также кэширует развернутые URL редиректоров (vertexaisearch от Gemini), чтобы
+не повторять HEAD запрос для уже виденной ссылки.
+"""
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Tuple
+from urllib.parse import urlparse
+
+from published_news_db import get_connection
+
+
+# Классы ошибок и базовое время карантина для каждого
+ERROR_COOLDOWNS = {
+    "blocked": timedelta(hours=24),       # 403, 451 - сайт блокирует ботов
+    "paywall": timedelta(days=7),         # 401, 402, платный контент
+    "rate_limited": timedelta(hours=1),   # 429
+    "timeout": timedelta(hours=1),        # таймаут запроса
+    "connection": timedelta(hours=2),     # ошибка подключения/DNS
+    "not_found": timedelta(0),            # 404 - проблема конкретной статьи, не домена
+    "error": timedelta(minutes=30),       # прочие ошибки
+}
+
+# Максимальный множитель для повторных ошибок (cooldown * 2^(n-1), но не больше)
+MAX_COOLDOWN_MULTIPLIER = 8
+
+# Домены-редиректоры: их здоровье не говорит ничего об источнике новости
+IGNORED_DOMAINS = {"vertexaisearch.cloud.google.com"}
+
+# Время жизни развернутого URL редиректора
+REDIRECT_CACHE_TTL = timedelta(days=7)
+
+# Штраф к score в select_best_news за каждую недавнюю ошибку домена
+FAILURE_PENALTY = 20
+MAX_FAILURE_PENALTY = 100
+
+
+def init_domain_health():
+    """Создает таблицу domain_health если её нет."""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS domain_health (
+            domain TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            error_class TEXT,
+            error_message TEXT,
+            failure_count INTEGER DEFAULT 0,
+            success_count INTEGER DEFAULT 0,
+            last_checked TIMESTAMP,
+            cooldown_until TIMESTAMP
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS redirect_cache (
+            url TEXT PRIMARY KEY,
+            resolved_url TEXT NOT NULL,
+            resolved_at TIMESTAMP
+        )
+    """)
+
+    conn.commit()
+    conn.close()
+
+
+def get_resolved_redirect(url: str) -> Optional[str]:
+    """
+    Возвращает сохраненный URL источника для ссылки-редиректора.
+
+    Args:
+        url: URL редиректора
+
+    Returns:
+        URL источника или None, если ссылка не разворачивалась или запись устарела
+    """
+    if not url:
+        return None
+
+    init_domain_health()
+    conn = get_connection()
+    cursor = conn.cursor()
+    cutoff = (datetime.now() - REDIRECT_CACHE_TTL).isoformat()
+    cursor.execute("SELECT resolved_url FROM redirect_cache WHERE url = ? AND resolved_at >= ?", (url, cutoff))
+    row = cursor.fetchone()
+    conn.close()
+    return row["resolved_url"] if row else None
+
+
+def save_resolved_redirect(url: str, resolved_url: str):
+    """
+    Сохраняет URL источника для ссылки-редиректора.
+
+    Args:
+        url: URL редиректора
+        resolved_url: Финальный URL после редиректов
+    """
+    if not url or not resolved_url or resolved_url == url:
+        return
+
+    init_domain_health()
+    conn = get_connection()
+    try:
+        conn.execute("INSERT OR REPLACE INTO redirect_cache (url, resolved_url, resolved_at) VALUES (?, ?, ?)",
+                     (url, resolved_url, datetime.now().isoformat()))
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"⚠️  Ошибка сохранения redirect cache: {e}")
+    finally:
+        conn.close()
+
+
+def get_domain(url: str) -> str:
+    """
+    Извлекает нормализованный домен из URL (без www. и порта).
+    Для доменов-редиректоров возвращает пустую строку (они не кэшируются).
+
+    Args:
+        url: URL или домен
+
+    Returns:
+        Домен в нижнем регистре или пустая строка
+    """
+    if not url:
+        return ""
+
+    netloc = urlparse(url).netloc if "://" in url else url
+    domain = netloc.lower().split(":")[0]
+    if domain.startswith("www."):
+        domain = domain[4:]
+    if domain in IGNORED_DOMAINS:
+        return ""
+    return domain
+
+
+def is_redirector(url: str) -> bool:
+    """
+    Проверяет, что URL ведет на домен-редиректор (его нужно развернуть до проверки карантина).
+
+    Args:
+        url: URL или домен
+
+    Returns:
+        True для доменов из IGNORED_DOMAINS
+    """
+    if not url:
+        return False
+    netloc = urlparse(url).netloc if "://" in url else url
+    domain = netloc.lower().split(":")[0]
+    return domain.removeprefix("www.") in IGNORED_DOMAINS
+
+
+def classify_http_status(status_code: int) -> Optional[str]:
+    """
+    Определяет класс ошибки по HTTP статусу.
+
+    Args:
+        status_code: HTTP статус ответа
+
+    Returns:
+        Класс ошибки или None для успешных ответов
+    """
+    if status_code in (403, 451):
+        return "blocked"
+    if status_code in (401, 402):
+        return "paywall"
+    if status_code == 429:
+        return "rate_limited"
+    if status_code == 404:
+        return "not_found"
+    if status_code >= 400:
+        return "error"
+    return None
+
+
+def get_domain_health(url: str) -> Optional[Dict]:
+    """
+    Возвращает запись о здоровье домена.
+
+    Args:
+        url: URL новости или домен
+
+    Returns:
+        Словарь с полями status, error_class, failure_count, cooldown_until и т.д. или None
+    """
+    domain = get_domain(url)
+    if not domain:
+        return None
+
+    init_domain_health()
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM domain_health WHERE domain = ?", (domain,))
+    row = cursor.fetchone()
+    conn.close()
+
+    return dict(row) if row else None
+
+
+def is_domain_blocked(url: str) -> Tuple[bool, str]:
+    """
+    Проверяет, находится ли домен в карантине (cooldown еще не истек).
+
+    Args:
+        url: URL новости
+
+    Returns:
+        Кортеж (is_blocked, reason)
+    """
+    health = get_domain_health(url)
+    if not health or not health.get("cooldown_until"):
+        return False, ""
+
+    try:
+        cooldown_until = datetime.fromisoformat(health["cooldown_until"])
+    except (TypeError, ValueError):
+        return False, ""
+
+    if cooldown_until > datetime.now():
+        reason = f"Домен {get_domain(url)} в карантине ({health.get('error_class')}) до {cooldown_until.strftime('%Y-%m-%d %H:%M')}"
+        return True, reason
+
+    return False, ""
+
+
+def get_domain_penalty(url: str) -> int:
+    """
+    Возвращает штраф к приоритету новости за историю ошибок домена.
+
+    Args:
+        url: URL новости
+
+    Returns:
+        Неотрицательный штраф (0 для здоровых и неизвестных доменов)
+    """
+    health = get_domain_health(url)
+    if not health or health.get("status") == "ok":
+        return 0
+
+    return min(health.get("failure_count", 0) * FAILURE_PENALTY, MAX_FAILURE_PENALTY)
+
+
+def record_domain_success(url: str):
+    """
+    Отмечает успешный запрос к домену и снимает карантин.
+
+    Args:
+        url: URL, к которому был успешный запрос
+    """
+    domain = get_domain(url)
+    if not domain:
+        return
+
+    init_domain_health()
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("""
+            INSERT INTO domain_health (domain, status, failure_count, success_count, last_checked, cooldown_until)
+            VALUES (?, 'ok', 0, 1, ?, NULL)
+            ON CONFLICT(domain) DO UPDATE SET
+                status = 'ok',
+                error_class = NULL,
+                error_message = NULL,
+                failure_count = 0,
+                success_count = success_count + 1,
+                last_checked = excluded.last_checked,
+                cooldown_until = NULL
+        """, (domain, datetime.now().isoformat()))
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"⚠️  Ошибка сохранения domain health: {e}")
+    finally:
+        conn.close()
+
+
+def record_domain_failure(url: str, error_class: str, error_message: str = ""):
+    """
+    Отмечает неудачный запрос к домену и выставляет cooldown.
+    Повторные ошибки удваивают время карантина (до MAX_COOLDOWN_MULTIPLIER).
+
+    Args:
+        url: URL, к которому был запрос
+        error_class: Класс ошибки (blocked, paywall, rate_limited, timeout, connection, not_found, error)
+        error_message: Текст ошибки для диагностики
+    """
+    domain = get_domain(url)
+    if not domain:
+        return
+
+    # 404 относится к конкретной статье, домен не штрафуем
+    base_cooldown = ERROR_COOLDOWNS.get(error_class, ERROR_COOLDOWNS["error"])
+    if not base_cooldown:
+        return
+
+    health = get_domain_health(url)
+    failure_count = (health.get("failure_count", 0) if health else 0) + 1
+    multiplier = min(2 ** (failure_count - 1), MAX_COOLDOWN_MULTIPLIER)
+    now = datetime.now()
+    cooldown_until = now + base_cooldown * multiplier
+
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("""
+            INSERT INTO domain_health
+            (domain, status, error_class, error_message, failure_count, success_count, last_checked, cooldown_until)
+            VALUES (?, 'failing', ?, ?, ?, 0, ?, ?)
+            ON CONFLICT(domain) DO UPDATE SET
+                status = 'failing',
+                error_class = excluded.error_class,
+                error_message = excluded.error_message,
+                failure_count = excluded.failure_count,
+                last_checked = excluded.last_checked,
+                cooldown_until = excluded.cooldown_until
+        """, (domain, error_class, error_message[:200], failure_count, now.isoformat(), cooldown_until.isoformat()))
+        conn.commit()
+        print(f"   🚫 Домен {domain} в карантине ({error_class}) до {cooldown_until.strftime('%Y-%m-%d %H:%M')}")
+    except sqlite3.Error as e:
+        print(f"⚠️  Ошибка сохранения domain health: {e}")
+    finally:
+        conn.close()
@@ -8,6 +8,8 @@ from typing import Optional
 from urllib.parse import urljoin, urlparse
 from bs4 import BeautifulSoup
 
+from domain_health import is_domain_blocked, record_domain_success, record_domain_failure, classify_http_status
+
 
 def extract_image_from_url(url: str, timeout: int = 15) -> Optional[str]:
     """
@@ -20,6 +22,9 @@ def extract_image_from_url(url: str, timeout: int = 15) -> Optional[str]:
     3. Первое большое изображение из статьи (в основном контенте)
     4. НЕ используем favicon (слишком общий)
     
+    Домены из негативного кэша пропускаются без запроса, ошибки 403/таймауты
+    записываются в кэш.
+    
     Args:
         url: URL новостной статьи
         timeout: Таймаут запроса в секундах
@@ -59,8 +64,17 @@ def extract_image_from_url(url: str, timeout: int = 15) -> Optional[str]:
                 print(f"   ⚠️  Не удалось развернуть редирект: {e}")
                 # Продолжаем с оригинальным URL
         
+        blocked, reason = is_domain_blocked(url)
+        if blocked:
+            print(f"   ⏭️  {reason}, пропускаю извлечение изображения")
+            return None
+        
         response = requests.get(url, headers=headers, timeout=timeout, allow_redirects=True)
+        error_class = classify_http_status(response.status_code)
+        if error_class:
+            record_domain_failure(response.url or url, error_class, f"HTTP {response.status_code}")
         response.raise_for_status()
+        record_domain_success(response.url or url)
         
         # Проверяем финальный URL (после редиректов)
         final_url = response.url
@@ -250,6 +264,14 @@ def extract_image_from_url(url: str, timeout: int = 15) -> Optional[str]:
         
         return None
         
+    except requests.exceptions.Timeout as e:
+        record_domain_failure(url, "timeout", str(e))
+        print(f"⚠️  Таймаут при запросе {url}: {e}")
+        return None
+    except requests.exceptions.ConnectionError as e:
+        record_domain_failure(url, "connection", str(e))
+        print(f"⚠️  Ошибка подключения к {url}: {e}")
+        return None
     except requests.exceptions.RequestException as e:
         print(f"⚠️  Ошибка при запросе {url}: {e}")
         return None
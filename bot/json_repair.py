@@ -0,0 +1,227 @@
+"""
+Локальное восстановление и валидация JSON ответов LLM.
+Исправляет типичные структурные ошибки (markdown блоки, текст вокруг JSON,
+незакрытые скобки и строки, неэкранированные кавычки, висячие запятые) и
+подгоняет Telegram версию под лимит caption, чтобы не повторять платный вызов целиком.
+Поле, оборванное лимитом max_tokens, помечается как обрезанное: валидатор версий
+поста отправляет его на перегенерацию, а не принимает восстановленный обрывок.
+"""
+import re
+import json
+from typing import Dict, List, Optional
+
+# Лимит caption в Telegram (с HTML тегами)
+TELEGRAM_CAPTION_LIMIT = 1024
+
+# Символы, после которых кавычка действительно закрывает строку JSON
+_STRING_TERMINATORS = ",:}]"
+
+# Индекс первого восстановления в repair_json, закрывающего оборванный JSON
+CLOSING_REPAIRS_START = 3
+
+# Служебный ключ восстановленного ответа со списком полей, оборванных в конце ответа
+TRUNCATED_FIELDS_KEY = "_truncated_fields"
+
+
+def extract_json_text(text: str) -> str:
+    """
+    Вырезает JSON объект из ответа модели: убирает markdown блоки и текст до/после объекта.
+
+    Args:
+        text: Ответ модели
+
+    Returns:
+        Текст от первой '{' до парной '}' (или до конца, если объект не закрыт)
+    """
+    text = text.strip()
+    text = re.sub(r"^```(?:json)?\s*", "", text)
+    text = re.sub(r"\s*```\s*$", "", text)
+
+    start = text.find("{")
+    if start < 0:
+        return text
+
+    depth = 0
+    in_string = False
+    escape = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return text[start:]
+
+
+def _escape_inner_quotes(text: str) -> str:
+    """Экранирует кавычки внутри строк, за которыми не следует конец значения или ключа."""
+    result = []
+    in_string = False
+    escape = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                rest = text[i + 1:].lstrip()
+                if rest and rest[0] not in _STRING_TERMINATORS:
+                    result.append('\\"')
+                    continue
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        result.append(ch)
+    return "".join(result)
+
+
+def _close_unbalanced(text: str) -> str:
+    """Закрывает незакрытую строку и скобки в конце обрезанного JSON."""
+    stack = []
+    in_string = False
+    escape = False
+    for ch in text:
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]" and stack:
+            stack.pop()
+
+    if in_string:
+        if escape:
+            text = text[:-1]
+        text += '"'
+    text = re.sub(r",\s*$", "", text)
+    return text + "".join(reversed(stack))
+
+
+def repair_json(text: str, mark_truncated: bool = False) -> Optional[Dict]:
+    """
+    Парсит JSON объект из ответа модели, при необходимости восстанавливая структуру.
+
+    Args:
+        text: Ответ модели
+        mark_truncated: Если ответ оборван (незакрытые строка или скобки), записать
+            последнее поле верхнего уровня в список TRUNCATED_FIELDS_KEY
+
+    Returns:
+        Распарсенный словарь или None, если восстановить не удалось
+    """
+    candidate = extract_json_text(text)
+    repairs = [
+        lambda t: t,
+        lambda t: re.sub(r",\s*([}\]])", r"\1", t),
+        _escape_inner_quotes,
+        # Начиная с CLOSING_REPAIRS_START восстановления закрывают оборванный конец ответа
+        _close_unbalanced,
+        lambda t: _close_unbalanced(_escape_inner_quotes(t)),
+    ]
+
+    for index, repair in enumerate(repairs):
+        try:
+            repaired = repair(candidate)
+            repaired = re.sub(r",\s*([}\]])", r"\1", repaired)
+            data = json.loads(repaired, strict=False)
+        except (json.JSONDecodeError, ValueError):
+            continue
+        if isinstance(data, dict):
+            if index > 0:
+                print(f"🔧 JSON ответа восстановлен локально")
+            # Закрытие скобок помогло - ответ оборван, последнее поле неполное
+            if mark_truncated and index >= CLOSING_REPAIRS_START and data:
+                data[TRUNCATED_FIELDS_KEY] = [list(data)[-1]]
+            return data
+    return None
+
+
+def fit_telegram_caption(text: str, limit: int = TELEGRAM_CAPTION_LIMIT) -> str:
+    """
+    Подгоняет Telegram пост под лимит caption, сохраняя ссылку на источник в конце.
+    Обрезает по границе предложения/строки и убирает оборванные HTML теги.
+
+    Args:
+        text: Текст поста (Telegram HTML)
+        limit: Максимальная длина
+
+    Returns:
+        Текст не длиннее limit
+    """
+    if len(text) <= limit:
+        return text
+
+    source_link = ""
+    link_pos = text.rfind("<a href")
+    if link_pos >= 0 and text.rstrip().endswith("</a>") and len(text) - link_pos < limit // 3:
+        source_link = text[link_pos:].strip()
+        text = text[:link_pos].rstrip()
+
+    available = limit - (len(source_link) + 2 if source_link else 0) - 3
+    body = text[:available]
+    cut_point = max(body.rfind(". "), body.rfind("\n"), body.rfind(".\n"))
+    if cut_point > available * 0.6:
+        body = body[:cut_point + 1].rstrip()
+    else:
+        body = body.rstrip() + "..."
+
+    # Убираем оборванный тег и закрываем открытые <b>/<i>/<code>
+    body = re.sub(r"<[^>]*$", "", body)
+    for tag in ("b", "i", "code"):
+        opened = len(re.findall(rf"<{tag}>", body)) - len(re.findall(rf"</{tag}>", body))
+        body += f"</{tag}>" * max(opened, 0)
+
+    result = f"{body}\n\n{source_link}" if source_link else body
+    return result[:limit]
+
+
+def validate_post_versions(versions: Dict, fields: tuple = ("tg_version", "web_version"),
+                           min_web_length: int = 300) -> List[str]:
+    """
+    Проверяет версии поста и исправляет локально то, что можно исправить.
+    Telegram версия длиннее лимита обрезается на месте. Поля, оборванные лимитом
+    токенов (TRUNCATED_FIELDS_KEY из repair_json), невалидны при любой длине.
+
+    Args:
+        versions: Словарь версий (изменяется на месте)
+        fields: Обязательные поля
+        min_web_length: Минимальная длина Web версии
+
+    Returns:
+        Список полей, которые нужно перегенерировать (пустой, если все валидно)
+    """
+    failing = []
+    truncated = versions.pop(TRUNCATED_FIELDS_KEY, None) or []
+    for field in fields:
+        value = versions.get(field)
+        if field in truncated:
+            print(f"   ✂️  Поле {field} оборвано лимитом токенов, требуется перегенерация")
+            failing.append(field)
+            continue
+        if not isinstance(value, str) or not value.strip():
+            failing.append(field)
+            continue
+        if field == "tg_version" and len(value) > TELEGRAM_CAPTION_LIMIT:
+            print(f"   ✂️  Telegram версия длиннее лимита ({len(value)} символов), обрезаю локально")
+            versions[field] = fit_telegram_caption(value)
+        elif field == "web_version" and len(value) < min_web_length:
+            failing.append(field)
+    return failing
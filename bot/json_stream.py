@@ -0,0 +1,101 @@
+"""
+Инкрементальный парсер JSON ответа LLM, получаемого потоком (SSE).
+Отдает строковые поля верхнего уровня объекта, как только они полностью
+получены, не дожидаясь конца ответа (например, tg_version до web_version).
+"""
+import json
+from typing import Dict, Optional
+
+
+class IncrementalJSONParser:
+    """
+    Парсер строковых полей верхнего уровня JSON объекта из растущего текста.
+    Текст до первой '{' (markdown блок ```json, пояснения модели) пропускается.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Сбрасывает состояние (например, при повторе запроса с начала)."""
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._started = False
+        self._finished = False
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._after_colon = False
+        self._key: Optional[str] = None
+        self.fields: Dict[str, str] = {}
+
+    def feed_text(self, text: str) -> Dict[str, str]:
+        """
+        Обрабатывает накопленный текст ответа (обрабатывается только новый хвост).
+        Если текст не продолжает ранее полученный (ответ начат заново), состояние сбрасывается.
+
+        Args:
+            text: Весь полученный на данный момент текст ответа
+
+        Returns:
+            Словарь полей, завершенных в этом вызове {имя: значение}
+        """
+        if not text.startswith(self._text):
+            self.reset()
+        self._text = text
+
+        completed = {}
+        while self._pos < len(text) and not self._finished:
+            ch = text[self._pos]
+
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._depth = 1
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._complete_string(text[self._string_start:self._pos], completed)
+            elif ch == '"':
+                self._in_string = True
+                self._string_start = self._pos + 1
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._finished = True
+            elif self._depth == 1:
+                if ch == ":":
+                    self._after_colon = True
+                elif ch == ",":
+                    self._after_colon = False
+                    self._key = None
+
+            self._pos += 1
+
+        return completed
+
+    def _complete_string(self, raw: str, completed: Dict[str, str]):
+        """Обрабатывает завершенную строку верхнего уровня (ключ или значение)."""
+        try:
+            # strict=False: модели иногда оставляют в строках неэкранированные переводы строк
+            value = json.loads(f'"{raw}"', strict=False)
+        except json.JSONDecodeError:
+            value = raw
+
+        if not self._after_colon:
+            self._key = value
+            return
+
+        if self._key is not None:
+            self.fields[self._key] = value
+            completed[self._key] = value
+        self._key = None
+        self._after_colon = False
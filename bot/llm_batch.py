@@ -0,0 +1,303 @@
+"""
+Пакетная генерация для несрочного контента (месячный прогноз, пост о фрахте).
+Запросы ставятся в очередь в SQLite и отправляются одним пакетом через Message
+Batches API Anthropic (половина цены токенов) или выполняются локальным пакетным
+исполнителем. Результаты сохраняются и забираются следующим запуском.
+"""
+import os
+import json
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from published_news_db import get_connection
+from llm_client import (_get_anthropic_client, _record_call, estimate_cost,
+                        BATCH_PRICE_MULTIPLIER, LLMError)
+from model_router import route_completion
+
+load_dotenv()
+
+# Режим пакетной генерации: off - интерактивные вызовы, anthropic - Message Batches API,
+# local - локальный пакетный исполнитель (очередь выполняется параллельно через маршрутизатор)
+LLM_BATCH_MODE = os.getenv("LLM_BATCH_MODE", "off").lower()
+# Модель Anthropic для пакетных запросов
+LLM_BATCH_MODEL = os.getenv("LLM_BATCH_MODEL", "claude-3-5-sonnet-20241022")
+# Количество параллельных запросов локального исполнителя
+LLM_BATCH_WORKERS = int(os.getenv("LLM_BATCH_WORKERS", "2"))
+
+# Статусы заданий: queued → submitted → done/failed → collected
+PENDING_STATUSES = ("queued", "submitted", "done")
+
+
+def is_batch_enabled() -> bool:
+    """Включен ли пакетный режим."""
+    return LLM_BATCH_MODE in ("anthropic", "local")
+
+
+def init_batch_db():
+    """Создает таблицу llm_batch_jobs если её нет."""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS llm_batch_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_key TEXT UNIQUE NOT NULL,
+            task TEXT NOT NULL,
+            model TEXT,
+            request TEXT NOT NULL,
+            metadata TEXT,
+            status TEXT NOT NULL DEFAULT 'queued',
+            batch_id TEXT,
+            result_text TEXT,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_llm_batch_jobs_status ON llm_batch_jobs(task, status)
+    """)
+
+    conn.commit()
+    conn.close()
+
+
+def _row_to_job(row: sqlite3.Row) -> Dict:
+    """Преобразует строку БД в словарь задания (JSON поля распарсены)."""
+    job = dict(row)
+    job["request"] = json.loads(job["request"])
+    job["metadata"] = json.loads(job["metadata"]) if job["metadata"] else {}
+    return job
+
+
+def _update_job(job_id: int, **fields):
+    """Обновляет поля задания."""
+    fields["updated_at"] = datetime.now().isoformat()
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    conn = get_connection()
+    conn.execute(f"UPDATE llm_batch_jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+    conn.commit()
+    conn.close()
+
+
+def enqueue_job(job_key: str, task: str, messages: List[Dict], max_tokens: int = 4000,
+                temperature: float = 0.7, metadata: Optional[Dict] = None,
+                model: str = LLM_BATCH_MODEL) -> bool:
+    """
+    Ставит запрос в очередь пакетной генерации.
+
+    Args:
+        job_key: Уникальный ключ задания (например, 'monthly_forecast:2026-10')
+        task: Тип задачи (ключ TASK_TIERS маршрутизатора)
+        messages: Сообщения в формате [{'role': ..., 'content': ...}]
+        max_tokens: Максимум токенов ответа
+        temperature: Температура
+        metadata: Данные, нужные для обработки результата (например, тема поста)
+        model: Модель Anthropic для Message Batches API
+
+    Returns:
+        True если задание добавлено, False если задание с таким ключом уже есть
+    """
+    init_batch_db()
+    request = {"messages": messages, "max_tokens": max_tokens, "temperature": temperature}
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT OR IGNORE INTO llm_batch_jobs (job_key, task, model, request, metadata, status, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, 'queued', ?, ?)
+    """, (job_key, task, model, json.dumps(request, ensure_ascii=False),
+          json.dumps(metadata or {}, ensure_ascii=False), datetime.now().isoformat(), datetime.now().isoformat()))
+    added = cursor.rowcount > 0
+    conn.commit()
+    conn.close()
+
+    if added:
+        print(f"📥 Задание {job_key} поставлено в пакетную очередь")
+    return added
+
+
+def get_job(job_key: str) -> Optional[Dict]:
+    """
+    Возвращает задание по ключу.
+
+    Args:
+        job_key: Ключ задания
+
+    Returns:
+        Словарь задания (request и metadata распарсены) или None
+    """
+    init_batch_db()
+    conn = get_connection()
+    row = conn.execute("SELECT * FROM llm_batch_jobs WHERE job_key = ?", (job_key,)).fetchone()
+    conn.close()
+    return _row_to_job(row) if row else None
+
+
+def has_pending_job(task: str) -> bool:
+    """Есть ли по задаче задание, результат которого еще не забран."""
+    init_batch_db()
+    conn = get_connection()
+    row = conn.execute(
+        f"SELECT 1 FROM llm_batch_jobs WHERE task = ? AND status IN ({','.join('?' * len(PENDING_STATUSES))}) LIMIT 1",
+        (task, *PENDING_STATUSES)
+    ).fetchone()
+    conn.close()
+    return row is not None
+
+
+def get_ready_jobs(task: str) -> List[Dict]:
+    """
+    Возвращает готовые, но еще не забранные результаты по задаче (статус не меняется).
+
+    Args:
+        task: Тип задачи
+
+    Returns:
+        Список заданий с result_text
+    """
+    return [job for job in _get_jobs("done") if job["task"] == task]
+
+
+def take_ready_job(task: str) -> Optional[Dict]:
+    """
+    Забирает самый старый готовый результат по задаче (задание помечается collected).
+
+    Args:
+        task: Тип задачи
+
+    Returns:
+        Словарь задания с result_text или None, если готовых результатов нет
+    """
+    init_batch_db()
+    conn = get_connection()
+    row = conn.execute(
+        "SELECT * FROM llm_batch_jobs WHERE task = ? AND status = 'done' ORDER BY id LIMIT 1", (task,)
+    ).fetchone()
+    conn.close()
+    if not row:
+        return None
+
+    mark_collected(row["job_key"])
+    return _row_to_job(row)
+
+
+def mark_collected(job_key: str):
+    """Помечает результат задания как использованный."""
+    conn = get_connection()
+    conn.execute("UPDATE llm_batch_jobs SET status = 'collected', updated_at = ? WHERE job_key = ?",
+                 (datetime.now().isoformat(), job_key))
+    conn.commit()
+    conn.close()
+
+
+def _get_jobs(status: str) -> List[Dict]:
+    """Возвращает задания с указанным статусом."""
+    init_batch_db()
+    conn = get_connection()
+    rows = conn.execute("SELECT * FROM llm_batch_jobs WHERE status = ? ORDER BY id", (status,)).fetchall()
+    conn.close()
+    return [_row_to_job(row) for row in rows]
+
+
+def _submit_anthropic(jobs: List[Dict]):
+    """Отправляет задания одним пакетом в Message Batches API."""
+    requests = []
+    for job in jobs:
+        request = job["request"]
+        system = "\n\n".join(m["content"] for m in request["messages"] if m["role"] == "system")
+        params = {
+            "model": job["model"] or LLM_BATCH_MODEL,
+            "max_tokens": request["max_tokens"],
+            "temperature": request["temperature"],
+            "messages": [m for m in request["messages"] if m["role"] != "system"],
+        }
+        if system:
+            params["system"] = system
+        requests.append({"custom_id": str(job["id"]), "params": params})
+
+    batch = _get_anthropic_client().messages.batches.create(requests=requests)
+    for job in jobs:
+        _update_job(job["id"], status="submitted", batch_id=batch.id)
+    print(f"📤 Отправлен пакет {batch.id} ({len(jobs)} запросов)")
+
+
+def _poll_anthropic(jobs: List[Dict]):
+    """Проверяет отправленные пакеты и сохраняет результаты завершенных."""
+    client = _get_anthropic_client()
+    jobs_by_id = {str(job["id"]): job for job in jobs}
+
+    for batch_id in sorted({job["batch_id"] for job in jobs}):
+        batch = client.messages.batches.retrieve(batch_id)
+        if batch.processing_status != "ended":
+            print(f"⏳ Пакет {batch_id} еще обрабатывается")
+            continue
+
+        for entry in client.messages.batches.results(batch_id):
+            job = jobs_by_id.get(entry.custom_id)
+            if not job:
+                continue
+
+            if entry.result.type != "succeeded":
+                _update_job(job["id"], status="failed", error=f"batch result: {entry.result.type}")
+                _record_call("anthropic_batch", job["model"], job["task"], "error", 1, 0, {},
+                             error=entry.result.type)
+                continue
+
+            message = entry.result.message
+            text = "".join(block.text for block in message.content if getattr(block, "type", "") == "text")
+            usage = {"input_tokens": message.usage.input_tokens, "output_tokens": message.usage.output_tokens}
+            usage["cost_usd"] = estimate_cost(job["model"], usage["input_tokens"],
+                                              usage["output_tokens"]) * BATCH_PRICE_MULTIPLIER
+            _record_call("anthropic_batch", job["model"], job["task"], "ok", 1, 0, usage)
+            _update_job(job["id"], status="done", result_text=text)
+        print(f"✅ Пакет {batch_id} завершен, результаты сохранены")
+
+
+def _run_local_job(job: Dict):
+    """Выполняет задание локально через маршрутизатор моделей."""
+    request = job["request"]
+    try:
+        response = route_completion(job["task"], request["messages"], max_tokens=request["max_tokens"],
+                                    temperature=request["temperature"], timeout=180, cache_system=True)
+        _update_job(job["id"], status="done", result_text=response["text"])
+    except (LLMError, ValueError) as e:
+        _update_job(job["id"], status="failed", error=str(e)[:500])
+        print(f"⚠️  Задание {job['job_key']} не выполнено: {e}")
+
+
+def process_batch_queue() -> Dict[str, int]:
+    """
+    Отправляет задания из очереди и собирает готовые результаты.
+    Вызывается из каждого запуска бота (и из генератора прогноза).
+
+    Returns:
+        Количество заданий по статусам после обработки
+    """
+    if not is_batch_enabled():
+        return {}
+
+    try:
+        queued = _get_jobs("queued")
+        if LLM_BATCH_MODE == "anthropic":
+            if queued:
+                _submit_anthropic(queued)
+            submitted = _get_jobs("submitted")
+            if submitted:
+                _poll_anthropic(submitted)
+        elif queued:
+            print(f"⚙️  Локальная пакетная генерация: {len(queued)} заданий")
+            with ThreadPoolExecutor(max_workers=LLM_BATCH_WORKERS) as executor:
+                list(executor.map(_run_local_job, queued))
+    except Exception as e:
+        # Очередь сохраняется в БД: следующий запуск повторит отправку/опрос
+        print(f"⚠️  Ошибка обработки пакетной очереди: {e}")
+
+    conn = get_connection()
+    rows = conn.execute("SELECT status, COUNT(*) AS count FROM llm_batch_jobs GROUP BY status").fetchall()
+    conn.close()
+    return {row["status"]: row["count"] for row in rows}
@@ -0,0 +1,766 @@
+"""
+Единый клиент LLM для OpenRouter (Claude), Gemini REST и Anthropic SDK.
+Переиспользует HTTP-соединения, ограничивает число одновременных вызовов
+(глобально и на модель), отключает провайдера при серии ошибок (circuit breaker)
+и записывает задержку, токены и стоимость каждого вызова в журнал llm_calls.
+Статические системные промпты помечаются для prompt caching провайдера,
+попадания в кэш и сэкономленные средства также пишутся в журнал.
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+from published_news_db import get_connection
+
+load_dotenv()
+
+OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+GEMINI_URL_TEMPLATE = "https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
+
+# Максимальное количество одновременных вызовов LLM во всем процессе
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+# Максимальное количество одновременных вызовов одной модели
+LLM_MAX_CONCURRENCY_PER_MODEL = int(os.getenv("LLM_MAX_CONCURRENCY_PER_MODEL", "2"))
+# Количество подряд неудачных вызовов, после которого провайдер отключается
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+# Время, на которое отключается провайдер
+LLM_BREAKER_COOLDOWN_SECONDS = int(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "120"))
+# Базовая задержка между повторами (удваивается с каждой попыткой)
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "1"))
+
+# Стоимость моделей в USD за 1M токенов: (input, output)
+MODEL_PRICING = {
+    "claude-3.5-haiku": (0.80, 4.00),
+    "claude-3-5-haiku": (0.80, 4.00),
+    "claude-3.5-sonnet": (3.00, 15.00),
+    "claude-3-5-sonnet": (3.00, 15.00),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.5-flash": (0.30, 2.50),
+}
+
+# Множители цены входных токенов для prompt caching (Anthropic): чтение из кэша и запись в кэш
+CACHE_READ_PRICE_MULTIPLIER = 0.1
+CACHE_WRITE_PRICE_MULTIPLIER = 1.25
+# Множитель цены для запросов через Message Batches API (скидка 50%)
+BATCH_PRICE_MULTIPLIER = 0.5
+
+# HTTP статусы, при которых имеет смысл повторить запрос
+RETRYABLE_STATUSES = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+
+
+class LLMError(Exception):
+    """Ошибка вызова LLM после всех попыток."""
+
+
+class LLMUnavailableError(LLMError):
+    """Провайдер временно отключен circuit breaker'ом."""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker для провайдера LLM.
+    После LLM_BREAKER_FAILURES ошибок подряд провайдер отключается на
+    LLM_BREAKER_COOLDOWN_SECONDS; затем пропускается один пробный вызов.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = LLM_BREAKER_FAILURES,
+                 cooldown_seconds: int = LLM_BREAKER_COOLDOWN_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_in_flight = False
+        self._probe_thread: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Проверяет, можно ли сейчас обращаться к провайдеру."""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.cooldown_seconds:
+                return False
+            # Half-open: пропускаем только один пробный вызов
+            if self.probe_in_flight:
+                return False
+            self.probe_in_flight = True
+            self._probe_thread = threading.get_ident()
+            return True
+
+    def record_success(self):
+        """Сбрасывает счетчик ошибок и закрывает breaker."""
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probe_in_flight = False
+
+    def release_probe(self):
+        """
+        Снимает пробный вызов текущего потока без учета результата
+        (вызов завершился, не дав ни успеха, ни ошибки провайдера).
+        """
+        with self._lock:
+            if self.probe_in_flight and self._probe_thread == threading.get_ident():
+                self.probe_in_flight = False
+
+    def record_failure(self):
+        """Учитывает ошибку; при достижении порога открывает breaker."""
+        with self._lock:
+            self.failures += 1
+            self.probe_in_flight = False
+            if self.failures >= self.failure_threshold:
+                if self.opened_at is None or time.monotonic() - self.opened_at >= self.cooldown_seconds:
+                    print(f"🔌 Провайдер {self.name} отключен на {self.cooldown_seconds}с "
+                          f"после {self.failures} ошибок подряд")
+                self.opened_at = time.monotonic()
+
+    @property
+    def state(self) -> str:
+        """Текущее состояние: closed, open или half_open."""
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.cooldown_seconds:
+            return "open"
+        return "half_open"
+
+
+_sessions: Dict[str, requests.Session] = {}
+_breakers: Dict[str, CircuitBreaker] = {}
+_model_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+_global_semaphore = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+_registry_lock = threading.Lock()
+_anthropic_client = None
+
+
+def _get_session(provider: str) -> requests.Session:
+    """Возвращает HTTP сессию провайдера с пулом соединений."""
+    with _registry_lock:
+        if provider not in _sessions:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(LLM_MAX_CONCURRENCY, 4))
+            session.mount("https://", adapter)
+            session.headers.update({"Content-Type": "application/json"})
+            _sessions[provider] = session
+        return _sessions[provider]
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    """
+    Возвращает circuit breaker провайдера.
+
+    Args:
+        provider: Провайдер ('openrouter', 'gemini', 'anthropic')
+
+    Returns:
+        CircuitBreaker провайдера
+    """
+    with _registry_lock:
+        if provider not in _breakers:
+            _breakers[provider] = CircuitBreaker(provider)
+        return _breakers[provider]
+
+
+def _get_model_semaphore(model: str) -> threading.BoundedSemaphore:
+    """Возвращает семафор модели."""
+    with _registry_lock:
+        if model not in _model_semaphores:
+            _model_semaphores[model] = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY_PER_MODEL)
+        return _model_semaphores[model]
+
+
+def _get_pricing(model: str) -> Optional[tuple]:
+    """Возвращает цену модели (input, output) за 1M токенов или None."""
+    name = model.split("/")[-1].lower()
+    for key, pricing in MODEL_PRICING.items():
+        if name.startswith(key):
+            return pricing
+    return None
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int,
+                  cached_tokens: int = 0, cache_write_tokens: int = 0) -> float:
+    """
+    Оценивает стоимость вызова по таблице MODEL_PRICING.
+
+    Args:
+        model: Имя модели (с префиксом провайдера или без)
+        input_tokens: Количество входных токенов (включая прочитанные из кэша и записанные в кэш)
+        output_tokens: Количество выходных токенов
+        cached_tokens: Из них прочитано из кэша промптов
+        cache_write_tokens: Из них записано в кэш промптов
+
+    Returns:
+        Стоимость в USD (0.0 для неизвестной модели)
+    """
+    pricing = _get_pricing(model)
+    if not pricing:
+        return 0.0
+    input_price, output_price = pricing
+    uncached_tokens = max(input_tokens - cached_tokens - cache_write_tokens, 0)
+    input_cost = (uncached_tokens
+                  + cached_tokens * CACHE_READ_PRICE_MULTIPLIER
+                  + cache_write_tokens * CACHE_WRITE_PRICE_MULTIPLIER) * input_price
+    return (input_cost + output_tokens * output_price) / 1_000_000
+
+
+def estimate_cache_savings(model: str, cached_tokens: int) -> float:
+    """
+    Оценивает экономию от чтения входных токенов из кэша промптов.
+
+    Args:
+        model: Имя модели
+        cached_tokens: Количество токенов, прочитанных из кэша
+
+    Returns:
+        Экономия в USD относительно полной цены входных токенов
+    """
+    pricing = _get_pricing(model)
+    if not pricing or not cached_tokens:
+        return 0.0
+    return cached_tokens * pricing[0] * (1 - CACHE_READ_PRICE_MULTIPLIER) / 1_000_000
+
+
+def init_llm_ledger():
+    """Создает таблицу llm_calls если её нет."""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS llm_calls (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            provider TEXT NOT NULL,
+            model TEXT NOT NULL,
+            task TEXT,
+            status TEXT NOT NULL,
+            attempts INTEGER DEFAULT 1,
+            latency_ms INTEGER,
+            input_tokens INTEGER DEFAULT 0,
+            output_tokens INTEGER DEFAULT 0,
+            cached_tokens INTEGER DEFAULT 0,
+            cache_write_tokens INTEGER DEFAULT 0,
+            cache_savings_usd REAL DEFAULT 0,
+            cost_usd REAL DEFAULT 0,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Журнал, созданный до появления учета кэша, дополняем недостающими колонками
+    cursor.execute("PRAGMA table_info(llm_calls)")
+    columns = {row["name"] for row in cursor.fetchall()}
+    for column, definition in (("cached_tokens", "INTEGER DEFAULT 0"),
+                               ("cache_write_tokens", "INTEGER DEFAULT 0"),
+                               ("cache_savings_usd", "REAL DEFAULT 0")):
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE llm_calls ADD COLUMN {column} {definition}")
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_llm_calls_created ON llm_calls(created_at)
+    """)
+
+    conn.commit()
+    conn.close()
+
+
+def _record_call(provider: str, model: str, task: str, status: str, attempts: int,
+                 latency: float, usage: Dict, error: str = "") -> Optional[int]:
+    """Записывает вызов LLM в журнал (ошибки журнала не прерывают генерацию). Возвращает ID записи."""
+    try:
+        init_llm_ledger()
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO llm_calls
+            (provider, model, task, status, attempts, latency_ms, input_tokens, output_tokens,
+             cached_tokens, cache_write_tokens, cache_savings_usd, cost_usd, error, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (provider, model, task, status, attempts, int(latency * 1000),
+              usage.get("input_tokens", 0), usage.get("output_tokens", 0),
+              usage.get("cached_tokens", 0), usage.get("cache_write_tokens", 0),
+              usage.get("cache_savings_usd", 0.0), usage.get("cost_usd", 0.0),
+              error[:500], datetime.now().isoformat()))
+        conn.commit()
+        call_id = cursor.lastrowid
+        conn.close()
+        return call_id
+    except sqlite3.Error as e:
+        print(f"⚠️  Ошибка записи в журнал LLM: {e}")
+        return None
+
+
+def mark_call_invalid(call_id: Optional[int], reason: str = ""):
+    """
+    Помечает успешный вызов как невалидный (ответ не прошел проверку вызывающего кода).
+
+    Args:
+        call_id: ID записи журнала (поле call_id ответа)
+        reason: Причина
+    """
+    if not call_id:
+        return
+    try:
+        conn = get_connection()
+        conn.execute("UPDATE llm_calls SET status = 'invalid', error = ? WHERE id = ?", (reason[:500], call_id))
+        conn.commit()
+        conn.close()
+    except sqlite3.Error as e:
+        print(f"⚠️  Ошибка записи в журнал LLM: {e}")
+
+
+def get_model_stats(task: str, model: str, window: int = 50) -> Dict:
+    """
+    Возвращает статистику последних вызовов модели для задачи.
+
+    Args:
+        task: Название задачи
+        model: Модель
+        window: Сколько последних вызовов учитывать
+
+    Returns:
+        Словарь: calls, success_rate (доля 'ok'), avg_latency (сек, по успешным),
+        avg_input_tokens, avg_output_tokens
+    """
+    init_llm_ledger()
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT COUNT(*) as calls,
+               SUM(CASE WHEN status = 'ok' THEN 1 ELSE 0 END) as ok_calls,
+               AVG(CASE WHEN status = 'ok' THEN latency_ms END) as avg_latency_ms,
+               AVG(CASE WHEN status = 'ok' THEN input_tokens END) as avg_input_tokens,
+               AVG(CASE WHEN status = 'ok' THEN output_tokens END) as avg_output_tokens
+        FROM (SELECT * FROM llm_calls WHERE task = ? AND model = ? ORDER BY id DESC LIMIT ?)
+    """, (task, model, window))
+    row = dict(cursor.fetchone())
+    conn.close()
+
+    calls = row["calls"] or 0
+    return {
+        "calls": calls,
+        "success_rate": (row["ok_calls"] or 0) / calls if calls else 1.0,
+        "avg_latency": (row["avg_latency_ms"] or 0) / 1000,
+        "avg_input_tokens": row["avg_input_tokens"] or 0,
+        "avg_output_tokens": row["avg_output_tokens"] or 0,
+    }
+
+
+def get_llm_usage_stats(days: int = 1) -> List[Dict]:
+    """
+    Возвращает сводку вызовов LLM по провайдерам, моделям и задачам.
+
+    Args:
+        days: За сколько последних дней считать
+
+    Returns:
+        Список словарей: provider, model, task, calls, errors, avg_latency_ms,
+        input_tokens, output_tokens, cached_tokens, cache_hits, cache_savings_usd, cost_usd
+    """
+    init_llm_ledger()
+    conn = get_connection()
+    cursor = conn.cursor()
+    cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+    cursor.execute("""
+        SELECT provider, model, task,
+               COUNT(*) as calls,
+               SUM(CASE WHEN status != 'ok' THEN 1 ELSE 0 END) as errors,
+               CAST(AVG(latency_ms) AS INTEGER) as avg_latency_ms,
+               SUM(input_tokens) as input_tokens,
+               SUM(output_tokens) as output_tokens,
+               SUM(cached_tokens) as cached_tokens,
+               SUM(CASE WHEN cached_tokens > 0 THEN 1 ELSE 0 END) as cache_hits,
+               ROUND(SUM(cache_savings_usd), 4) as cache_savings_usd,
+               ROUND(SUM(cost_usd), 4) as cost_usd
+        FROM llm_calls
+        WHERE created_at >= ?
+        GROUP BY provider, model, task
+        ORDER BY cost_usd DESC
+    """, (cutoff,))
+    stats = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return stats
+
+
+def _retry_delay(attempt: int, response: Optional[requests.Response] = None) -> float:
+    """Задержка перед следующей попыткой (учитывает Retry-After)."""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(float(retry_after), 60.0)
+            except ValueError:
+                pass
+    return LLM_RETRY_BASE_DELAY * (2 ** attempt)
+
+
+def _request_timeout(timeout: float, deadline: Optional[float]) -> float:
+    """Таймаут запроса, урезанный до оставшегося до дедлайна времени (не меньше секунды)."""
+    if deadline is None:
+        return timeout
+    return max(min(timeout, deadline - time.monotonic()), 1.0)
+
+
+def _call_with_policy(provider: str, model: str, task: str, max_retries: int, send,
+                      deadline: Optional[float] = None) -> Dict:
+    """
+    Выполняет вызов с ограничением параллелизма, повторами и circuit breaker.
+
+    Args:
+        provider: Провайдер
+        model: Модель
+        task: Название задачи для журнала
+        max_retries: Максимальное количество попыток
+        send: Функция без аргументов, выполняющая один запрос и возвращающая
+              словарь {text, raw, input_tokens, output_tokens[, cached_tokens,
+              cache_write_tokens, cost_usd]}
+        deadline: Момент time.monotonic(), после которого новые попытки не начинаются
+
+    Returns:
+        Словарь ответа с полями text, raw, usage, latency, call_id (ID записи журнала)
+
+    Raises:
+        LLMUnavailableError: Если провайдер отключен circuit breaker'ом
+        LLMError: Если вызов не удался после всех попыток
+    """
+    breaker = get_breaker(provider)
+    last_error: Optional[Exception] = None
+    started = time.monotonic()
+
+    attempts = 0
+    for attempt in range(max_retries):
+        if deadline is not None and time.monotonic() >= deadline:
+            last_error = last_error or TimeoutError("дедлайн запроса истек")
+            break
+        if not breaker.allow():
+            _record_call(provider, model, task, "circuit_open", attempt, time.monotonic() - started, {},
+                         "Провайдер отключен circuit breaker'ом")
+            raise LLMUnavailableError(f"{provider} временно недоступен (circuit breaker открыт)")
+
+        response = None
+        attempts = attempt + 1
+        try:
+            with _global_semaphore, _get_model_semaphore(model):
+                result = send()
+            breaker.record_success()
+
+            latency = time.monotonic() - started
+            usage = {
+                "input_tokens": result.get("input_tokens") or 0,
+                "output_tokens": result.get("output_tokens") or 0,
+                "cached_tokens": result.get("cached_tokens") or 0,
+                "cache_write_tokens": result.get("cache_write_tokens") or 0,
+            }
+            usage["cache_savings_usd"] = estimate_cache_savings(model, usage["cached_tokens"])
+            usage["cost_usd"] = result.get("cost_usd") or estimate_cost(
+                model, usage["input_tokens"], usage["output_tokens"],
+                usage["cached_tokens"], usage["cache_write_tokens"])
+            call_id = _record_call(provider, model, task, "ok", attempt + 1, latency, usage)
+            return {"text": result["text"], "raw": result.get("raw"), "usage": usage, "latency": latency,
+                    "call_id": call_id}
+
+        except requests.exceptions.HTTPError as e:
+            response = e.response
+            status = response.status_code if response is not None else 0
+            body = response.text[:500] if response is not None and response.text else ""
+            last_error = LLMError(f"{provider} HTTP {status}: {body or e}")
+            if status not in RETRYABLE_STATUSES:
+                # Ошибка запроса (400/401/404) не исправится повтором и не говорит о сбое провайдера:
+                # провайдер ответил, поэтому breaker закрывается
+                breaker.record_success()
+                _record_call(provider, model, task, "error", attempt + 1, time.monotonic() - started, {},
+                             str(last_error))
+                raise last_error from e
+            breaker.record_failure()
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+            last_error = e
+            breaker.record_failure()
+        except LLMError:
+            raise
+        except Exception as e:
+            last_error = e
+            # Ошибки Anthropic SDK несут HTTP статус в status_code
+            status = getattr(e, "status_code", None)
+            if status and status not in RETRYABLE_STATUSES:
+                breaker.record_success()
+                _record_call(provider, model, task, "error", attempt + 1, time.monotonic() - started, {}, str(e))
+                raise LLMError(f"{provider} HTTP {status}: {e}") from e
+            breaker.record_failure()
+        finally:
+            # Пробный вызов half-open breaker'а снимается на любом пути выхода из попытки
+            breaker.release_probe()
+
+        if attempt < max_retries - 1:
+            wait_time = _retry_delay(attempt, response)
+            if deadline is not None and time.monotonic() + wait_time >= deadline:
+                print(f"⚠️  Ошибка {provider}/{model} (попытка {attempt + 1}/{max_retries}): "
+                      f"{str(last_error)[:200]}. Дедлайн запроса истекает, повторов не будет")
+                break
+            print(f"⚠️  Ошибка {provider}/{model} (попытка {attempt + 1}/{max_retries}): "
+                  f"{str(last_error)[:200]}. Ожидание {wait_time:.0f} секунд...")
+            time.sleep(wait_time)
+
+    _record_call(provider, model, task, "error", attempts, time.monotonic() - started, {}, str(last_error))
+    raise LLMError(f"{provider}/{model}: не удалось получить ответ после {attempts} попыток: {last_error}")
+
+
+def _mark_system_cacheable(messages: List[Dict]) -> List[Dict]:
+    """
+    Помечает системные сообщения как кэшируемый префикс (cache_control: ephemeral).
+    OpenRouter передает разметку в Anthropic, другие провайдеры её игнорируют.
+
+    Args:
+        messages: Сообщения в формате [{'role': ..., 'content': ...}]
+
+    Returns:
+        Новый список сообщений
+    """
+    marked = []
+    for message in messages:
+        if message.get("role") == "system" and isinstance(message.get("content"), str):
+            message = {
+                "role": "system",
+                "content": [{"type": "text", "text": message["content"],
+                             "cache_control": {"type": "ephemeral"}}],
+            }
+        marked.append(message)
+    return marked
+
+
+def _openrouter_usage(usage: Dict) -> Dict:
+    """Приводит usage ответа OpenRouter к полям журнала."""
+    prompt_details = usage.get("prompt_tokens_details") or {}
+    return {
+        "input_tokens": usage.get("prompt_tokens", 0),
+        "output_tokens": usage.get("completion_tokens", 0),
+        "cached_tokens": prompt_details.get("cached_tokens", 0),
+        "cache_write_tokens": prompt_details.get("cache_write_tokens", 0),
+        "cost_usd": usage.get("cost"),
+    }
+
+
+def _read_openrouter_stream(response: requests.Response, on_text: Callable[[str], None]) -> Dict:
+    """
+    Читает ответ OpenRouter в формате server-sent events.
+
+    Args:
+        response: Потоковый HTTP ответ
+        on_text: Вызывается с накопленным текстом после каждого полученного фрагмента
+
+    Returns:
+        Словарь: text, raw (последний чанк), usage-поля
+    """
+    response.encoding = "utf-8"
+    text = ""
+    last_chunk: Dict = {}
+    usage: Dict = {}
+
+    for line in response.iter_lines(decode_unicode=True):
+        # Пустые строки разделяют события, строки с ':' - keep-alive комментарии
+        if not line or not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            break
+
+        chunk = json.loads(data)
+        if "error" in chunk:
+            raise ValueError(f"Ошибка в потоке OpenRouter: {str(chunk['error'])[:200]}")
+        last_chunk = chunk
+        if chunk.get("usage"):
+            usage = chunk["usage"]
+        for choice in chunk.get("choices") or []:
+            delta = (choice.get("delta") or {}).get("content")
+            if delta:
+                text += delta
+                on_text(text)
+
+    return {"text": text.strip(), "raw": last_chunk, **_openrouter_usage(usage)}
+
+
+def chat_completion(messages: List[Dict], model: str, max_tokens: int = 4000,
+                    temperature: float = 0.7, timeout: int = 90, task: str = "",
+                    max_retries: int = 3, cache_system: bool = False,
+                    on_text: Optional[Callable[[str], None]] = None,
+                    deadline: Optional[float] = None) -> Dict:
+    """
+    Вызывает модель через OpenRouter (OpenAI-совместимый chat completions).
+
+    Args:
+        messages: Сообщения в формате [{'role': ..., 'content': ...}]
+        model: Модель OpenRouter (например, 'anthropic/claude-3.5-haiku')
+        max_tokens: Максимум токенов ответа
+        temperature: Температура
+        timeout: Таймаут одного запроса в секундах
+        task: Название задачи для журнала
+        max_retries: Максимальное количество попыток
+        cache_system: Кэшировать системный промпт (статический префикс) на стороне провайдера
+        on_text: Если задан, ответ читается потоком (SSE) и функция вызывается с накопленным
+                 текстом после каждого фрагмента. При повторе запроса текст начинается заново
+        deadline: Момент time.monotonic(), к которому вызов должен завершиться (вместе с повторами)
+
+    Returns:
+        Словарь: text, raw, usage (input_tokens, output_tokens, cached_tokens,
+        cache_write_tokens, cache_savings_usd, cost_usd), latency
+    """
+    api_key = os.getenv("ANTHROPIC_API_KEY")
+    if not api_key:
+        raise ValueError("ANTHROPIC_API_KEY not set in environment")
+
+    session = _get_session("openrouter")
+    payload = {
+        "model": model,
+        "messages": _mark_system_cacheable(messages) if cache_system else messages,
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+    }
+    if on_text:
+        payload["stream"] = True
+        payload["stream_options"] = {"include_usage": True}
+
+    def send() -> Dict:
+        response = session.post(OPENROUTER_URL, headers={"Authorization": f"Bearer {api_key}"},
+                                json=payload, timeout=_request_timeout(timeout, deadline), stream=bool(on_text))
+        response.raise_for_status()
+        if on_text:
+            with response:
+                return _read_openrouter_stream(response, on_text)
+
+        data = response.json()
+        if "choices" not in data or not data["choices"]:
+            raise ValueError(f"Пустой ответ OpenRouter: {str(data)[:200]}")
+        return {
+            "text": (data["choices"][0]["message"].get("content") or "").strip(),
+            "raw": data,
+            **_openrouter_usage(data.get("usage") or {}),
+        }
+
+    return _call_with_policy("openrouter", model, task, max_retries, send, deadline)
+
+
+def gemini_generate(prompt: str, system_instruction: str = "", model: str = "gemini-2.0-flash",
+                    generation_config: Optional[Dict] = None, google_search: bool = False,
+                    timeout: int = 90, task: str = "", max_retries: int = 3,
+                    deadline: Optional[float] = None) -> Dict:
+    """
+    Вызывает Gemini через REST API (generateContent).
+
+    Args:
+        prompt: Текст запроса
+        system_instruction: Системная инструкция
+        model: Модель Gemini
+        generation_config: Параметры генерации (temperature, topK, topP)
+        google_search: Подключить инструмент Google Search
+        timeout: Таймаут одного запроса в секундах
+        task: Название задачи для журнала
+        max_retries: Максимальное количество попыток
+        deadline: Момент time.monotonic(), к которому вызов должен завершиться (вместе с повторами)
+
+    Returns:
+        Словарь: text (склеенные text-части первого кандидата), raw, usage, latency
+    """
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY not set in environment")
+
+    session = _get_session("gemini")
+    url = GEMINI_URL_TEMPLATE.format(model=model)
+    payload = {"contents": [{"parts": [{"text": prompt}]}]}
+    if system_instruction:
+        payload["systemInstruction"] = {"parts": [{"text": system_instruction}]}
+    if generation_config:
+        payload["generationConfig"] = generation_config
+    if google_search:
+        payload["tools"] = [{"googleSearch": {}}]
+
+    def send() -> Dict:
+        response = session.post(url, params={"key": api_key}, json=payload,
+                                timeout=_request_timeout(timeout, deadline))
+        response.raise_for_status()
+        data = response.json()
+
+        text = ""
+        candidates = data.get("candidates") or []
+        if candidates and "parts" in candidates[0].get("content", {}):
+            text = "".join(part.get("text", "") for part in candidates[0]["content"]["parts"])
+        else:
+            text = str(data)
+
+        usage = data.get("usageMetadata") or {}
+        return {
+            "text": text.strip(),
+            "raw": data,
+            "input_tokens": usage.get("promptTokenCount", 0),
+            "output_tokens": usage.get("candidatesTokenCount", 0),
+            # Неявный кэш Gemini: разметка не нужна, попадания приходят в usageMetadata
+            "cached_tokens": usage.get("cachedContentTokenCount", 0),
+        }
+
+    return _call_with_policy("gemini", model, task, max_retries, send, deadline)
+
+
+def _get_anthropic_client():
+    """Возвращает общий клиент Anthropic SDK (создается при первом обращении)."""
+    global _anthropic_client
+    if _anthropic_client is None:
+        from anthropic import Anthropic
+
+        api_key = os.getenv("ANTHROPIC_API_KEY")
+        if not api_key:
+            raise ValueError("ANTHROPIC_API_KEY не установлен в .env")
+        # Повторы выполняет _call_with_policy, поэтому встроенные повторы SDK отключены
+        _anthropic_client = Anthropic(api_key=api_key, max_retries=0)
+    return _anthropic_client
+
+
+def anthropic_message(messages: List[Dict], model: str, max_tokens: int = 4000,
+                      system: str = "", timeout: int = 120, task: str = "",
+                      max_retries: int = 3, cache_system: bool = False,
+                      deadline: Optional[float] = None) -> Dict:
+    """
+    Вызывает Claude напрямую через Anthropic SDK.
+
+    Args:
+        messages: Сообщения в формате [{'role': ..., 'content': ...}]
+        model: Модель Anthropic (например, 'claude-3-5-sonnet-20241022')
+        max_tokens: Максимум токенов ответа
+        system: Системный промпт
+        timeout: Таймаут одного запроса в секундах
+        task: Название задачи для журнала
+        max_retries: Максимальное количество попыток
+        cache_system: Кэшировать системный промпт (статический префикс)
+        deadline: Момент time.monotonic(), к которому вызов должен завершиться (вместе с повторами)
+
+    Returns:
+        Словарь: text, raw, usage, latency
+    """
+    client = _get_anthropic_client()
+    kwargs = {"model": model, "max_tokens": max_tokens, "messages": messages}
+    if system and cache_system:
+        kwargs["system"] = [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+    elif system:
+        kwargs["system"] = system
+
+    def send() -> Dict:
+        message = client.messages.create(**{**kwargs, "timeout": _request_timeout(timeout, deadline)})
+        text = "".join(block.text for block in message.content if getattr(block, "type", "") == "text")
+        # В Anthropic input_tokens не включает токены кэша, приводим к общему виду
+        cached_tokens = getattr(message.usage, "cache_read_input_tokens", 0) or 0
+        cache_write_tokens = getattr(message.usage, "cache_creation_input_tokens", 0) or 0
+        return {
+            "text": text,
+            "raw": message,
+            "input_tokens": message.usage.input_tokens + cached_tokens + cache_write_tokens,
+            "output_tokens": message.usage.output_tokens,
+            "cached_tokens": cached_tokens,
+            "cache_write_tokens": cache_write_tokens,
+        }
+
+    return _call_with_policy("anthropic", model, task, max_retries, send, deadline)
@@ -6,7 +6,7 @@ import os
 import asyncio
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
 
 from dotenv import load_dotenv
 from telegram import Bot
@@ -14,12 +14,18 @@ from telegram.error import TelegramError
 
 from news_search import search_coal_news, select_best_news
 from post_generator import create_coal_analysis
-from post_versions_generator import generate_post_versions, generate_freight_post
+from post_versions_generator import generate_post_versions, generate_freight_post, queue_freight_post, take_batched_freight_post
+from llm_batch import is_batch_enabled, process_batch_queue
+from monthly_forecast import publish_ready_forecasts
 from storage import is_published, mark_as_published, mark_as_published_with_category, should_generate_freight_post, increment_post_count, get_post_count, add_freight_topic
 from published_news_db import init_database, is_news_published, save_publication, update_publication_platform
 from image_extractor import extract_image_from_url
 # from linkedin_publisher import publish_to_linkedin  # Отключено
 from web_publisher import publish_to_web, submit_to_google_indexing
+from async_io import run_blocking
+from publish_outbox import enqueue_publication, process_outbox, outbox_worker
+from pipeline_checkpoints import (get_checkpoint, start_checkpoint, save_checkpoint, complete_checkpoint,
+                                  abandon_checkpoint, get_resumable_checkpoint)
 
 
 # Загрузка переменных окружения
@@ -32,6 +38,12 @@ TG_TARGET_CHANNEL = os.getenv("TG_TARGET_CHANNEL", "@benchenergy")
 TG_BOT_TOKEN = os.getenv("TG_BOT_TOKEN", "")
 ADMIN_CHAT_ID = os.getenv("ADMIN_CHAT_ID", "")  # Chat ID для отправки статуса (можно username или ID)
 POLL_SECONDS = int(os.getenv("POLL_SECONDS", "3600"))  # По умолчанию 1 час
+OUTBOX_MEDIA_DIR = Path("output/outbox_media")  # Изображения для повторных публикаций
+# Потоковая генерация: Telegram публикуется, пока Web версия еще генерируется
+STREAM_POST_VERSIONS = os.getenv("STREAM_POST_VERSIONS", "true").lower() == "true"
+
+# Фоновые задачи публикации, продолжающиеся после возврата из process_news
+_background_publications: set = set()
 
 
 def get_tags(text: str) -> list[str]:
@@ -182,7 +194,7 @@ def split_message(text: str, max_length: int = 3900) -> list[str]:
     return parts
 
 
-async def send_message_via_bot_api(text: str, chat_id: str, media_path: Optional[Path] = None) -> bool:
+async def send_message_via_bot_api(text: str, chat_id: str, media_path: Optional[Path] = None) -> Optional[str]:
     """
     Отправляет сообщение в Telegram канал через Bot API.
     
@@ -192,11 +204,11 @@ async def send_message_via_bot_api(text: str, chat_id: str, media_path: Optional
         media_path: Путь к изображению (опционально)
         
     Returns:
-        True если сообщение отправлено успешно, False иначе
+        ID отправленного сообщения (первой части длинного сообщения) или None при ошибке
     """
     if not TG_BOT_TOKEN:
         print("❌ TG_BOT_TOKEN не установлен")
-        return False
+        return None
     
     bot = Bot(token=TG_BOT_TOKEN)
     await bot.initialize()
@@ -222,7 +234,7 @@ async def send_message_via_bot_api(text: str, chat_id: str, media_path: Optional
                 text_to_send = text
             
             with open(media_path, 'rb') as photo:
-                await bot.send_photo(
+                message = await bot.send_photo(
                     chat_id=chat_id,
                     photo=photo,
                     caption=text_to_send,
@@ -232,41 +244,44 @@ async def send_message_via_bot_api(text: str, chat_id: str, media_path: Optional
             # Если сообщение длинное, разбиваем на части
             if len(text) > 3900:
                 parts = split_message(text)
+                message = None
                 for i, part in enumerate(parts):
-                    await bot.send_message(
+                    sent = await bot.send_message(
                         chat_id=chat_id,
                         text=part,
                         parse_mode='HTML'
                     )
+                    message = message or sent
                     if i < len(parts) - 1:
                         await asyncio.sleep(0.5)
             else:
-                await bot.send_message(
+                message = await bot.send_message(
                     chat_id=chat_id,
                     text=text,
                     parse_mode='HTML'
                 )
         
-        return True
+        return str(message.message_id)
         
     except TelegramError as e:
         print(f"❌ Ошибка Telegram API: {e}")
-        return False
+        return None
     except Exception as e:
         print(f"❌ Неожиданная ошибка при отправке: {e}")
-        return False
+        return None
     finally:
         await bot.shutdown()
 
 
-async def send_status_to_admin(news_title: str, telegram_status: bool, web_status: bool, news_url: str = ""):
+async def send_status_to_admin(news_title: str, telegram_status: Optional[bool], web_status: Optional[bool],
+                              news_url: str = ""):
     """
     Отправляет статус публикации администратору в личный чат.
     
     Args:
         news_title: Заголовок новости
-        telegram_status: True если опубликовано в Telegram
-        web_status: True если опубликовано на сайте
+        telegram_status: True если опубликовано в Telegram, None если публикация продолжается в фоне
+        web_status: True если опубликовано на сайте, None если публикация продолжается в фоне
         news_url: URL новости (опционально)
     """
     if not ADMIN_CHAT_ID:
@@ -280,16 +295,18 @@ async def send_status_to_admin(news_title: str, telegram_status: bool, web_statu
     
     try:
         # Формируем сообщение со статусом
-        status_emoji_tg = "✅" if telegram_status else "❌"
-        status_emoji_web = "✅" if web_status else "❌"
+        def status_line(status: Optional[bool]) -> str:
+            if status is None:
+                return "⏳ Публикуется в фоне"
+            return "✅ Опубликовано" if status else "❌ Не опубликовано"
         
         status_text = f"""📊 <b>Статус публикации</b>
 
 📰 <b>Новость:</b>
 {news_title[:200]}{'...' if len(news_title) > 200 else ''}
 
-📱 <b>Telegram:</b> {status_emoji_tg} {'Опубликовано' if telegram_status else 'Не опубликовано'}
-🌐 <b>Сайт:</b> {status_emoji_web} {'Опубликовано' if web_status else 'Не опубликовано'}
+📱 <b>Telegram:</b> {status_line(telegram_status)}
+🌐 <b>Сайт:</b> {status_line(web_status)}
 
 ⏰ <i>{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</i>"""
         
@@ -309,10 +326,452 @@ async def send_status_to_admin(news_title: str, telegram_status: bool, web_statu
         await bot.shutdown()
 
 
+async def download_news_image(news_url: str) -> Optional[Path]:
+    """
+    Извлекает изображение из новости и скачивает его в output/media.
+    
+    Args:
+        news_url: URL новости
+        
+    Returns:
+        Путь к скачанному изображению или None
+    """
+    media_path = None
+    print(f"🖼️  Извлекаю изображение из новости: {news_url[:60]}...")
+    try:
+        # Убеждаемся, что используем правильный URL новости
+        image_url = await run_blocking(extract_image_from_url, news_url)
+        if image_url:
+            # ПРОВЕРКА: Пропускаем иконки и маленькие изображения
+            if any(skip in image_url.lower() for skip in ['pinterest', 'pin', 'bookmark', 'favicon', 'icon', 'logo']):
+                print(f"⚠️  Найдено изображение-иконка, пропускаем: {image_url[:80]}...")
+                image_url = None
+            else:
+                print(f"✅ Найдено изображение: {image_url[:100]}...")
+            
+            if image_url:
+                # Скачиваем изображение
+                MEDIA_DIR = Path("output/media")
+                MEDIA_DIR.mkdir(parents=True, exist_ok=True)
+                
+                # Скачиваем изображение асинхронно
+                import aiohttp
+                print(f"📥 Скачиваю изображение...")
+                async with aiohttp.ClientSession() as session:
+                    async with session.get(image_url, timeout=aiohttp.ClientTimeout(total=30)) as response:
+                        if response.status == 200:
+                            content_type = response.headers.get('Content-Type', '')
+                            print(f"   Content-Type: {content_type}")
+                            
+                            # Определяем расширение файла (один раз создаем timestamp)
+                            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                            if 'jpeg' in content_type or 'jpg' in content_type:
+                                image_path = MEDIA_DIR / f"news_{timestamp}.jpg"
+                            elif 'png' in content_type:
+                                image_path = MEDIA_DIR / f"news_{timestamp}.png"
+                            elif 'webp' in content_type:
+                                image_path = MEDIA_DIR / f"news_{timestamp}.webp"
+                            else:
+                                # По умолчанию jpg
+                                image_path = MEDIA_DIR / f"news_{timestamp}.jpg"
+                            
+                            with open(image_path, 'wb') as f:
+                                async for chunk in response.content.iter_chunked(8192):
+                                    f.write(chunk)
+                            
+                            if image_path.exists():
+                                file_size = image_path.stat().st_size
+                                print(f"   Размер файла: {file_size / 1024:.1f} KB")
+                                # Минимум 5KB для качественных изображений (было 10KB, снижено для лучшего покрытия)
+                                if file_size > 5120:  # Минимум 5KB
+                                    media_path = image_path
+                                    print(f"✅ Изображение скачано: {image_path}")
+                                else:
+                                    print(f"⚠️  Изображение слишком маленькое ({file_size} байт, минимум 5KB)")
+                                    try:
+                                        image_path.unlink()
+                                    except (OSError, FileNotFoundError) as e:
+                                        print(f"   ⚠️  Не удалось удалить файл: {e}")
+                            else:
+                                print(f"⚠️  Файл не был создан")
+                        else:
+                            print(f"⚠️  Не удалось скачать изображение: HTTP {response.status}")
+        else:
+            print(f"ℹ️  Изображение не найдено в новости")
+    except Exception as e:
+        print(f"⚠️  Ошибка при извлечении изображения: {e}")
+        import traceback
+        print(traceback.format_exc())
+        print(f"   Публикуем без изображения")
+    
+    return media_path
+
+
+def add_technical_tags(news: dict, tg_version: str) -> str:
+    """
+    Добавляет в Telegram версию технические хештеги, которых в ней еще нет.
+    
+    Args:
+        news: Словарь с данными новости
+        tg_version: Текст поста для Telegram
+        
+    Returns:
+        Текст поста с техническими хештегами (перед ссылкой на источник)
+    """
+    news_text = news.get("title", "") + " " + news.get("summary", "")
+    technical_tags = get_tags(news_text)
+    
+    # Проверяем, какие теги уже есть в Telegram версии
+    import re
+    hashtag_pattern = r'#\w+'
+    existing_hashtags = re.findall(hashtag_pattern, tg_version)
+    existing_tags = [tag.lower() for tag in existing_hashtags]
+    
+    # Фильтруем технические теги - добавляем только те, которых нет
+    new_tags = []
+    for tag in technical_tags:
+        if tag.lower() not in existing_tags:
+            new_tags.append(tag)
+    
+    # Добавляем новые технические теги в Telegram версию
+    if new_tags:
+        tags_str = " " + " ".join(new_tags)
+        if '<a href' in tg_version:
+            source_link_pos = tg_version.rfind('<a href')
+            tg_version = tg_version[:source_link_pos].rstrip() + tags_str + "\n\n" + tg_version[source_link_pos:]
+        else:
+            tg_version = tg_version.rstrip() + tags_str
+        print(f"   🏷️  Добавлены технические теги в Telegram: {', '.join(new_tags)}")
+    
+    return tg_version
+
+
+async def generate_news_versions(news: dict, on_tg_version: Optional[Callable[[str], None]] = None) -> Optional[dict]:
+    """
+    Генерирует версии поста (Telegram, Web) и добавляет технические хештеги.
+    При ошибке использует fallback через create_coal_analysis.
+    
+    Args:
+        news: Словарь с данными новости
+        on_tg_version: Если задан, генерация идет потоком и функция вызывается (из потока
+                       генерации) с готовой Telegram версией (уже с техническими хештегами),
+                       пока Web версия еще генерируется
+        
+    Returns:
+        Словарь с ключами tg_version, web_version, category или None при ошибке
+    """
+    news_title = news.get("title", "")
+    
+    streamed = {}
+    
+    def handle_tg_version(tg_version: str):
+        streamed["tg_version"] = add_technical_tags(news, tg_version)
+        on_tg_version(streamed["tg_version"])
+    
+    # Генерируем версии поста (Telegram, Web) - LinkedIn версия не генерируется
+    try:
+        print(f"🤖 Генерирую версии поста для всех платформ...")
+        versions = await run_blocking(generate_post_versions, news,
+                                      on_tg_version=handle_tg_version if on_tg_version else None)
+        
+        tg_version = versions.get("tg_version", "")
+        web_version = versions.get("web_version", "")
+        
+        print(f"✅ Версии поста сгенерированы")
+        
+        # Извлекаем категорию из Telegram версии
+        category = extract_category_from_post(tg_version)
+        print(f"   📂 Категория: {category}")
+        
+        # Telegram версия из потока уже отдана на публикацию с хештегами
+        tg_version = streamed.get("tg_version") or add_technical_tags(news, tg_version)
+        
+    except Exception as e:
+        print(f"❌ Ошибка генерации версий поста: {e}")
+        if streamed.get("tg_version"):
+            # Telegram версия уже публикуется - сохраняем её, Web версия минимальная
+            tg_version = streamed["tg_version"]
+            category = extract_category_from_post(tg_version)
+            web_version = ""
+        else:
+            # Fallback: используем старый метод
+            print(f"   ⚠️  Использую fallback: создаю одну версию для Telegram")
+            try:
+                tg_version = await run_blocking(create_coal_analysis, news)
+                category = extract_category_from_post(tg_version)
+                web_version = f"<h1>{news_title}</h1><p>{news.get('summary', '')}</p>"
+            except Exception as e2:
+                print(f"❌ Ошибка fallback создания поста: {e2}")
+                return None
+    
+    if not web_version:
+        web_version = f"<h1>{news_title}</h1><p>{news.get('summary', '')}</p>"
+    
+    return {
+        "tg_version": tg_version,
+        "web_version": web_version,
+        "category": category
+    }
+
+
+async def publish_news_to_telegram(news: dict, tg_version: str, media_task: "asyncio.Task") -> Optional[str]:
+    """
+    Публикует Telegram версию, дождавшись загрузки изображения.
+    При неудаче сохраняет публикацию в outbox для повтора.
+    
+    Args:
+        news: Словарь с данными новости
+        tg_version: Текст поста для Telegram
+        media_task: Задача загрузки изображения (результат - Path или None)
+        
+    Returns:
+        ID сообщения Telegram или None при ошибке
+    """
+    media_path = None
+    error = "Telegram API вернул ошибку"
+    try:
+        media_path = await media_task
+        print(f"\n📱 Публикация в Telegram...")
+        if media_path and media_path.exists():
+            print(f"   Изображение: {media_path} ({media_path.stat().st_size / 1024:.1f} KB)")
+        
+        tg_message_id = await send_message_via_bot_api(tg_version, TG_TARGET_CHANNEL, media_path)
+        
+        if tg_message_id:
+            print(f"✅ Опубликовано в Telegram канал {TG_TARGET_CHANNEL} (сообщение {tg_message_id})")
+            return tg_message_id
+        print(f"❌ Не удалось опубликовать в Telegram (продолжаем с другими платформами)")
+    except Exception as e:
+        error = str(e)
+        print(f"❌ Ошибка публикации в Telegram: {e}")
+        import traceback
+        print(traceback.format_exc())
+    
+    # Сохраняем копию изображения: исходный файл удаляется после обработки новости
+    outbox_media = None
+    if media_path and media_path.exists():
+        try:
+            import shutil
+            OUTBOX_MEDIA_DIR.mkdir(parents=True, exist_ok=True)
+            outbox_media = OUTBOX_MEDIA_DIR / media_path.name
+            shutil.copy2(media_path, outbox_media)
+        except OSError as e:
+            print(f"   ⚠️  Не удалось сохранить изображение для outbox: {e}")
+            outbox_media = None
+    
+    await run_blocking(enqueue_publication, "telegram", news.get("source_url", ""), {
+        "text": tg_version,
+        "chat_id": TG_TARGET_CHANNEL,
+        "media_path": str(outbox_media) if outbox_media else None
+    }, error)
+    return None
+
+
+async def publish_news_to_notion(news: dict, tg_version: str, web_version: str) -> Optional[str]:
+    """
+    Публикует новость в Notion (единый источник правды).
+    При неудаче сохраняет публикацию в outbox для повтора.
+    
+    Args:
+        news: Словарь с данными новости
+        tg_version: Текст поста для Telegram
+        web_version: HTML версия для веба
+        
+    Returns:
+        ID страницы Notion или None при ошибке
+    """
+    error = "Notion API вернул ошибку"
+    try:
+        print(f"\n📝 Публикация в Notion...")
+        from notion_publisher import create_notion_page
+        
+        # Для Notion нужен публичный URL изображения, локальный файл не подходит
+        # Пока используем None, можно добавить загрузку в S3/CDN позже
+        image_url_for_notion = None
+        
+        notion_page_id = await run_blocking(create_notion_page, news, tg_version, web_version, image_url_for_notion)
+        if notion_page_id:
+            print(f"✅ Опубликовано в Notion: {notion_page_id}")
+            return notion_page_id
+        print(f"❌ Не удалось опубликовать в Notion")
+    except Exception as e:
+        error = str(e)
+        print(f"❌ Ошибка публикации в Notion: {e}")
+        import traceback
+        print(traceback.format_exc())
+    
+    await run_blocking(enqueue_publication, "notion", news.get("source_url", ""), {
+        "news": news,
+        "tg_version": tg_version,
+        "web_version": web_version
+    }, error)
+    return None
+
+
+async def _retry_telegram_publication(item: dict) -> Optional[str]:
+    """
+    Повторяет публикацию в Telegram из outbox.
+    
+    Args:
+        item: Запись outbox
+        
+    Returns:
+        ID сообщения Telegram или None при ошибке
+    """
+    payload = item["payload"]
+    media_path = Path(payload["media_path"]) if payload.get("media_path") else None
+    tg_message_id = await send_message_via_bot_api(payload["text"], payload.get("chat_id", TG_TARGET_CHANNEL),
+                                                   media_path)
+    if not tg_message_id:
+        return None
+    
+    if item.get("news_url"):
+        await run_blocking(update_publication_platform, item["news_url"], "telegram", tg_message_id)
+    if media_path and media_path.exists():
+        try:
+            media_path.unlink()
+        except OSError:
+            pass
+    return tg_message_id
+
+
+async def _retry_notion_publication(item: dict) -> Optional[str]:
+    """
+    Повторяет публикацию в Notion из outbox.
+    
+    Args:
+        item: Запись outbox
+        
+    Returns:
+        ID страницы Notion или None при ошибке
+    """
+    from notion_publisher import create_notion_page
+    
+    payload = item["payload"]
+    notion_page_id = await run_blocking(create_notion_page, payload["news"], payload["tg_version"], payload["web_version"], None)
+    if notion_page_id and item.get("news_url"):
+        await run_blocking(update_publication_platform, item["news_url"], "web", f"notion:{notion_page_id}")
+    return notion_page_id
+
+
+OUTBOX_HANDLERS = {
+    "telegram": _retry_telegram_publication,
+    "notion": _retry_notion_publication,
+}
+
+
+async def _finish_publication(task: "asyncio.Task", news_url: str, platform: str):
+    """
+    Дожидается публикации, продолжающейся после возврата из process_news, записывает результат в БД
+    и закрывает чекпоинт. Неудачи уже сохранены в outbox самими публикаторами.
+    
+    Args:
+        task: Задача публикации
+        news_url: URL новости
+        platform: Платформа в БД ('telegram', 'web')
+    """
+    try:
+        platform_id = await task
+    except Exception as e:
+        print(f"⚠️  Фоновая публикация ({platform}) завершилась ошибкой: {e}")
+        return
+    await run_blocking(complete_checkpoint, news_url)
+    if platform_id and news_url:
+        if platform == "web":
+            platform_id = f"notion:{platform_id}"
+        await run_blocking(update_publication_platform, news_url, platform, platform_id)
+        print(f"✅ Фоновая публикация ({platform}) завершена: {platform_id}")
+
+
+async def drain_background_publications():
+    """Дожидается завершения всех фоновых публикаций (перед выходом из процесса)."""
+    if _background_publications:
+        print(f"⏳ Ожидаю завершения фоновых публикаций: {len(_background_publications)}")
+        await asyncio.gather(*_background_publications, return_exceptions=True)
+
+
+async def _checkpointed_media(news_url: str, checkpoint: dict) -> Optional[Path]:
+    """
+    Этап изображения с чекпоинтом: использует сохраненный файл или скачивает новый.
+    
+    Args:
+        news_url: URL новости
+        checkpoint: Чекпоинт новости (может быть пустым)
+        
+    Returns:
+        Путь к изображению или None
+    """
+    cached_path = checkpoint.get("image_path")
+    if cached_path and Path(cached_path).exists():
+        print(f"♻️  Изображение из чекпоинта: {cached_path}")
+        return Path(cached_path)
+    
+    media_path = await download_news_image(news_url)
+    await run_blocking(save_checkpoint, news_url, "image", image_path=media_path)
+    return media_path
+
+
+async def _checkpointed_publish(news_url: str, stage: str, field: str, publish_coro) -> Optional[str]:
+    """
+    Этап публикации с чекпоинтом: сохраняет ID публикации сразу после успеха.
+    
+    Args:
+        news_url: URL новости
+        stage: Этап ('telegram', 'notion')
+        field: Поле чекпоинта ('tg_message_id', 'notion_page_id')
+        publish_coro: Корутина публикации
+        
+    Returns:
+        ID публикации или None
+    """
+    platform_id = await publish_coro
+    if platform_id:
+        # Публикация уже выполнена: ошибка чекпоинта не должна превращать её в неудачу
+        try:
+            await run_blocking(save_checkpoint, news_url, stage, **{field: platform_id})
+        except Exception as e:
+            print(f"⚠️  Не удалось сохранить чекпоинт этапа {stage}: {e}")
+    return platform_id
+
+
+def _publish_result(task: "asyncio.Task") -> Optional[str]:
+    """
+    ID публикации из завершенной задачи; исключение задачи считается неудачной публикацией.
+    
+    Args:
+        task: Завершенная задача публикации
+        
+    Returns:
+        ID публикации или None
+    """
+    if task.cancelled():
+        return None
+    error = task.exception()
+    if error is not None:
+        print(f"❌ Ошибка публикации: {error}")
+        return None
+    return task.result()
+
+
+async def _resolved(value):
+    """Возвращает уже известный результат этапа в виде корутины."""
+    return value
+
+
 async def process_news(news: dict):
     """
     Обрабатывает одну новость: создает аналитический пост и публикует.
     
+    Этапы выполняются как граф зависимостей:
+    - извлечение и загрузка изображения стартуют сразу и идут параллельно
+      с проверкой URL и генерацией версий поста (LLM, 30-90 секунд);
+    - публикация в Notion стартует, как только готовы версии поста;
+    - публикация в Telegram стартует, как только готовы Telegram версия и изображение
+      (при потоковой генерации - до завершения Web версии).
+    
+    Результат каждого этапа сохраняется в чекпоинт (pipeline_checkpoints), поэтому
+    после падения процесса завершенные этапы не повторяются.
+    
     Args:
         news: Словарь с данными новости
         
@@ -323,42 +782,39 @@ async def process_news(news: dict):
             - web_status: True если опубликовано на сайте
             - news_url: URL новости
     """
+    media_task = None
+    publish_tasks = {}
     try:
         news_url = news.get("source_url", "")
         news_title = news.get("title", "")
+        failed_status = {
+            "news_title": news_title,
+            "telegram_status": False,
+            "web_status": False,
+            "news_url": news_url
+        }
         
-        # Проверка на дубликаты уже выполнена в run_once(), но оставляем для безопасности
-        if news_url:
+        # Загружаем незавершенный чекпоинт (если новость уже обрабатывалась и процесс упал)
+        checkpoint = await run_blocking(get_checkpoint, news_url) or {}
+        resuming_publication = bool(checkpoint.get("versions") or checkpoint.get("tg_message_id"))
+        
+        # Проверка на дубликаты уже выполнена в run_once(), но оставляем для безопасности.
+        # Исключение - незавершенная публикация из чекпоинта (одна из платформ еще не опубликована)
+        if news_url and not resuming_publication:
             if is_published(news_url) or is_news_published(news_url):
                 print(f"⚠️  Новость уже опубликована (дополнительная проверка): {news_title[:50]}...")
-                return False, {
-                    "news_title": news_title,
-                    "telegram_status": False,
-                    "web_status": False,
-                    "news_url": news_url
-                }
+                await run_blocking(complete_checkpoint, news_url)
+                return False, failed_status
         
         print(f"📰 Обрабатываем новость: {news_title[:60]}...")
         print(f"   URL: {news_url[:80] if news_url else 'N/A'}...")
         
-        # ВАЛИДАЦИЯ: Проверяем, что URL реальный и доступен
-        if news_url:
-            from url_validator import validate_news_url
-            is_valid, error_msg = validate_news_url(news_url)
-            if not is_valid:
-                print(f"❌ URL новости невалидный или недоступен: {error_msg}")
-                print(f"   URL: {news_url[:80]}...")
-                print(f"   ⚠️  Пропускаем эту новость (возможно, она выдумана или ссылка битая)")
-                return False, {
-                    "news_title": news_title,
-                    "telegram_status": False,
-                    "web_status": False,
-                    "news_url": news_url
-                }
-            else:
-                print(f"✅ URL новости валиден и доступен")
+        # Завершенный или брошенный чекпоинт повторно выбранной новости снова переводится в работу
+        checkpoint = await run_blocking(start_checkpoint, news_url, news) or {}
+        if checkpoint.get("stage", "selected") != "selected":
+            print(f"♻️  Найден чекпоинт, последний этап: {checkpoint.get('stage')}")
         
-        # ПРОВЕРКА КАЧЕСТВА НОВОСТИ: Проверяем релевантность
+        # ПРОВЕРКА КАЧЕСТВА НОВОСТИ: локальные проверки до любых сетевых запросов
         news_title_lower = news_title.lower()
         news_summary_lower = news.get("summary", "").lower()
         
@@ -376,23 +832,15 @@ async def process_news(news: dict):
             print(f"❌ Новость не релевантна угольному рынку (общая новость про товарные рынки)")
             print(f"   Заголовок: {news_title[:60]}...")
             print(f"   ⚠️  Пропускаем эту новость")
-            return False, {
-                "news_title": news_title,
-                "telegram_status": False,
-                "web_status": False,
-                "news_url": news_url
-            }
+            await run_blocking(abandon_checkpoint, news_url, "Новость не прошла проверку качества")
+            return False, failed_status
         
         if not has_coal_keyword:
             print(f"⚠️  В новости нет ключевых слов про уголь")
             print(f"   Заголовок: {news_title[:60]}...")
             print(f"   ⚠️  Пропускаем эту новость")
-            return False, {
-                "news_title": news_title,
-                "telegram_status": False,
-                "web_status": False,
-                "news_url": news_url
-            }
+            await run_blocking(abandon_checkpoint, news_url, "Новость не прошла проверку качества")
+            return False, failed_status
         
         # СТРОГАЯ ПРОВЕРКА: новость должна содержать конкретные данные (цифры, факты)
         import re
@@ -405,234 +853,110 @@ async def process_news(news: dict):
             print(f"❌ Новость без конкретных данных (нет цифр, только общие фразы)")
             print(f"   Заголовок: {news_title[:60]}...")
             print(f"   ⚠️  Пропускаем эту новость")
-            return False, {
-                "news_title": news_title,
-                "telegram_status": False,
-                "web_status": False,
-                "news_url": news_url
-            }
+            await run_blocking(abandon_checkpoint, news_url, "Новость не прошла проверку качества")
+            return False, failed_status
         
         if len(news_summary_lower) < 100:
             print(f"❌ Новость слишком короткая (summary менее 100 символов)")
             print(f"   Заголовок: {news_title[:60]}...")
             print(f"   ⚠️  Пропускаем эту новость")
-            return False, {
-                "news_title": news_title,
-                "telegram_status": False,
-                "web_status": False,
-                "news_url": news_url
-            }
+            await run_blocking(abandon_checkpoint, news_url, "Новость не прошла проверку качества")
+            return False, failed_status
         
-        # Извлекаем изображение из новости
-        media_path = None
+        # Изображение не зависит от генерации текста - запускаем сразу в фоне
         if news_url:
-            print(f"🖼️  Извлекаю изображение из новости: {news_url[:60]}...")
-            try:
-                # Убеждаемся, что используем правильный URL новости
-                image_url = extract_image_from_url(news_url)
-                if image_url:
-                    # ПРОВЕРКА: Пропускаем иконки и маленькие изображения
-                    if any(skip in image_url.lower() for skip in ['pinterest', 'pin', 'bookmark', 'favicon', 'icon', 'logo']):
-                        print(f"⚠️  Найдено изображение-иконка, пропускаем: {image_url[:80]}...")
-                        image_url = None
-                    else:
-                        print(f"✅ Найдено изображение: {image_url[:100]}...")
-                    
-                    if image_url:
-                        # Скачиваем изображение
-                        MEDIA_DIR = Path("output/media")
-                        MEDIA_DIR.mkdir(parents=True, exist_ok=True)
-                        
-                        # Скачиваем изображение асинхронно
-                        import aiohttp
-                        print(f"📥 Скачиваю изображение...")
-                        async with aiohttp.ClientSession() as session:
-                            async with session.get(image_url, timeout=aiohttp.ClientTimeout(total=30)) as response:
-                                if response.status == 200:
-                                    content_type = response.headers.get('Content-Type', '')
-                                    print(f"   Content-Type: {content_type}")
-                                    
-                                    # Определяем расширение файла (один раз создаем timestamp)
-                                    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                                    if 'jpeg' in content_type or 'jpg' in content_type:
-                                        image_path = MEDIA_DIR / f"news_{timestamp}.jpg"
-                                    elif 'png' in content_type:
-                                        image_path = MEDIA_DIR / f"news_{timestamp}.png"
-                                    elif 'webp' in content_type:
-                                        image_path = MEDIA_DIR / f"news_{timestamp}.webp"
-                                    else:
-                                        # По умолчанию jpg
-                                        image_path = MEDIA_DIR / f"news_{timestamp}.jpg"
-                                    
-                                    with open(image_path, 'wb') as f:
-                                        async for chunk in response.content.iter_chunked(8192):
-                                            f.write(chunk)
-                                    
-                                    if image_path.exists():
-                                        file_size = image_path.stat().st_size
-                                        print(f"   Размер файла: {file_size / 1024:.1f} KB")
-                                        # Минимум 5KB для качественных изображений (было 10KB, снижено для лучшего покрытия)
-                                        if file_size > 5120:  # Минимум 5KB
-                                            media_path = image_path
-                                            print(f"✅ Изображение скачано: {image_path}")
-                                        else:
-                                            print(f"⚠️  Изображение слишком маленькое ({file_size} байт, минимум 5KB)")
-                                            try:
-                                                image_path.unlink()
-                                            except (OSError, FileNotFoundError) as e:
-                                                print(f"   ⚠️  Не удалось удалить файл: {e}")
-                                    else:
-                                        print(f"⚠️  Файл не был создан")
-                                else:
-                                    print(f"⚠️  Не удалось скачать изображение: HTTP {response.status}")
-                else:
-                    print(f"ℹ️  Изображение не найдено в новости")
-            except Exception as e:
-                print(f"⚠️  Ошибка при извлечении изображения: {e}")
-                import traceback
-                print(traceback.format_exc())
-                print(f"   Публикуем без изображения")
+            media_task = asyncio.create_task(_checkpointed_media(news_url, checkpoint))
+        else:
+            media_task = asyncio.create_task(asyncio.sleep(0, result=None))
         
-        # Генерируем версии поста (Telegram, Web) - LinkedIn версия не генерируется
-        try:
-            print(f"🤖 Генерирую версии поста для всех платформ...")
-            versions = generate_post_versions(news)
-            
-            tg_version = versions.get("tg_version", "")
-            web_version = versions.get("web_version", "")
-            
-            print(f"✅ Версии поста сгенерированы")
-            
-            # Извлекаем категорию из Telegram версии
-            category = extract_category_from_post(tg_version)
-            print(f"   📂 Категория: {category}")
-            
-            # Добавляем технические хештеги в Telegram версию если их нет
-            news_text = news_title + " " + news.get("summary", "")
-            technical_tags = get_tags(news_text)
-            
-            # Проверяем, какие теги уже есть в Telegram версии
-            existing_tags = []
-            import re
-            hashtag_pattern = r'#\w+'
-            existing_hashtags = re.findall(hashtag_pattern, tg_version)
-            existing_tags = [tag.lower() for tag in existing_hashtags]
+        # ВАЛИДАЦИЯ: Проверяем, что URL реальный и доступен (до платного вызова LLM)
+        if news_url and checkpoint.get("validated"):
+            print(f"♻️  URL новости уже проверен (чекпоинт)")
+        elif news_url:
+            from url_validator import validate_news_url
+            is_valid, error_msg = await run_blocking(validate_news_url, news_url)
+            if not is_valid:
+                print(f"❌ URL новости невалидный или недоступен: {error_msg}")
+                print(f"   URL: {news_url[:80]}...")
+                print(f"   ⚠️  Пропускаем эту новость (возможно, она выдумана или ссылка битая)")
+                await run_blocking(abandon_checkpoint, news_url, error_msg)
+                return False, failed_status
+            else:
+                print(f"✅ URL новости валиден и доступен")
+                await run_blocking(save_checkpoint, news_url, "validated", validated=True)
+        
+        # Генерация версий идет параллельно с загрузкой изображения
+        if checkpoint.get("versions"):
+            print(f"♻️  Версии поста из чекпоинта (без повторного вызова LLM)")
+            versions = checkpoint["versions"]
+        else:
+            # При потоковой генерации Telegram публикуется, как только готова tg_version,
+            # не дожидаясь более длинной Web версии
+            loop = asyncio.get_running_loop()
+            tg_ready = loop.create_future()
             
-            # Фильтруем технические теги - добавляем только те, которых нет
-            new_tags = []
-            for tag in technical_tags:
-                if tag.lower() not in existing_tags:
-                    new_tags.append(tag)
+            def on_tg_version(text: str):
+                loop.call_soon_threadsafe(lambda: tg_ready.done() or tg_ready.set_result(text))
             
-            # Добавляем новые технические теги в Telegram версию
-            if new_tags:
-                tags_str = " " + " ".join(new_tags)
-                if '<a href' in tg_version:
-                    source_link_pos = tg_version.rfind('<a href')
-                    tg_version = tg_version[:source_link_pos].rstrip() + tags_str + "\n\n" + tg_version[source_link_pos:]
-                else:
-                    tg_version = tg_version.rstrip() + tags_str
-                print(f"   🏷️  Добавлены технические теги в Telegram: {', '.join(new_tags)}")
+            generation_task = asyncio.create_task(
+                generate_news_versions(news, on_tg_version if STREAM_POST_VERSIONS else None))
+            await asyncio.wait({tg_ready, generation_task}, return_when=asyncio.FIRST_COMPLETED)
             
-            # Используем tg_version для Telegram публикации
-            analysis_text = tg_version
+            if tg_ready.done() and not checkpoint.get("tg_message_id"):
+                print(f"⚡ Публикую Telegram до завершения генерации Web версии")
+                publish_tasks["telegram"] = asyncio.create_task(_checkpointed_publish(
+                    news_url, "telegram", "tg_message_id",
+                    publish_news_to_telegram(news, tg_ready.result(), media_task)))
             
-        except Exception as e:
-            print(f"❌ Ошибка генерации версий поста: {e}")
-            # Fallback: используем старый метод
-            print(f"   ⚠️  Использую fallback: создаю одну версию для Telegram")
-            try:
-                analysis_text = create_coal_analysis(news)
-                category = extract_category_from_post(analysis_text)
-                web_version = f"<h1>{news_title}</h1><p>{news.get('summary', '')}</p>"
-            except Exception as e2:
-                print(f"❌ Ошибка fallback создания поста: {e2}")
-                return False, {
-                    "news_title": news_title,
-                    "telegram_status": False,
-                    "web_status": False,
-                    "news_url": news_url
-                }
+            versions = await generation_task
+            if not versions:
+                return False, failed_status
+            await run_blocking(save_checkpoint, news_url, "generated", versions=versions)
         
-        # Инициализируем переменные для версий (на случай fallback)
-        if 'web_version' not in locals():
-            web_version = f"<h1>{news_title}</h1><p>{news.get('summary', '')}</p>"
+        tg_version = versions["tg_version"]
+        web_version = versions["web_version"]
+        category = versions["category"]
         
         # Инициализируем БД для метаданных
         init_database()
         
-        # Публикуем на всех платформах последовательно
-        tg_message_id = None
-        linkedin_post_id = None
-        web_article_url = None
-        
-        # 1. Telegram
-        try:
-            print(f"\n📱 Публикация в Telegram...")
-            if media_path and media_path.exists():
-                print(f"   Изображение: {media_path} ({media_path.stat().st_size / 1024:.1f} KB)")
-            
-            telegram_success = await send_message_via_bot_api(analysis_text, TG_TARGET_CHANNEL, media_path)
-            
-            if telegram_success:
-                tg_message_id = "published"
-                print(f"✅ Опубликовано в Telegram канал {TG_TARGET_CHANNEL}")
-            else:
-                print(f"❌ Не удалось опубликовать в Telegram (продолжаем с другими платформами)")
-        except Exception as e:
-            print(f"❌ Ошибка публикации в Telegram: {e}")
-            import traceback
-            print(traceback.format_exc())
-        
-        # 2. LinkedIn (отключено)
+        # LinkedIn (отключено)
         linkedin_post_id = None
         print(f"\n💼 Публикация в LinkedIn отключена")
         
-        # 3. Notion (единый источник правды)
-        web_status = False
-        web_article_url = None
-        notion_page_id = None
-        try:
-            print(f"\n📝 Публикация в Notion...")
-            from notion_publisher import create_notion_page
-            
-            # Получаем URL изображения для Notion
-            image_url_for_notion = None
-            if media_path and media_path.exists():
-                # Для Notion нужен публичный URL, поэтому сначала публикуем изображение
-                # Временно используем прямой путь или загружаем в публичное хранилище
-                # Пока используем None, можно добавить загрузку в S3/CDN позже
-                pass
-            
-            notion_page_id = create_notion_page(news, tg_version, web_version, image_url_for_notion)
-            if notion_page_id:
-                print(f"✅ Опубликовано в Notion: {notion_page_id}")
-                # Формируем URL для Notion страницы (будет доступен после синхронизации)
-                # Временный URL, реальный будет после синхронизации через GitHub Actions
-                web_article_url = f"notion:{notion_page_id}"
-                web_status = True  # Notion публикация считается успешной публикацией на веб
-            else:
-                print(f"❌ Не удалось опубликовать в Notion")
-                web_status = False
-        except Exception as e:
-            print(f"❌ Ошибка публикации в Notion: {e}")
-            import traceback
-            print(traceback.format_exc())
-            web_status = False
+        # Telegram ждет изображение, Notion стартует сразу - публикуем параллельно.
+        # Возвращаемся, как только успешна первая платформа; вторая завершается в фоне,
+        # а неудачи сохраняются в outbox и повторяются воркером.
+        # Синхронизация Notion → GitHub Pages выполняется отдельно (notion_sync.py через GitHub Actions),
+        # после нее web_article_url будет обновлен на реальный URL GitHub Pages
+        # Уже выполненные публикации (по чекпоинту) не повторяются
+        if "telegram" in publish_tasks:
+            telegram_coro = None  # Уже публикуется по потоковой tg_version
+        elif checkpoint.get("tg_message_id"):
+            print(f"♻️  Telegram уже опубликован (чекпоинт)")
+            telegram_coro = _resolved(checkpoint["tg_message_id"])
+        else:
+            telegram_coro = _checkpointed_publish(news_url, "telegram", "tg_message_id",
+                                                  publish_news_to_telegram(news, tg_version, media_task))
+        if checkpoint.get("notion_page_id"):
+            print(f"♻️  Notion уже опубликован (чекпоинт)")
+            notion_coro = _resolved(checkpoint["notion_page_id"])
+        else:
+            notion_coro = _checkpointed_publish(news_url, "notion", "notion_page_id",
+                                                publish_news_to_notion(news, tg_version, web_version))
         
-        # 4. Синхронизация Notion → GitHub Pages (опционально, можно запускать отдельно)
-        # Это можно делать по расписанию или через webhook
-        # Для автоматизации создан отдельный скрипт notion_sync.py
-        # GitHub Actions workflow автоматически синхронизирует каждый час
-        # После синхронизации web_article_url будет обновлен на реальный URL GitHub Pages
+        if telegram_coro is not None:
+            publish_tasks["telegram"] = asyncio.create_task(telegram_coro)
+        publish_tasks["web"] = asyncio.create_task(notion_coro)
+        pending = set(publish_tasks.values())
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            if any(_publish_result(task) for task in done):
+                break
         
-        # Удаляем изображение после публикации на всех платформах
-        if media_path and media_path.exists():
-            try:
-                media_path.unlink()
-                print(f"\n🗑️  Изображение удалено после публикации")
-            except (OSError, FileNotFoundError) as e:
-                print(f"   ⚠️  Не удалось удалить изображение: {e}")
+        tg_message_id = _publish_result(publish_tasks["telegram"]) if publish_tasks["telegram"].done() else None
+        notion_page_id = _publish_result(publish_tasks["web"]) if publish_tasks["web"].done() else None
+        web_article_url = f"notion:{notion_page_id}" if notion_page_id else None
         
         # Сохраняем метаданные в БД
         if news_url:
@@ -657,40 +981,35 @@ async def process_news(news: dict):
             if web_article_url:
                 print(f"   Web: ✅ ({web_article_url})")
         
-        # Формируем статус для возврата
-        telegram_status = bool(tg_message_id)
-        web_status = bool(web_article_url)
+        # Оставшиеся публикации завершаются в фоне и дописывают результат в БД,
+        # чекпоинт закрывается только после завершения всех публикаций
+        still_publishing = False
+        for platform, task in publish_tasks.items():
+            if not task.done():
+                still_publishing = True
+                print(f"   {platform}: ⏳ продолжается в фоне")
+                background = asyncio.create_task(_finish_publication(task, news_url, platform))
+                _background_publications.add(background)
+                background.add_done_callback(_background_publications.discard)
+        if not still_publishing:
+            await run_blocking(complete_checkpoint, news_url)
         
+        # Формируем статус для возврата
+        # Платформа, публикация на которой продолжается в фоне, - в статусе "ожидает" (None)
         status_info = {
             "news_title": news_title,
-            "telegram_status": telegram_status,
-            "web_status": web_status,
+            "telegram_status": bool(tg_message_id) if publish_tasks["telegram"].done() else None,
+            "web_status": bool(web_article_url) if publish_tasks["web"].done() else None,
             "news_url": news_url
         }
         
         # Проверяем успешность хотя бы одной публикации
-        if tg_message_id or linkedin_post_id or web_article_url:
+        success = bool(tg_message_id or linkedin_post_id or web_article_url)
+        if success:
             print(f"\n✅ Новость обработана и опубликована на платформах")
         else:
             print(f"\n❌ Не удалось опубликовать ни на одной платформе")
         
-        # Очистка старых изображений (старше 7 дней)
-        try:
-            MEDIA_DIR = Path("output/media")
-            if MEDIA_DIR.exists():
-                cutoff_time = datetime.now() - timedelta(days=7)
-                for img_file in MEDIA_DIR.glob("news_*.*"):
-                    try:
-                        if img_file.stat().st_mtime < cutoff_time.timestamp():
-                            img_file.unlink()
-                            print(f"   🗑️  Удалено старое изображение: {img_file.name}")
-                    except (OSError, FileNotFoundError):
-                        pass
-        except Exception as e:
-            print(f"   ⚠️  Ошибка при очистке старых изображений: {e}")
-        
-        # Возвращаем результат
-        success = bool(tg_message_id or linkedin_post_id or web_article_url)
         return success, status_info
         
     except Exception as e:
@@ -703,6 +1022,57 @@ async def process_news(news: dict):
             "web_status": False,
             "news_url": news.get("source_url", "")
         }
+    finally:
+        # Если публикация продолжается в фоне, изображение удаляем только после нее
+        still_publishing = [task for task in publish_tasks.values() if not task.done()]
+        if still_publishing:
+            cleanup = asyncio.create_task(cleanup_news_media(media_task, still_publishing))
+            _background_publications.add(cleanup)
+            cleanup.add_done_callback(_background_publications.discard)
+        else:
+            await cleanup_news_media(media_task)
+
+
+async def cleanup_news_media(media_task: Optional["asyncio.Task"], wait_for: Optional[list] = None):
+    """
+    Удаляет изображение текущей новости и изображения старше 7 дней.
+    
+    Args:
+        media_task: Задача загрузки изображения (может быть еще не завершена)
+        wait_for: Задачи публикации, которые нужно дождаться перед удалением
+    """
+    if wait_for:
+        await asyncio.gather(*wait_for, return_exceptions=True)
+    
+    # Изображение удаляем после публикации на всех платформах (или после отказа от новости)
+    if media_task is not None:
+        if not media_task.done():
+            media_task.cancel()
+        try:
+            media_path = await media_task
+        except (asyncio.CancelledError, Exception):
+            media_path = None
+        if media_path and media_path.exists():
+            try:
+                media_path.unlink()
+                print(f"\n🗑️  Изображение удалено после публикации")
+            except (OSError, FileNotFoundError) as e:
+                print(f"   ⚠️  Не удалось удалить изображение: {e}")
+    
+    # Очистка старых изображений (старше 7 дней)
+    try:
+        MEDIA_DIR = Path("output/media")
+        if MEDIA_DIR.exists():
+            cutoff_time = datetime.now() - timedelta(days=7)
+            for img_file in MEDIA_DIR.glob("news_*.*"):
+                try:
+                    if img_file.stat().st_mtime < cutoff_time.timestamp():
+                        img_file.unlink()
+                        print(f"   🗑️  Удалено старое изображение: {img_file.name}")
+                except (OSError, FileNotFoundError):
+                    pass
+    except Exception as e:
+        print(f"   ⚠️  Ошибка при очистке старых изображений: {e}")
 
 
 async def run_once():
@@ -743,8 +1113,10 @@ async def run_once():
     if should_generate_freight_post():
         print(f"🚢 Генерация специального поста о фрахте (счетчик постов: {post_count})...")
         try:
-            # Генерируем специальный пост о фрахте
-            versions = generate_freight_post()
+            # Берем готовый пост из пакетной генерации, иначе генерируем интерактивно
+            versions = await run_blocking(take_batched_freight_post)
+            if versions is None:
+                versions = await run_blocking(generate_freight_post)
             
             tg_version = versions.get("tg_version", "")
             web_version = versions.get("web_version", "")
@@ -777,29 +1149,21 @@ async def run_once():
                 if bot:
                     await bot.shutdown()
             
-            # Публикуем в Notion
-            try:
-                from notion_publisher import create_notion_page
-                
-                # Создаем структуру новости для Notion
-                freight_news = {
-                    "title": "Freight Challenges for Bulk Trading Companies",
-                    "summary": "Analytical post about freight logistics challenges and solutions",
-                    "source_url": "",
-                    "source_name": "Bench Energy Analysis",
-                    "category": "Freight"
-                }
-                
-                # LinkedIn версия не нужна, передаем пустую строку
-                notion_page_id = create_notion_page(freight_news, tg_version, web_version, None)
-                if notion_page_id:
-                    print(f"✅ Специальный пост о фрахте опубликован в Notion: {notion_page_id}")
-                else:
-                    print(f"⚠️  Не удалось опубликовать специальный пост в Notion")
-            except Exception as e:
-                print(f"❌ Ошибка публикации специального поста в Notion: {e}")
-                import traceback
-                print(traceback.format_exc())
+            # Публикуем в Notion (при неудаче публикация сохраняется в outbox)
+            # Создаем структуру новости для Notion
+            freight_news = {
+                "title": "Freight Challenges for Bulk Trading Companies",
+                "summary": "Analytical post about freight logistics challenges and solutions",
+                "source_url": "",
+                "source_name": "Bench Energy Analysis",
+                "category": "Freight"
+            }
+            
+            notion_page_id = await publish_news_to_notion(freight_news, tg_version, web_version)
+            if notion_page_id:
+                print(f"✅ Специальный пост о фрахте опубликован в Notion: {notion_page_id}")
+            else:
+                print(f"⚠️  Не удалось опубликовать специальный пост в Notion (сохранен в outbox)")
             
             # Отправляем статус администратору
             await send_status_to_admin(
@@ -835,63 +1199,69 @@ async def run_once():
     print(f"📊 Счетчик постов: {post_count}")
     
     try:
-        # Ищем новости
-        news_list = search_coal_news()
+        # Если предыдущий запуск упал посреди обработки, продолжаем с последнего этапа
+        resumable = await run_blocking(get_resumable_checkpoint)
+        if resumable:
+            print(f"♻️  Возобновляю обработку новости (этап: {resumable.get('stage')}, попытка {resumable.get('resume_count')})")
+            best_news = resumable["candidate"]
+        else:
+            # Ищем новости
+            news_list = await run_blocking(search_coal_news)
         
-        if not news_list:
-            print("⚠️  Новости не найдены")
-            # Отправляем статус о том, что новости не найдены
-            await send_status_to_admin(
-                news_title="Новости не найдены",
-                telegram_status=False,
-                web_status=False,
-                news_url=""
-            )
-            return False
+            if not news_list:
+                print("⚠️  Новости не найдены")
+                # Отправляем статус о том, что новости не найдены
+                await send_status_to_admin(
+                    news_title="Новости не найдены",
+                    telegram_status=False,
+                    web_status=False,
+                    news_url=""
+                )
+                return False
         
-        print(f"📰 Найдено {len(news_list)} новостей")
+            print(f"📰 Найдено {len(news_list)} новостей")
         
-        # Сначала фильтруем опубликованные новости
-        init_database()  # Убеждаемся, что БД инициализирована
-        unpublished_news = []
-        for news in news_list:
-            news_url = news.get("source_url", "")
-            if news_url:
-                # Проверяем в обеих системах хранения
-                if not is_published(news_url) and not is_news_published(news_url):
-                    unpublished_news.append(news)
+            # Сначала фильтруем опубликованные новости
+            init_database()  # Убеждаемся, что БД инициализирована
+            unpublished_news = []
+            for news in news_list:
+                news_url = news.get("source_url", "")
+                if news_url:
+                    # Проверяем в обеих системах хранения
+                    if not is_published(news_url) and not is_news_published(news_url):
+                        unpublished_news.append(news)
+                    else:
+                        print(f"   ⏭️  Пропущена уже опубликованная: {news.get('title', '')[:50]}...")
                 else:
-                    print(f"   ⏭️  Пропущена уже опубликованная: {news.get('title', '')[:50]}...")
-            else:
-                # Если нет URL, все равно добавляем (но это редко)
-                unpublished_news.append(news)
+                    # Если нет URL, все равно добавляем (но это редко)
+                    unpublished_news.append(news)
         
-        if not unpublished_news:
-            print("⚠️  Все найденные новости уже опубликованы")
-            # Отправляем статус о том, что все новости уже опубликованы
-            await send_status_to_admin(
-                news_title="Все найденные новости уже опубликованы",
-                telegram_status=False,
-                web_status=False,
-                news_url=""
-            )
-            return False
+            if not unpublished_news:
+                print("⚠️  Все найденные новости уже опубликованы")
+                # Отправляем статус о том, что все новости уже опубликованы
+                await send_status_to_admin(
+                    news_title="Все найденные новости уже опубликованы",
+                    telegram_status=False,
+                    web_status=False,
+                    news_url=""
+                )
+                return False
         
-        print(f"📰 Неопубликованных новостей: {len(unpublished_news)} из {len(news_list)}")
+            print(f"📰 Неопубликованных новостей: {len(unpublished_news)} из {len(news_list)}")
         
-        # Выбираем лучшую новость среди неопубликованных
-        best_news = select_best_news(unpublished_news)
+            # Выбираем лучшую новость среди неопубликованных
+            best_news = await run_blocking(select_best_news, unpublished_news)
         
-        if not best_news:
-            print("⚠️  Не удалось выбрать новость для публикации")
-            # Отправляем статус о том, что не удалось выбрать новость
-            await send_status_to_admin(
-                news_title="Не удалось выбрать новость для публикации",
-                telegram_status=False,
-                web_status=False,
-                news_url=""
-            )
-            return False
+            if not best_news:
+                print("⚠️  Не удалось выбрать новость для публикации")
+                # Отправляем статус о том, что не удалось выбрать новость
+                await send_status_to_admin(
+                    news_title="Не удалось выбрать новость для публикации",
+                    telegram_status=False,
+                    web_status=False,
+                    news_url=""
+                )
+                return False
         
         # Обрабатываем новость
         success, status_info = await process_news(best_news)
@@ -907,6 +1277,9 @@ async def run_once():
         
         if success:
             print(f"✅ Новость успешно обработана и опубликована")
+            # Счетчик уже увеличен, если новость была частично опубликована до падения
+            if resumable and (resumable.get("tg_message_id") or resumable.get("notion_page_id")):
+                return True
             # Увеличиваем счетчик постов после успешной публикации
             new_count = increment_post_count()
             # Показываем, через сколько постов будет следующий специальный пост
@@ -926,6 +1299,40 @@ async def run_once():
         return False
 
 
+async def process_batch_jobs():
+    """
+    Пакетная генерация несрочного контента. Выполняется после публикации, чтобы
+    локальные задания (до 180 секунд каждое) не задерживали ежечасный запуск:
+    ставит в очередь следующий пост о фрахте, отправляет очередь, собирает готовые
+    результаты и публикует ежемесячный прогноз, если его задание завершилось.
+    """
+    if not is_batch_enabled():
+        return
+    
+    try:
+        await run_blocking(queue_freight_post)
+        await run_blocking(process_batch_queue)
+        await publish_ready_forecasts()
+    except Exception as e:
+        # Очередь хранится в БД: следующий запуск повторит обработку
+        print(f"⚠️  Ошибка пакетной генерации: {e}")
+
+
+async def run_once_with_outbox():
+    """
+    Одиночный запуск (для systemd timer): повторяет публикации из outbox
+    параллельно с основным запуском, дожидается фоновых публикаций и после них
+    обрабатывает пакетную очередь.
+    """
+    outbox_task = asyncio.create_task(process_outbox(OUTBOX_HANDLERS))
+    try:
+        return await run_once()
+    finally:
+        await drain_background_publications()
+        await process_batch_jobs()
+        await asyncio.gather(outbox_task, return_exceptions=True)
+
+
 async def main_loop():
     """
     Основной цикл бота (режим polling).
@@ -966,6 +1373,9 @@ async def main_loop():
     print("=" * 60)
     print()
     
+    # Фоновый воркер повторяет неудачные публикации из outbox
+    outbox_task = asyncio.create_task(outbox_worker(OUTBOX_HANDLERS))
+    
     while True:
         try:
             success = await run_once()
@@ -975,6 +1385,8 @@ async def main_loop():
             else:
                 print(f"⚠️  Проверка завершена с предупреждениями")
             
+            await process_batch_jobs()
+            
             # Ждем перед следующей проверкой
             print(f"⏳ Ожидание {POLL_SECONDS} секунд до следующей проверки...\n")
             await asyncio.sleep(POLL_SECONDS)
@@ -987,6 +1399,8 @@ async def main_loop():
             import traceback
             print(f"📋 Traceback: {traceback.format_exc()}")
             await asyncio.sleep(POLL_SECONDS)
+    
+    outbox_task.cancel()
 
 
 if __name__ == "__main__":
@@ -995,7 +1409,7 @@ if __name__ == "__main__":
     # Проверяем флаг --once
     if "--once" in sys.argv:
         print("🚀 Запуск в режиме одного запуска (для systemd timer)")
-        asyncio.run(run_once())
+        asyncio.run(run_once_with_outbox())
     else:
         print("🚀 Запуск в режиме polling")
         asyncio.run(main_loop())
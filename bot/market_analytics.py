@@ -0,0 +1,174 @@
+"""
+Векторная аналитика по истории цен бенчмарков (NumPy).
+За один проход по матрице бенчмарки × дни считает скользящие средние,
+волатильность, z-оценки, месячную динамику и статистику региональных спредов.
+Готовые цифры передаются в промпты ежедневной сводки и месячного прогноза,
+чтобы модель не пересчитывала их и не выдумывала.
+"""
+import warnings
+from datetime import date
+from typing import Dict, Optional
+
+import numpy as np
+
+from market_timeseries import PriceHistory, load_history
+from market_data_collector import MARKET_SPREADS
+
+# Окна скользящих расчетов (календарные дни)
+SHORT_WINDOW = 7
+LONG_WINDOW = 30
+
+
+def _forward_fill(values: np.ndarray) -> np.ndarray:
+    """Заполняет пропуски последним известным значением по строкам."""
+    columns = np.arange(values.shape[1])
+    last_seen = np.where(~np.isnan(values), columns[None, :], 0)
+    np.maximum.accumulate(last_seen, axis=1, out=last_seen)
+    filled = values[np.arange(values.shape[0])[:, None], last_seen]
+    # До первого наблюдения значений нет
+    seen = np.maximum.accumulate(~np.isnan(values), axis=1)
+    return np.where(seen, filled, np.nan)
+
+
+def _nan_stat(func, values: np.ndarray) -> np.ndarray:
+    """Применяет nan-статистику по строкам без предупреждений для пустых строк."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        return func(values, axis=1)
+
+
+def _clean(value: float, digits: int = 2) -> Optional[float]:
+    """Округляет значение; NaN/inf → None."""
+    return round(float(value), digits) if np.isfinite(value) else None
+
+
+def compute_market_analytics(history: PriceHistory, day: Optional[str] = None) -> Dict:
+    """
+    Считает аналитику по всем бенчмаркам и спредам истории.
+
+    Args:
+        history: История цен (load_history)
+        day: Дата расчета (YYYY-MM-DD), по умолчанию последний день истории
+
+    Returns:
+        Словарь:
+        - benchmarks: {имя: {last, ma_7, ma_30, volatility_30, z_score_30,
+          month_avg, prev_month_avg, mom_pct, month_high, month_low}}
+        - spreads: {имя: {value, mean_30, z_score_30}}
+        (None там, где данных недостаточно)
+    """
+    end = history.column(day) if day else len(history.dates)
+    values = history.values[:, :end]
+    dates = history.dates[:end]
+    if values.shape[1] == 0:
+        return {"benchmarks": {}, "spreads": {}}
+
+    observed = ~np.isnan(values)
+    filled = _forward_fill(values)
+    last = filled[:, -1]
+
+    short = filled[:, -SHORT_WINDOW:]
+    long = filled[:, -LONG_WINDOW:]
+    ma_short = _nan_stat(np.nanmean, short)
+    ma_long = _nan_stat(np.nanmean, long)
+    std_long = _nan_stat(np.nanstd, long)
+
+    # Дневные изменения в % только для дней с фактическим наблюдением
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.diff(filled, axis=1) / filled[:, :-1] * 100
+    returns = np.where(observed[:, 1:], returns, np.nan)[:, -LONG_WINDOW:]
+    volatility = _nan_stat(np.nanstd, returns)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z_score = (last - ma_long) / std_long
+
+    # Месяц к месяцу: средние наблюдений текущего и предыдущего календарного месяца
+    months = dates.astype("datetime64[M]")
+    current_month = months[-1]
+    in_month = observed & (months == current_month)[None, :]
+    in_prev_month = observed & (months == current_month - 1)[None, :]
+    month_avg = _nan_stat(np.nanmean, np.where(in_month, values, np.nan))
+    prev_month_avg = _nan_stat(np.nanmean, np.where(in_prev_month, values, np.nan))
+    month_high = _nan_stat(np.nanmax, np.where(in_month, values, np.nan))
+    month_low = _nan_stat(np.nanmin, np.where(in_month, values, np.nan))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mom_pct = (month_avg - prev_month_avg) / prev_month_avg * 100
+
+    benchmarks = {}
+    for i, name in enumerate(history.names):
+        if not observed[i].any():
+            continue
+        benchmarks[name] = {
+            "last": _clean(last[i]),
+            "ma_7": _clean(ma_short[i]),
+            "ma_30": _clean(ma_long[i]),
+            "volatility_30": _clean(volatility[i]),
+            "z_score_30": _clean(z_score[i]),
+            "month_avg": _clean(month_avg[i]),
+            "prev_month_avg": _clean(prev_month_avg[i]),
+            "mom_pct": _clean(mom_pct[i], 1),
+            "month_high": _clean(month_high[i]),
+            "month_low": _clean(month_low[i]),
+        }
+
+    # Региональные спреды (Newcastle vs ARA vs Richards Bay) по заполненным рядам
+    spreads = {}
+    for name, left, right in MARKET_SPREADS:
+        if left not in history or right not in history:
+            continue
+        series = (filled[history.names.index(left)] - filled[history.names.index(right)])[-LONG_WINDOW:]
+        if np.isnan(series[-1]):
+            continue
+        mean = np.nanmean(series)
+        std = np.nanstd(series)
+        spreads[name] = {
+            "value": _clean(series[-1]),
+            "mean_30": _clean(mean),
+            "z_score_30": _clean((series[-1] - mean) / std) if std > 0 else None,
+        }
+
+    return {"benchmarks": benchmarks, "spreads": spreads}
+
+
+def format_analytics(analytics: Dict) -> str:
+    """
+    Форматирует аналитику компактными строками для промпта.
+
+    Args:
+        analytics: Результат compute_market_analytics
+
+    Returns:
+        Текст (пустая строка, если данных нет)
+    """
+    labels = [("last", "last", "{:.2f}"), ("ma_7", "MA7", "{:.2f}"), ("ma_30", "MA30", "{:.2f}"),
+              ("volatility_30", "vol30", "{:.2f}%/d"), ("z_score_30", "z30", "{:+.1f}"),
+              ("month_low", "month low", "{:.2f}"), ("month_high", "month high", "{:.2f}"),
+              ("mom_pct", "MoM", "{:+.1f}%")]
+    lines = []
+    for name, stats in analytics.get("benchmarks", {}).items():
+        parts = [f"{label} {fmt.format(stats[key])}" for key, label, fmt in labels if stats.get(key) is not None]
+        lines.append(f"{name}: " + " | ".join(parts))
+    for name, stats in analytics.get("spreads", {}).items():
+        parts = [f"{stats['value']:+.2f}"]
+        if stats.get("mean_30") is not None:
+            parts.append(f"mean30 {stats['mean_30']:+.2f}")
+        if stats.get("z_score_30") is not None:
+            parts.append(f"z30 {stats['z_score_30']:+.1f}")
+        lines.append(f"Spread {name}: " + " | ".join(parts))
+    return "\n".join(lines)
+
+
+def get_market_analytics_text(day: Optional[str] = None, days: int = 90) -> str:
+    """
+    Загружает историю и возвращает отформатированную аналитику на дату.
+
+    Args:
+        day: Дата расчета (YYYY-MM-DD), по умолчанию сегодня
+        days: Глубина истории в днях (нужна для месячной динамики)
+
+    Returns:
+        Текст аналитики (пустая строка, если истории нет)
+    """
+    day = day or date.today().isoformat()
+    history = load_history(days=days, end_date=day)
+    return format_analytics(compute_market_analytics(history, day))
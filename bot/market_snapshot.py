@@ -0,0 +1,154 @@
+"""
+Кэш снимка рыночных данных за день.
+Результат дорогого сбора (Gemini + Google Search) сохраняется в SQLite и
+переиспользуется в пределах окна свежести: повторная генерация сводки после
+сбоя Telegram, ручной перезапуск, новостной пайплайн и прогноз читают снимок
+без новых поисковых запросов. Снимок можно явно инвалидировать.
+"""
+import os
+import json
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+from published_news_db import get_connection
+
+load_dotenv()
+
+# Окно свежести снимка (часы); снимок прошлого дня не используется в любом случае
+MARKET_SNAPSHOT_MAX_AGE_HOURS = float(os.getenv("MARKET_SNAPSHOT_MAX_AGE_HOURS", "12"))
+
+
+def init_snapshot_db():
+    """Создает таблицу market_snapshots если её нет."""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS market_snapshots (
+            date TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            collected_at TIMESTAMP NOT NULL,
+            invalidated INTEGER DEFAULT 0
+        )
+    """)
+
+    conn.commit()
+    conn.close()
+
+
+def save_snapshot(market_data: Dict):
+    """
+    Сохраняет снимок рыночных данных за его дату (перезаписывает предыдущий).
+
+    Args:
+        market_data: Результат collect_coal_market_data
+    """
+    init_snapshot_db()
+    day = market_data.get("date") or datetime.now().strftime("%Y-%m-%d")
+    conn = get_connection()
+    conn.execute("""
+        INSERT OR REPLACE INTO market_snapshots (date, data, collected_at, invalidated)
+        VALUES (?, ?, ?, 0)
+    """, (day, json.dumps(market_data, ensure_ascii=False), datetime.now().isoformat()))
+    conn.commit()
+    conn.close()
+
+
+def get_snapshot(max_age_hours: Optional[float] = None) -> Optional[Dict]:
+    """
+    Возвращает свежий снимок за сегодня.
+
+    Args:
+        max_age_hours: Окно свежести (по умолчанию MARKET_SNAPSHOT_MAX_AGE_HOURS)
+
+    Returns:
+        Данные рынка (с полем snapshot_collected_at) или None, если свежего снимка нет
+    """
+    if max_age_hours is None:
+        max_age_hours = MARKET_SNAPSHOT_MAX_AGE_HOURS
+
+    init_snapshot_db()
+    conn = get_connection()
+    row = conn.execute("SELECT * FROM market_snapshots WHERE date = ? AND invalidated = 0",
+                       (datetime.now().strftime("%Y-%m-%d"),)).fetchone()
+    conn.close()
+    if not row:
+        return None
+
+    collected_at = datetime.fromisoformat(row["collected_at"])
+    if datetime.now() - collected_at > timedelta(hours=max_age_hours):
+        return None
+
+    market_data = json.loads(row["data"])
+    market_data["snapshot_collected_at"] = row["collected_at"]
+    return market_data
+
+
+def invalidate_snapshot(day: Optional[str] = None):
+    """
+    Помечает снимок недействительным (следующий запрос соберет данные заново).
+
+    Args:
+        day: Дата снимка (YYYY-MM-DD), по умолчанию сегодня
+    """
+    init_snapshot_db()
+    conn = get_connection()
+    conn.execute("UPDATE market_snapshots SET invalidated = 1 WHERE date = ?",
+                 (day or datetime.now().strftime("%Y-%m-%d"),))
+    conn.commit()
+    conn.close()
+    print(f"🗑️  Снимок рыночных данных инвалидирован")
+
+
+def get_market_data(force_refresh: bool = False) -> Dict:
+    """
+    Возвращает рыночные данные: свежий снимок или новый сбор (с сохранением снимка).
+    Пустой результат сбора не кэшируется.
+
+    Args:
+        force_refresh: Игнорировать снимок и собрать данные заново
+
+    Returns:
+        Словарь с данными рынка (формат collect_coal_market_data)
+    """
+    if not force_refresh:
+        snapshot = get_snapshot()
+        if snapshot:
+            print(f"♻️  Использую снимок рыночных данных от {snapshot['snapshot_collected_at'][:16]} "
+                  f"(без новых поисковых запросов)")
+            return snapshot
+
+    # Импорт здесь: читателям снимка (новости, прогноз) не нужен модуль сбора
+    from market_data_collector import collect_coal_market_data
+
+    market_data = collect_coal_market_data()
+    if market_data.get("benchmarks"):
+        save_snapshot(market_data)
+    return market_data
+
+
+def format_snapshot_context(market_data: Optional[Dict]) -> str:
+    """
+    Короткая строка с текущими ценами бенчмарков для промптов.
+
+    Args:
+        market_data: Снимок (get_snapshot) или None
+
+    Returns:
+        Строка вида 'API2 (EU CIF ARA 6000) 96.00 USD/t; ...' или пустая строка
+    """
+    if not market_data:
+        return ""
+    prices = []
+    for benchmark in market_data.get("benchmarks") or []:
+        if not isinstance(benchmark, dict) or not benchmark.get("name") or benchmark.get("value") is None:
+            continue
+        # Модель может вернуть значение строкой ("~120", "n/a"): нечисловые значения пропускаются
+        try:
+            value = float(str(benchmark["value"]).replace(",", "").strip(" ~$"))
+        except ValueError:
+            continue
+        prices.append(f"{benchmark['name']} {value:.2f} USD/t")
+    return "; ".join(prices)
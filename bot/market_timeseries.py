@@ -0,0 +1,238 @@
+"""
+Локальное хранилище временных рядов цен угольных бенчмарков.
+Каждый результат сбора рыночных данных сохраняется в SQLite с ключом
+(benchmark, date); для расчетов история загружается в матрицу NumPy
+(бенчмарки × дни), по которой изменения считаются локально, без LLM.
+"""
+from datetime import datetime, date, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from published_news_db import get_connection
+
+
+def init_timeseries_db():
+    """Создает таблицу market_prices если её нет."""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS market_prices (
+            benchmark TEXT NOT NULL,
+            date TEXT NOT NULL,
+            value REAL NOT NULL,
+            collected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (benchmark, date)
+        )
+    """)
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_market_prices_date ON market_prices(date)
+    """)
+
+    conn.commit()
+    conn.close()
+
+
+def _price_date(reported: Optional[str], default: str) -> str:
+    """Дата цены из ответа (если источник дал вчерашнюю цену), иначе дата сбора."""
+    try:
+        reported_date = date.fromisoformat(str(reported)[:10])
+    except ValueError:
+        return default
+    default_date = date.fromisoformat(default)
+    # Будущие и слишком старые даты считаем ошибкой модели
+    if default_date - timedelta(days=7) <= reported_date <= default_date:
+        return reported_date.isoformat()
+    return default
+
+
+def store_market_data(market_data: Dict) -> int:
+    """
+    Сохраняет цены бенчмарков из результата collect_coal_market_data.
+    Повторный сбор за тот же день перезаписывает значение.
+
+    Args:
+        market_data: Словарь с ключами benchmarks (name, value, опционально date цены) и date (YYYY-MM-DD)
+
+    Returns:
+        Количество сохраненных значений
+    """
+    day = market_data.get("date") or datetime.now().strftime("%Y-%m-%d")
+    rows = []
+    for benchmark in market_data.get("benchmarks", []):
+        try:
+            value = float(benchmark.get("value"))
+        except (TypeError, ValueError):
+            continue
+        if benchmark.get("name") and np.isfinite(value):
+            rows.append((benchmark["name"], _price_date(benchmark.get("date"), day), value,
+                         datetime.now().isoformat()))
+
+    if not rows:
+        return 0
+
+    init_timeseries_db()
+    conn = get_connection()
+    conn.executemany("""
+        INSERT OR REPLACE INTO market_prices (benchmark, date, value, collected_at)
+        VALUES (?, ?, ?, ?)
+    """, rows)
+    conn.commit()
+    conn.close()
+    return len(rows)
+
+
+class PriceHistory:
+    """
+    Представление истории цен в виде матрицы NumPy.
+
+    Attributes:
+        names: Названия бенчмарков (строки матрицы)
+        dates: Календарные дни (столбцы матрицы), numpy datetime64[D]
+        values: Матрица цен (len(names) × len(dates)), NaN - нет данных за день
+    """
+
+    def __init__(self, names: List[str], dates: np.ndarray, values: np.ndarray):
+        self.names = names
+        self.dates = dates
+        self.values = values
+        self._index = {name: i for i, name in enumerate(names)}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._index
+
+    def series(self, name: str) -> np.ndarray:
+        """Ряд цен бенчмарка по дням (NaN - нет данных)."""
+        return self.values[self._index[name]]
+
+    def last_index_before(self, limits: np.ndarray) -> np.ndarray:
+        """
+        Индексы последних известных цен каждого бенчмарка левее границы.
+
+        Args:
+            limits: Граница (исключительно) для каждой строки или одна на все строки
+
+        Returns:
+            Вектор индексов столбцов (-1, если данных нет)
+        """
+        columns = np.arange(len(self.dates))
+        mask = ~np.isnan(self.values) & (columns[None, :] < np.broadcast_to(limits, len(self.names))[:, None])
+        # Последний True в строке: argmax по развернутой строке
+        last = len(self.dates) - 1 - np.argmax(mask[:, ::-1], axis=1)
+        return np.where(mask.any(axis=1), last, -1)
+
+    def values_at(self, indexes: np.ndarray) -> np.ndarray:
+        """Цены по индексам столбцов для каждой строки (NaN для индекса -1)."""
+        result = self.values[np.arange(len(self.names)), np.maximum(indexes, 0)]
+        return np.where(indexes >= 0, result, np.nan)
+
+    def column(self, day) -> int:
+        """Индекс столбца, следующего за датой (граница 'на дату включительно')."""
+        return int(np.searchsorted(self.dates, np.datetime64(str(day), "D"), side="right"))
+
+
+def load_history(days: int = 400, end_date: Optional[str] = None,
+                 names: Optional[List[str]] = None) -> PriceHistory:
+    """
+    Загружает историю цен за период в матрицу NumPy.
+
+    Args:
+        days: Глубина истории в днях
+        end_date: Последний день (YYYY-MM-DD), по умолчанию сегодня
+        names: Только указанные бенчмарки (по умолчанию все)
+
+    Returns:
+        PriceHistory с календарной осью дат (пропуски - NaN)
+    """
+    end = date.fromisoformat(end_date) if end_date else date.today()
+    start = end - timedelta(days=days - 1)
+
+    init_timeseries_db()
+    conn = get_connection()
+    rows = conn.execute("""
+        SELECT benchmark, date, value FROM market_prices
+        WHERE date BETWEEN ? AND ?
+        ORDER BY benchmark, date
+    """, (start.isoformat(), end.isoformat())).fetchall()
+    conn.close()
+
+    if names is None:
+        names = sorted({row["benchmark"] for row in rows})
+    dates = np.arange(np.datetime64(start.isoformat(), "D"), np.datetime64(end.isoformat(), "D") + 1)
+    values = np.full((len(names), len(dates)), np.nan)
+
+    index = {name: i for i, name in enumerate(names)}
+    for row in rows:
+        if row["benchmark"] in index:
+            column = (np.datetime64(row["date"], "D") - dates[0]).astype(int)
+            values[index[row["benchmark"]], column] = row["value"]
+
+    return PriceHistory(names, dates, values)
+
+
+def compute_changes(history: PriceHistory, day: str) -> Dict[str, Dict]:
+    """
+    Считает изменения цен к предыдущему наблюдению (день к дню) и к неделе назад.
+    Предыдущее наблюдение - последнее до даты текущей цены (выходные пропускаются),
+    недельное - последнее не позже чем за 7 дней до неё.
+
+    Args:
+        history: История цен
+        day: Дата отчета (YYYY-MM-DD)
+
+    Returns:
+        Словарь {бенчмарк: {value, change, change_pct, change_1w, change_pct_1w}}
+        (None там, где нет данных)
+    """
+    # Текущая цена - последняя на дату отчета; сравнения ведутся от даты этой цены,
+    # чтобы цена, не обновившаяся с прошлого дня, не давала ложное "без изменений"
+    current_index = history.last_index_before(history.column(day))
+    current = history.values_at(current_index)
+    previous = history.values_at(history.last_index_before(current_index))
+    week_ago = history.values_at(history.last_index_before(current_index - 6))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = current - previous
+        change_pct = change / previous * 100
+        change_1w = current - week_ago
+        change_pct_1w = change_1w / week_ago * 100
+
+    def clean(value: float, digits: int) -> Optional[float]:
+        return round(float(value), digits) if np.isfinite(value) else None
+
+    return {
+        name: {
+            "value": clean(current[i], 2),
+            "change": clean(change[i], 2),
+            "change_pct": clean(change_pct[i], 1),
+            "change_1w": clean(change_1w[i], 2),
+            "change_pct_1w": clean(change_pct_1w[i], 1),
+        }
+        for i, name in enumerate(history.names)
+    }
+
+
+def apply_local_changes(market_data: Dict) -> Dict:
+    """
+    Заполняет изменения бенчмарков (день к дню и неделя к неделе) по локальной истории.
+
+    Args:
+        market_data: Результат collect_coal_market_data (изменяется на месте)
+
+    Returns:
+        Тот же словарь market_data
+    """
+    day = market_data.get("date") or datetime.now().strftime("%Y-%m-%d")
+    benchmarks = market_data.get("benchmarks", [])
+    # Текущие цены должны быть в истории (повторная запись за тот же день идемпотентна)
+    store_market_data(market_data)
+    history = load_history(days=30, end_date=day, names=[b["name"] for b in benchmarks if b.get("name")])
+    changes = compute_changes(history, day)
+
+    for benchmark in benchmarks:
+        local = changes.get(benchmark.get("name"), {})
+        for key in ("change", "change_pct", "change_1w", "change_pct_1w"):
+            benchmark[key] = local.get(key)
+    return market_data
@@ -7,12 +7,13 @@ import os
 import re
 from pathlib import Path
 from datetime import datetime
-from html import unescape
 from dotenv import load_dotenv
 from typing import Dict, Optional
 import requests
 import time
 
+from posts_index import parse_article_html, metadata_from_json, update_posts_index
+
 load_dotenv()
 
 NOTION_API_KEY = os.getenv("NOTION_API_KEY")
@@ -20,12 +21,13 @@ NOTION_DATABASE_ID = os.getenv("NOTION_DATABASE_ID")
 NOTION_API_URL = "https://api.notion.com/v1"
 SITE_URL = os.getenv("SITE_URL", "https://marfa77.github.io/bench-energy-news")
 
-def extract_article_data(html_file_path: Path) -> Optional[Dict]:
+def extract_article_data(html_file_path: Path, metadata: Optional[Dict] = None) -> Optional[Dict]:
     """
-    Извлекает данные статьи из HTML файла.
+    Извлекает данные статьи: метаданные из индекса статей, контент - из HTML файла.
     
     Args:
         html_file_path: Путь к HTML файлу
+        metadata: Метаданные статьи из индекса posts_index (если нет - HTML разбирается целиком)
         
     Returns:
         Словарь с данными статьи или None при ошибке
@@ -34,55 +36,9 @@ def extract_article_data(html_file_path: Path) -> Optional[Dict]:
         with open(html_file_path, 'r', encoding='utf-8') as f:
             content = f.read()
         
-        # Извлекаем заголовок
-        title_match = re.search(r'<title>(.*?)</title>', content, re.DOTALL)
-        if title_match:
-            title = unescape(title_match.group(1).strip())
-            title = re.sub(r'\s*\|\s*Bench Energy\s*$', '', title, flags=re.IGNORECASE)
-        else:
-            title = html_file_path.stem.replace('-', ' ').title()
-        
-        # Извлекаем описание
-        desc_match = re.search(r'<meta name="description" content="([^"]+)"', content)
-        description = ""
-        if desc_match:
-            description = unescape(desc_match.group(1).strip())
-        else:
-            # Fallback: первый параграф из контента
-            content_match = re.search(r'<div class="content">(.*?)</div>', content, re.DOTALL)
-            if content_match:
-                p_match = re.search(r'<p[^>]*>(.*?)</p>', content_match.group(1), re.DOTALL)
-                if p_match:
-                    description = re.sub(r'<[^>]+>', '', unescape(p_match.group(1).strip()))[:200]
-        
-        # Извлекаем дату публикации
-        date_match = re.search(r'<meta property="article:published_time" content="([^"]+)"', content)
-        published_date = datetime.now()
-        if date_match:
-            try:
-                date_str = date_match.group(1)
-                published_date = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-            except:
-                pass
-        
-        # Извлекаем источник
-        source_match = re.search(r'<strong>Source:</strong>\s*<a[^>]*href="([^"]+)"[^>]*>([^<]+)</a>', content)
-        source_url = ""
-        source_name = "Unknown"
-        if source_match:
-            source_url = source_match.group(1)
-            source_name = unescape(source_match.group(2).strip())
-        
-        # Извлекаем категорию
-        category_match = re.search(r'<meta property="article:section" content="([^"]+)"', content)
-        category = "Coal"
-        if category_match:
-            category = category_match.group(1)
-        else:
-            # Пробуем извлечь из badge
-            badge_match = re.search(r'<span class="category-badge">([^<]+)</span>', content)
-            if badge_match:
-                category = badge_match.group(1).strip()
+        if metadata is None:
+            metadata = parse_article_html(content, html_file_path.name, html_file_path.stat().st_mtime)
+        title = metadata["title"]
         
         # Извлекаем основной контент (web version)
         content_match = re.search(r'<div class="content">(.*?)</div>', content, re.DOTALL)
@@ -107,11 +63,11 @@ def extract_article_data(html_file_path: Path) -> Optional[Dict]:
         
         return {
             "title": title,
-            "description": description,
-            "published_date": published_date,
-            "source_url": source_url,
-            "source_name": source_name,
-            "category": category,
+            "description": metadata["description"],
+            "published_date": metadata["date"],
+            "source_url": metadata["origin_url"],
+            "source_name": metadata["origin_name"],
+            "category": metadata["section"],
             "web_content": web_content,
             "image_url": image_url,
             "slug": slug,
@@ -353,8 +309,9 @@ def migrate_articles_to_notion(posts_dir: Path):
         print(f"❌ Директория {posts_dir} не найдена")
         return
     
-    # Получаем все HTML файлы
-    html_files = list(posts_dir.glob("*.html"))
+    # Метаданные всех статей - из индекса (разбираются только новые и измененные файлы)
+    posts = update_posts_index(posts_dir.parent)
+    html_files = [posts_dir / name for name in posts]
     print(f"📁 Найдено {len(html_files)} HTML файлов")
     print()
     
@@ -363,7 +320,7 @@ def migrate_articles_to_notion(posts_dir: Path):
         return
     
     # Сортируем по дате модификации (старые сначала)
-    html_files.sort(key=lambda f: f.stat().st_mtime)
+    html_files.sort(key=lambda f: posts[f.name]["mtime"])
     
     migrated = 0
     skipped = 0
@@ -373,7 +330,7 @@ def migrate_articles_to_notion(posts_dir: Path):
         print(f"[{i}/{len(html_files)}] Обработка: {html_file.name}")
         
         # Извлекаем данные
-        article_data = extract_article_data(html_file)
+        article_data = extract_article_data(html_file, metadata_from_json(posts[html_file.name]))
         if not article_data:
             print(f"   ⚠️  Пропущено (ошибка извлечения данных)")
             errors += 1
@@ -0,0 +1,218 @@
+"""
+Маршрутизатор моделей LLM по типу задачи с бюджетом задержки и стоимости.
+Начинает с самой дешевой подходящей модели, переходит к более сильной, если
+ответ не прошел проверку, и к другому провайдеру, если текущий недоступен.
+Выбор адаптируется по статистике вызовов из журнала llm_calls.
+"""
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from llm_client import (chat_completion, gemini_generate, anthropic_message, get_breaker,
+                        get_model_stats, mark_call_invalid, estimate_cost, LLMError)
+
+load_dotenv()
+
+# Модели ниже этой доли успешных вызовов (за последние вызовы) переносятся в конец очереди
+LLM_ROUTER_MIN_SUCCESS_RATE = float(os.getenv("LLM_ROUTER_MIN_SUCCESS_RATE", "0.5"))
+# Минимум вызовов, после которого статистика модели учитывается
+LLM_ROUTER_MIN_SAMPLES = int(os.getenv("LLM_ROUTER_MIN_SAMPLES", "5"))
+
+_DAILY_REPORT_MODEL = os.getenv("ANTHROPIC_MODEL", "anthropic/claude-3.5-haiku")
+if not _DAILY_REPORT_MODEL.startswith("anthropic/"):
+    _DAILY_REPORT_MODEL = f"anthropic/{_DAILY_REPORT_MODEL}"
+
+# Уровни моделей по задачам: от самой дешевой к самой сильной.
+# Модели другого провайдера в конце списка служат резервом при недоступности основного
+TASK_TIERS = {
+    "post_versions": [
+        ("openrouter", "anthropic/claude-3.5-haiku"),
+        ("openrouter", "anthropic/claude-3.5-sonnet"),
+        ("gemini", "gemini-2.0-flash"),
+    ],
+    "freight_post": [
+        ("openrouter", "anthropic/claude-3.5-haiku"),
+        ("openrouter", "anthropic/claude-3.5-sonnet"),
+        ("gemini", "gemini-2.0-flash"),
+    ],
+    "coal_analysis": [
+        ("openrouter", "anthropic/claude-3.5-haiku"),
+        ("openrouter", "anthropic/claude-3.5-sonnet"),
+        ("gemini", "gemini-2.0-flash"),
+    ],
+    "daily_report": [
+        ("openrouter", _DAILY_REPORT_MODEL),
+        ("openrouter", "anthropic/claude-3.5-sonnet"),
+        ("gemini", "gemini-2.0-flash"),
+    ],
+    # Поиск требует Google Search grounding, поэтому только Gemini
+    "news_search": [
+        ("gemini", "gemini-2.0-flash"),
+        ("gemini", "gemini-2.5-flash"),
+    ],
+    "market_data": [
+        ("gemini", "gemini-2.0-flash"),
+        ("gemini", "gemini-2.5-flash"),
+    ],
+    "monthly_forecast": [
+        ("anthropic", "claude-3-5-sonnet-20241022"),
+        ("openrouter", "anthropic/claude-3.5-sonnet"),
+    ],
+}
+
+# Бюджет по умолчанию: max_latency (сек) и max_cost (USD за вызов)
+TASK_BUDGETS = {
+    "post_versions": {"max_latency": 90, "max_cost": 0.10},
+    "freight_post": {"max_latency": 180, "max_cost": 0.15},
+    "coal_analysis": {"max_latency": 60, "max_cost": 0.05},
+    "daily_report": {"max_latency": 60, "max_cost": 0.05},
+    "news_search": {"max_latency": 90, "max_cost": 0.05},
+    "market_data": {"max_latency": 120, "max_cost": 0.05},
+    "monthly_forecast": {"max_latency": 300, "max_cost": 0.50},
+}
+
+
+def _base_task(task: str) -> str:
+    """Тип задачи без уточнения (post_versions:web_version → post_versions)."""
+    return task.split(":", 1)[0]
+
+
+def plan_route(task: str, budget: Optional[Dict] = None) -> List[tuple]:
+    """
+    Возвращает очередь моделей для задачи с учетом бюджета и статистики.
+
+    Модели, не укладывающиеся в бюджет по средней задержке или стоимости, модели
+    с открытым circuit breaker и модели с низкой долей успешных вызовов
+    переносятся в конец очереди (но не удаляются - они остаются последним резервом).
+
+    Args:
+        task: Тип задачи (ключ TASK_TIERS)
+        budget: Бюджет {'max_latency': сек, 'max_cost': USD}, по умолчанию TASK_BUDGETS
+
+    Returns:
+        Список (provider, model) в порядке попыток
+    """
+    tiers = TASK_TIERS.get(_base_task(task))
+    if not tiers:
+        raise ValueError(f"Неизвестный тип задачи для маршрутизации: {task}")
+    budget = {**TASK_BUDGETS.get(_base_task(task), {}), **(budget or {})}
+
+    preferred, demoted = [], []
+    for provider, model in tiers:
+        stats = get_model_stats(task, model)
+        reasons = []
+        if get_breaker(provider).state == "open":
+            reasons.append("провайдер отключен")
+        if stats["calls"] >= LLM_ROUTER_MIN_SAMPLES:
+            if stats["success_rate"] < LLM_ROUTER_MIN_SUCCESS_RATE:
+                reasons.append(f"успешных {stats['success_rate']:.0%}")
+            if budget.get("max_latency") and stats["avg_latency"] > budget["max_latency"]:
+                reasons.append(f"задержка {stats['avg_latency']:.0f}с")
+            expected_cost = estimate_cost(model, int(stats["avg_input_tokens"]), int(stats["avg_output_tokens"]))
+            if budget.get("max_cost") and expected_cost > budget["max_cost"]:
+                reasons.append(f"стоимость ${expected_cost:.3f}")
+
+        if reasons:
+            print(f"   🔀 {model} понижен в очереди ({', '.join(reasons)})")
+            demoted.append((provider, model))
+        else:
+            preferred.append((provider, model))
+
+    return preferred + demoted
+
+
+def _call_model(provider: str, model: str, messages: List[Dict], task: str, max_tokens: int,
+                temperature: float, timeout: int, cache_system: bool,
+                on_text: Optional[Callable[[str], None]], gemini_options: Dict, max_retries: int,
+                deadline: Optional[float] = None) -> Dict:
+    """Вызывает модель через клиента её провайдера, приводя сообщения к его формату."""
+    if provider == "openrouter":
+        return chat_completion(messages, model=model, max_tokens=max_tokens, temperature=temperature,
+                               timeout=timeout, task=task, max_retries=max_retries, cache_system=cache_system,
+                               on_text=on_text, deadline=deadline)
+
+    system = "\n\n".join(m["content"] for m in messages if m["role"] == "system")
+    conversation = [m for m in messages if m["role"] != "system"]
+
+    if provider == "gemini":
+        generation_config = {"temperature": temperature, "maxOutputTokens": max_tokens,
+                             **gemini_options.get("generation_config", {})}
+        return gemini_generate("\n\n".join(m["content"] for m in conversation), system_instruction=system,
+                               model=model, generation_config=generation_config,
+                               google_search=gemini_options.get("google_search", False),
+                               timeout=timeout, task=task, max_retries=max_retries, deadline=deadline)
+
+    if provider == "anthropic":
+        return anthropic_message(conversation, model=model, max_tokens=max_tokens, system=system,
+                                 timeout=timeout, task=task, max_retries=max_retries, cache_system=cache_system,
+                                 deadline=deadline)
+
+    raise ValueError(f"Неизвестный провайдер: {provider}")
+
+
+def route_completion(task: str, messages: List[Dict], validate: Optional[Callable[[str], bool]] = None,
+                     budget: Optional[Dict] = None, max_tokens: int = 4000, temperature: float = 0.7,
+                     timeout: int = 90, cache_system: bool = False,
+                     on_text: Optional[Callable[[str], None]] = None,
+                     gemini_options: Optional[Dict] = None, max_retries: int = 3,
+                     deadline: Optional[float] = None) -> Dict:
+    """
+    Выполняет задачу на самой дешевой подходящей модели с эскалацией и резервом.
+
+    Args:
+        task: Тип задачи (ключ TASK_TIERS, допускается уточнение через ':')
+        messages: Сообщения в формате [{'role': ..., 'content': ...}]
+        validate: Проверка текста ответа; при False задача передается следующей (более сильной) модели
+        budget: Бюджет {'max_latency': сек, 'max_cost': USD}
+        max_tokens: Максимум токенов ответа
+        temperature: Температура
+        timeout: Таймаут одного запроса
+        cache_system: Кэшировать системный промпт
+        on_text: Потоковый колбэк (поддерживается только OpenRouter)
+        gemini_options: Параметры для моделей Gemini: generation_config, google_search
+        max_retries: Максимальное количество сетевых попыток на каждую модель
+        deadline: Момент time.monotonic(), к которому задача должна завершиться: запросы и
+                  повторы урезаются до оставшегося времени, после дедлайна модели не перебираются
+
+    Returns:
+        Ответ llm_client (text, raw, usage, latency, call_id) с полями provider и model.
+        Если ни один ответ не прошел проверку, возвращается последний полученный
+
+    Raises:
+        LLMError: Если ни одна модель не ответила
+    """
+    route = plan_route(task, budget)
+    last_response = None
+    last_error: Optional[Exception] = None
+
+    for index, (provider, model) in enumerate(route):
+        if deadline is not None and time.monotonic() >= deadline:
+            print(f"⏱️  Дедлайн задачи {task} истек, оставшиеся модели не вызываются")
+            break
+        try:
+            response = _call_model(provider, model, messages, task, max_tokens, temperature, timeout,
+                                   cache_system, on_text if provider == "openrouter" else None,
+                                   gemini_options or {}, max_retries, deadline)
+        except (LLMError, ValueError) as e:
+            # ValueError - провайдер не настроен (нет API ключа), переходим к следующему
+            last_error = e
+            if index < len(route) - 1:
+                print(f"⚠️  {model} недоступна ({str(e)[:120]}), переключаюсь на {route[index + 1][1]}")
+            continue
+
+        response["provider"] = provider
+        response["model"] = model
+        last_response = response
+
+        if validate is None or validate(response["text"]):
+            return response
+
+        mark_call_invalid(response.get("call_id"), "Ответ не прошел проверку")
+        if index < len(route) - 1:
+            print(f"⚠️  Ответ {model} не прошел проверку, эскалация на {route[index + 1][1]}")
+
+    if last_response is not None:
+        return last_response
+    raise LLMError(f"Ни одна модель не ответила для задачи {task}: {last_error}")
@@ -8,11 +8,16 @@ import re
 import subprocess
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional
 from dotenv import load_dotenv
 import asyncio
 from telegram import Bot
-from anthropic import Anthropic
+
+from model_router import route_completion
+from market_analytics import get_market_analytics_text
+from market_snapshot import get_snapshot
+from posts_index import list_posts, local_naive
+from llm_batch import is_batch_enabled, enqueue_job, get_job, get_ready_jobs, mark_collected, process_batch_queue
 
 load_dotenv()
 
@@ -34,9 +39,6 @@ def extract_articles_from_month(year: int, month: int) -> List[Dict]:
     Returns:
         List of dictionaries with article data
     """
-    posts_dir = Path(NEWS_REPO_PATH) / "posts"
-    articles = []
-    
     # Determine date range for the month
     start_date = datetime(year, month, 1)
     if month == 12:
@@ -44,45 +46,19 @@ def extract_articles_from_month(year: int, month: int) -> List[Dict]:
     else:
         end_date = datetime(year, month + 1, 1)
     
-    for html_file in posts_dir.glob("*.html"):
-        try:
-            with open(html_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Extract publication date
-            date_match = re.search(r'<meta property="article:published_time" content="([^"]+)"', content)
-            if not date_match:
-                continue
-            
-            published_date = datetime.fromisoformat(date_match.group(1).replace('Z', '+00:00'))
-            
-            # Check if article is in the target month
-            if start_date <= published_date < end_date:
-                # Extract title
-                title_match = re.search(r'<title>(.*?)</title>', content, re.DOTALL)
-                title = title_match.group(1).replace(' | Bench Energy', '').strip() if title_match else html_file.stem
-                
-                # Extract description
-                desc_match = re.search(r'<meta name="description" content="([^"]+)"', content)
-                description = desc_match.group(1) if desc_match else ""
-                
-                # Extract category
-                section_match = re.search(r'<meta property="article:section" content="([^"]+)"', content)
-                category = section_match.group(1) if section_match else "Coal"
-                
-                articles.append({
-                    'title': title,
-                    'description': description,
-                    'date': published_date,
-                    'category': category,
-                    'url': f"{SITE_URL}/posts/{html_file.name}"
-                })
-        except Exception as e:
-            print(f"⚠️  Error processing {html_file.name}: {e}")
-            continue
-    
-    # Sort by date
-    articles.sort(key=lambda x: x['date'], reverse=True)
+    # Metadata comes from the posts index (newest first): only new or changed files are parsed
+    articles = []
+    for post in list_posts(Path(NEWS_REPO_PATH)):
+        # Published dates carry a timezone; month bounds are local
+        published_date = local_naive(post['date'])
+        if start_date <= published_date < end_date:
+            articles.append({
+                'title': post['title'],
+                'description': post['description'],
+                'date': published_date,
+                'category': post['section'],
+                'url': f"{SITE_URL}/posts/{post['filename']}"
+            })
     return articles
 
 
@@ -106,6 +82,23 @@ def generate_forecast_prompt(articles: List[Dict], current_year: int, current_mo
     
     month_name = month_names.get(current_month, "")
     
+    # Benchmark statistics for the month are computed locally from the stored price history
+    analytics_text = get_market_analytics_text()
+    market_section = ""
+    if analytics_text:
+        market_section = f"""
+**Benchmark statistics (computed from Bench Energy price history; MA = moving average, vol30 = 30-day volatility of daily changes, z30 = deviation from the 30-day mean, MoM = change of the monthly average):**
+{analytics_text}
+
+Use these figures for price trends and projections - do not invent other benchmark prices.
+"""
+    # Today's market summary from the daily report snapshot (no extra search calls)
+    snapshot = get_snapshot()
+    if snapshot and snapshot.get("summary"):
+        market_section += f"""
+**Latest market summary ({snapshot.get('date')}):** {snapshot['summary']}
+"""
+    
     # Build list of articles for analysis
     articles_summary = "\n".join([
         f"- {art['title']} ({art['date'].strftime('%Y-%m-%d')}): {art['description'][:200]}..."
@@ -118,7 +111,7 @@ Based on the following news articles collected in {month_name} {current_year}, p
 
 **Articles analyzed ({len(articles)} total):**
 {articles_summary}
-
+{market_section}
 **Your task:**
 Write a professional market forecast report as if you are a senior coal market analyst at Bench Energy. The report should:
 
@@ -176,32 +169,63 @@ def generate_forecast_with_claude(articles: List[Dict], current_year: int, curre
     if not ANTHROPIC_API_KEY:
         raise ValueError("ANTHROPIC_API_KEY не установлен в .env")
     
-    client = Anthropic(api_key=ANTHROPIC_API_KEY)
-    
     prompt = generate_forecast_prompt(articles, current_year, current_month)
     
     print(f"🤖 Generating forecast with Claude based on {len(articles)} articles...")
     
-    message = client.messages.create(
-        model="claude-3-5-sonnet-20241022",
-        max_tokens=4000,
-        messages=[
+    response = route_completion(
+        "monthly_forecast",
+        [
             {
                 "role": "user",
                 "content": prompt
             }
-        ]
+        ],
+        max_tokens=4000,
+        timeout=120,
     )
     
-    forecast_text = message.content[0].text
-    
-    # If response is not HTML, wrap in basic HTML structure
+    return _finalize_forecast_text(response["text"])
+
+
+def _finalize_forecast_text(forecast_text: str) -> str:
+    """Wraps a non-HTML model response in a basic HTML container."""
     if not forecast_text.strip().startswith('<'):
         forecast_text = f"<div class='forecast-content'>{forecast_text}</div>"
-    
     return forecast_text
 
 
+def get_batched_forecast(articles: List[Dict], current_year: int, current_month: int) -> Optional[str]:
+    """
+    Gets the forecast through the batch queue (LLM_BATCH_MODE).
+    The first run queues the request; later runs collect the result once the batch has finished.
+    
+    Args:
+        articles: List of articles for the month
+        current_year: Current year
+        current_month: Current month
+        
+    Returns:
+        HTML content of the forecast, or None if the result is not ready yet
+        
+    Raises:
+        RuntimeError: If the batch job failed (caller falls back to an interactive call)
+    """
+    job_key = f"monthly_forecast:{current_year}-{current_month:02d}"
+    if get_job(job_key) is None:
+        prompt = generate_forecast_prompt(articles, current_year, current_month)
+        enqueue_job(job_key, "monthly_forecast", [{"role": "user", "content": prompt}], max_tokens=4000)
+    
+    process_batch_queue()
+    job = get_job(job_key)
+    
+    if job["status"] == "failed":
+        raise RuntimeError(f"Batch job {job_key} failed: {job['error']}")
+    if job["status"] not in ("done", "collected"):
+        return None
+    return _finalize_forecast_text(job["result_text"] or "")
+
+
 def create_forecast_html(forecast_content: str, current_year: int, current_month: int) -> str:
     """
     Creates full HTML document for forecast.
@@ -502,13 +526,17 @@ def publish_forecast_to_web(forecast_html: str, current_year: int, current_month
     return f"{SITE_URL}/forecasts/{filename}"
 
 
-async def generate_monthly_forecast():
+async def generate_monthly_forecast(year: Optional[int] = None, month: Optional[int] = None):
     """
     Main function for generating and publishing monthly forecast.
+    
+    Args:
+        year: Forecast year (defaults to the current year)
+        month: Forecast month (defaults to the current month)
     """
     now = datetime.now()
-    current_year = now.year
-    current_month = now.month
+    current_year = year or now.year
+    current_month = month or now.month
     
     print("=" * 80)
     print(f"📊 MONTHLY FORECAST GENERATION - {current_year}-{current_month:02d}")
@@ -527,9 +555,24 @@ async def generate_monthly_forecast():
     print(f"✅ Found {len(articles)} articles")
     print()
     
-    # Generate forecast with Claude
+    # Generate forecast with Claude (in batch mode - through the batch queue, the script is re-run until ready)
+    job_key = f"monthly_forecast:{current_year}-{current_month:02d}"
     try:
-        forecast_content = generate_forecast_with_claude(articles, current_year, current_month)
+        forecast_content = None
+        if is_batch_enabled():
+            job = get_job(job_key)
+            if job and job["status"] == "collected":
+                print(f"✅ Forecast for {current_month}/{current_year} already published")
+                return
+            try:
+                forecast_content = get_batched_forecast(articles, current_year, current_month)
+                if forecast_content is None:
+                    print("⏳ Forecast is queued for batch generation, the bot publishes it once the batch finishes")
+                    return
+            except RuntimeError as e:
+                print(f"⚠️  {e}, falling back to interactive generation")
+        if forecast_content is None:
+            forecast_content = generate_forecast_with_claude(articles, current_year, current_month)
         print("✅ Forecast generated")
         print()
     except Exception as e:
@@ -550,10 +593,24 @@ async def generate_monthly_forecast():
     print(f"✅ URL: {web_url}")
     print()
     
+    if is_batch_enabled() and get_job(job_key):
+        mark_collected(job_key)
+    
     print("=" * 80)
     print("✅ FORECAST SUCCESSFULLY PUBLISHED")
     print("=" * 80)
 
 
+async def publish_ready_forecasts():
+    """
+    Publishes forecasts whose batch jobs finished after the forecast script exited.
+    Called by the bot after each run, so a queued forecast does not wait for a manual re-run.
+    """
+    for job in get_ready_jobs("monthly_forecast"):
+        match = re.match(r"monthly_forecast:(\d{4})-(\d{2})$", job["job_key"])
+        if match:
+            await generate_monthly_forecast(int(match.group(1)), int(match.group(2)))
+
+
 if __name__ == "__main__":
     asyncio.run(generate_monthly_forecast())
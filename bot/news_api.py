@@ -0,0 +1,171 @@
+"""
+Статический JSON API новостей для фронтенда и других потребителей.
+Собирается notion_sync из манифеста синхронизации и уже загруженных блоков,
+поэтому на пути запроса не нужны живые запросы к Notion:
+- slugs.json - карта slug → метаданные статьи (и номер страницы списка);
+- list-N.json - страницы списка статей (новые сверху);
+- articles/{slug}.json - полная статья: метаданные, блоки Notion и HTML.
+Формат статьи совпадает с ответом /api/news (NewsArticle). Файлы, загруженные
+в Notion, в JSON не попадают: их подписанные URL истекают примерно через час.
+
+Контракт с фронтендом (app/api/news/route.ts, app/news/page.tsx):
+- slug - web_publisher.create_slug(заголовок): теги убираются, текст в нижнем
+  регистре, символы кроме букв и цифр Unicode, '_', пробелов и '-' удаляются,
+  пробелы и дефисы схлопываются в '-', '-' по краям убирается, длина обрезается
+  до 80 символов и '-' в конце убирается снова. getSlugFromArticle повторяет
+  этот алгоритм, поэтому slug из JSON находит ту же статью;
+- description - первый фрагмент текста первого найденного свойства Description,
+  description, Summary или summary (SEO Description в API не используется).
+"""
+import os
+import re
+import json
+import copy
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from posts_index import write_if_changed
+
+# Каталог API относительно корня репозитория (Next.js отдает public/ статически)
+NEWS_API_DIR = Path("public") / "data" / "news"
+# Количество статей на странице списка
+NEWS_API_PAGE_SIZE = int(os.getenv("NEWS_API_PAGE_SIZE", "50"))
+
+
+def _dump(data) -> str:
+    """JSON файла API (стабильный порядок ключей - без лишних изменений в git)."""
+    return json.dumps(data, ensure_ascii=False, indent=1, sort_keys=True)
+
+
+def article_path(slug: str) -> Path:
+    """Путь JSON статьи относительно корня репозитория."""
+    return NEWS_API_DIR / "articles" / f"{slug}.json"
+
+
+def article_summary(page_id: str, entry: Dict) -> Dict:
+    """
+    Метаданные статьи для списка из записи манифеста синхронизации.
+
+    Args:
+        page_id: ID страницы в Notion
+        entry: Запись манифеста (slug, title, date, url, description, source_url, ...)
+
+    Returns:
+        Словарь в формате NewsArticle без content
+    """
+    return {
+        "id": page_id,
+        "title": entry["title"],
+        "slug": entry["slug"],
+        "description": entry.get("description") or None,
+        "publishedAt": entry["date"],
+        "sourceUrl": entry.get("source_url") or None,
+        "sourceName": entry.get("source_name") or None,
+        "category": entry.get("category") or None,
+        "url": entry.get("url"),
+    }
+
+
+def strip_file_urls(blocks: List[Dict], html: str) -> Tuple[List[Dict], str]:
+    """
+    Убирает из статьи подписанные URL файлов Notion ({"type": "file", "file": {"url", "expiry_time"}}):
+    в блоках остается пустой объект file, из HTML удаляются теги <img> с этими URL.
+    Иначе JSON ссылался бы на истекшие файлы и менялся в git при каждой загрузке.
+
+    Args:
+        blocks: Дерево блоков Notion (не изменяется)
+        html: HTML контента статьи
+
+    Returns:
+        Tuple (копия дерева блоков без URL файлов, HTML без изображений-файлов Notion)
+    """
+    blocks = copy.deepcopy(blocks)
+    urls = []
+
+    def strip(node):
+        if isinstance(node, list):
+            for item in node:
+                strip(item)
+        elif isinstance(node, dict):
+            if node.get("type") == "file" and isinstance(node.get("file"), dict):
+                if node["file"].get("url"):
+                    urls.append(node["file"]["url"])
+                node["file"] = {}
+            for value in node.values():
+                if isinstance(value, (dict, list)):
+                    strip(value)
+
+    strip(blocks)
+    for url in urls:
+        html = re.sub(rf'<img[^>]*src="{re.escape(url)}"[^>]*>', '', html)
+    return blocks, html
+
+
+def write_article(repo_path: Path, summary: Dict, blocks: List[Dict], html: str) -> bool:
+    """
+    Записывает JSON статьи (только если он изменился).
+    URL файлов Notion убираются (strip_file_urls).
+
+    Args:
+        repo_path: Корень репозитория сайта
+        summary: Метаданные статьи (article_summary)
+        blocks: Дерево блоков Notion
+        html: HTML контента статьи
+
+    Returns:
+        True если файл записан
+    """
+    blocks, html = strip_file_urls(blocks, html)
+    return write_if_changed(repo_path / article_path(summary["slug"]),
+                            _dump({**summary, "content": blocks, "html": html}))
+
+
+def _published_timestamp(summary: Dict) -> float:
+    """Ключ сортировки по дате публикации (даты с часовым поясом и без)."""
+    return datetime.fromisoformat(summary["publishedAt"]).timestamp()
+
+
+def build_news_api(repo_path: Path, pages: Dict[str, Dict],
+                   page_size: Optional[int] = None) -> Dict[str, bool]:
+    """
+    Собирает карту slug и страницы списка по манифесту синхронизации,
+    удаляет JSON статей, которых больше нет в манифесте.
+
+    Args:
+        repo_path: Корень репозитория сайта
+        pages: Страницы манифеста {page_id: запись}
+        page_size: Количество статей на странице списка (по умолчанию NEWS_API_PAGE_SIZE)
+
+    Returns:
+        Словарь {относительный путь файла: изменился ли файл}
+    """
+    page_size = page_size or NEWS_API_PAGE_SIZE
+    summaries = [article_summary(page_id, entry) for page_id, entry in pages.items()]
+    summaries.sort(key=_published_timestamp, reverse=True)
+    page_count = max(1, -(-len(summaries) // page_size))
+    api_dir = repo_path / NEWS_API_DIR
+    results = {}
+
+    def write(name: str, data):
+        results[str(NEWS_API_DIR / name)] = write_if_changed(api_dir / name, _dump(data))
+
+    slugs = {}
+    for number in range(1, page_count + 1):
+        shard = summaries[(number - 1) * page_size:number * page_size]
+        for summary in shard:
+            slugs[summary["slug"]] = {**summary, "listPage": number}
+        write(f"list-{number}.json", {"page": number, "pages": page_count, "total": len(summaries),
+                                      "articles": shard})
+    write("slugs.json", slugs)
+
+    # Страницы списка сверх текущего количества и статьи, снятые с публикации
+    for old_file in api_dir.glob("list-*.json"):
+        if str(NEWS_API_DIR / old_file.name) not in results:
+            old_file.unlink()
+            results[str(NEWS_API_DIR / old_file.name)] = True
+    for old_file in (api_dir / "articles").glob("*.json"):
+        if old_file.stem not in slugs:
+            old_file.unlink()
+            results[str(article_path(old_file.stem))] = True
+    return results
@@ -7,13 +7,23 @@ import os
 import json
 import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import List, Dict, Optional
 from dotenv import load_dotenv
 
+from domain_health import is_domain_blocked, is_redirector, get_domain_penalty
+from url_validator import resolve_redirect_url
+from llm_client import gemini_generate, LLMError
+from model_router import route_completion
+from json_repair import repair_json
+
 # Загружаем переменные окружения
 load_dotenv()
 
+# Количество редиректов Gemini, разворачиваемых одновременно в select_best_news
+REDIRECT_RESOLVE_WORKERS = int(os.getenv("REDIRECT_RESOLVE_WORKERS", "8"))
+
 
 def _search_via_discovery_engine(query: str, max_results: int = 10) -> List[Dict]:
     """
@@ -394,43 +404,24 @@ CRITICALLY IMPORTANT:
     for attempt in range(max_retries):
         try:
             # Используем REST API напрямую (как в Dubai RE Soft Launch)
-            # Это работает без настройки Vertex AI проекта
-            model_name = "gemini-2.0-flash"  # стабильная модель; gemini-2.0-flash-exp даёт 404
-            url = f"https://generativelanguage.googleapis.com/v1beta/models/{model_name}:generateContent?key={api_key}"
-            
-            payload = {
-                "systemInstruction": {
-                    "parts": [{"text": system_instruction}]
-                },
-                "contents": [{
-                    "parts": [{"text": prompt}]
-                }],
-                "generationConfig": {
-                    "temperature": 0.1,  # Низкая температура для точности
-                    "topK": 1,
-                    "topP": 0.1
-                },
-                "tools": [{
-                    "googleSearch": {}
-                }]
-            }
-            headers = {"Content-Type": "application/json"}
-            
+            # Это работает без настройки Vertex AI проекта. Сетевые повторы выполняет llm_client
             print(f"   Отправляю запрос к Gemini API (это может занять 30-60 секунд)...")
-            response = requests.post(url, json=payload, headers=headers, timeout=90)
-            response.raise_for_status()
-            data = response.json()
+            # Модель выбирает маршрутизатор: gemini-2.0-flash (gemini-2.0-flash-exp даёт 404),
+            # при невосстановимом JSON - эскалация на более сильную модель
+            response = route_completion(
+                "news_search",
+                [{"role": "system", "content": system_instruction}, {"role": "user", "content": prompt}],
+                validate=lambda text: repair_json(text) is not None,
+                temperature=0.1,  # Низкая температура для точности
+                max_tokens=8192,
+                timeout=90,
+                gemini_options={"generation_config": {"topK": 1, "topP": 0.1}, "google_search": True},
+            )
+            data = response["raw"]
             print(f"   ✅ Получен ответ от Gemini API")
             
             # Извлекаем текст из ответа
-            if 'candidates' in data and len(data['candidates']) > 0:
-                candidate = data['candidates'][0]
-                if 'content' in candidate and 'parts' in candidate['content']:
-                    response_text = candidate['content']['parts'][0].get('text', '')
-                else:
-                    response_text = str(data)
-            else:
-                response_text = str(data)
+            response_text = response["text"]
             
             # Проверяем, что поиск сработал
             if 'candidates' in data and len(data['candidates']) > 0:
@@ -440,29 +431,11 @@ CRITICALLY IMPORTANT:
                     if 'searchEntryPoint' in candidate['groundingMetadata']:
                         print(f"   Использованные запросы: {candidate['groundingMetadata']['searchEntryPoint']}")
             
-            # Извлекаем текст из ответа
-            response_text = response_text.strip()
-            
-            # Убираем markdown код блоки если есть
-            if response_text.startswith("```json"):
-                response_text = response_text[7:]
-            if response_text.startswith("```"):
-                response_text = response_text[3:]
-            if response_text.endswith("```"):
-                response_text = response_text[:-3]
-            response_text = response_text.strip()
-            
-            # Пытаемся найти JSON в ответе
-            json_start = response_text.find("{")
-            json_end = response_text.rfind("}") + 1
-            
-            if json_start >= 0 and json_end > json_start:
-                json_text = response_text[json_start:json_end]
-            else:
-                json_text = response_text
-            
-            # Парсим JSON из текста ответа
-            parsed_data = json.loads(json_text)
+            # Парсим JSON из текста ответа, восстанавливая структуру локально
+            # (markdown блоки, текст вокруг JSON, обрезанный массив, неэкранированные кавычки)
+            parsed_data = repair_json(response_text)
+            if parsed_data is None:
+                raise json.JSONDecodeError("JSON не найден или не восстановлен", response_text, 0)
             news_list = parsed_data.get("news", [])
             
             # Извлекаем реальные URL из groundingMetadata/citations (Gemini возвращает "заземленные" ссылки)
@@ -569,34 +542,21 @@ CRITICALLY IMPORTANT:
             
         except json.JSONDecodeError as e:
             print(f"⚠️  Ошибка парсинга JSON (попытка {attempt + 1}/{max_retries}): {e}")
-            if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)
-            else:
+            if attempt == max_retries - 1:
                 print(f"⚠️  Не удалось распарсить JSON. Ответ: {response_text[:200] if 'response_text' in locals() else 'N/A'}")
                 return []
-        except Exception as e:
+        except LLMError as e:
             error_str = str(e).lower()
-            error_full = str(e)
-            
-            if attempt == 0:
-                print(f"🔍 Диагностика ошибки: {error_full[:300]}")
+            print(f"🔍 Диагностика ошибки: {str(e)[:300]}")
             
             if "search tool" in error_str or "google_search" in error_str or "not supported" in error_str or "unknown field" in error_str:
                 print(f"⚠️  Google Search не доступен!")
                 print(f"📋 Включите API 'Vertex AI Search and Conversation' в Google Cloud Console:")
                 print(f"   https://console.cloud.google.com/apis/library/discoveryengine.googleapis.com?project={os.getenv('VERTEX_AI_PROJECT_ID', 'your-project')}")
-                if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)
-                    continue
-                else:
-                    print(f"   Возвращаю пустой массив (не могу искать без Google Search)")
-                    return []
+                print(f"   Возвращаю пустой массив (не могу искать без Google Search)")
+                return []
             
-            print(f"❌ Ошибка поиска новостей (попытка {attempt + 1}/{max_retries}): {e}")
-            if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)
-            else:
-                raise Exception(f"Не удалось найти новости после {max_retries} попыток: {e}") from e
+            raise Exception(f"Не удалось найти новости после {max_retries} попыток: {e}") from e
     
     return []
 
@@ -611,6 +571,7 @@ def select_best_news(news_list: List[Dict]) -> Optional[Dict]:
     3. Качество источника (надежные источники выше)
     4. Наличие URL и изображения
     5. Длина и детальность summary
+    6. Здоровье домена (домены в карантине пропускаются, недавние ошибки штрафуются)
     
     Args:
         news_list: Список новостей
@@ -654,6 +615,25 @@ def select_best_news(news_list: List[Dict]) -> Optional[Dict]:
         
         valid_news.append(n)
     
+    # Редиректы Gemini (vertexaisearch) разворачиваем до домена источника параллельно
+    # (развернутые ссылки берутся из кэша domain_health без запроса)
+    redirected = [n for n in valid_news if is_redirector(n.get("source_url", ""))]
+    if redirected:
+        with ThreadPoolExecutor(max_workers=min(REDIRECT_RESOLVE_WORKERS, len(redirected))) as executor:
+            resolved_urls = list(executor.map(resolve_redirect_url, [n["source_url"] for n in redirected]))
+        for n, resolved_url in zip(redirected, resolved_urls):
+            n["source_url"] = resolved_url
+    
+    # Пропускаем новости с доменов в карантине (403, пэйволл, таймауты)
+    unblocked_news = []
+    for n in valid_news:
+        blocked, reason = is_domain_blocked(n.get("source_url", ""))
+        if blocked:
+            print(f"⏭️  Пропущена новость: {reason}: {n.get('title', '')[:60]}...")
+            continue
+        unblocked_news.append(n)
+    valid_news = unblocked_news
+    
     if not valid_news:
         print("⚠️  Нет новостей с конкретными данными")
         return None
@@ -727,6 +707,9 @@ def select_best_news(news_list: List[Dict]) -> Optional[Dict]:
         if vague_count >= 2 and numbers_count == 0:
             score -= 30  # Штраф за слишком общие новости
         
+        # 8. Штраф за недавние ошибки домена источника
+        score -= get_domain_penalty(news.get("source_url", ""))
+        
         return score
     
     # Сортируем по приоритету и берем самую топовую
@@ -765,9 +748,6 @@ def _process_discovery_engine_results(news_list: List[Dict]) -> List[Dict]:
     
     try:
         # Используем Gemini для улучшения summary
-        model_name = "gemini-2.0-flash"  # стабильная модель; gemini-2.0-flash-exp даёт 404
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{model_name}:generateContent?key={api_key}"
-        
         # Формируем промпт для обработки новостей
         news_text = "\n\n".join([
             f"Title: {n.get('title', '')}\nURL: {n.get('source_url', '')}\nSnippet: {n.get('summary', '')}"
@@ -793,23 +773,22 @@ Return JSON array with improved summaries:
 News items:
 {news_text}"""
         
-        payload = {
-            "contents": [{
-                "parts": [{"text": prompt}]
-            }],
-            "generationConfig": {
+        response = gemini_generate(
+            prompt,
+            model="gemini-2.0-flash",  # стабильная модель; gemini-2.0-flash-exp даёт 404
+            generation_config={
                 "temperature": 0.1,
                 "topK": 1,
                 "topP": 0.1
-            }
-        }
-        
-        response = requests.post(url, json=payload, headers={"Content-Type": "application/json"}, timeout=60)
-        response.raise_for_status()
-        data = response.json()
+            },
+            timeout=60,
+            task="discovery_summaries",
+            max_retries=1,
+        )
+        data = response["raw"]
         
         if 'candidates' in data and len(data['candidates']) > 0:
-            response_text = data['candidates'][0]['content']['parts'][0].get('text', '')
+            response_text = response["text"]
             
             # Парсим JSON
             json_start = response_text.find("{")
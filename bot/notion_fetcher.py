@@ -0,0 +1,353 @@
+"""
+Клиент Notion API для синхронизации сайта и блога.
+Переиспользует HTTP-соединения, ограничивает частоту запросов средним лимитом
+Notion (~3 запроса в секунду на интеграцию), соблюдает Retry-After при 429 и
+загружает блоки нескольких страниц параллельно - пагинация курсоров у каждой
+страницы идет независимо.
+Деревья блоков страниц (с вложенными дочерними блоками) кэшируются на диске по
+ключу (id страницы, last_edited_time страницы): повторный рендер неизмененных
+страниц не делает запросов к API. Дерево с файлами Notion (подписанные URL живут
+около часа) берется из кэша, только пока ссылки еще действительны, а дерево,
+загруженное в ту же минуту, что и last_edited_time, считается устаревшим.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+load_dotenv()
+
+NOTION_API_KEY = os.getenv("NOTION_API_KEY")
+NOTION_API_URL = "https://api.notion.com/v1"
+NOTION_VERSION = "2022-06-28"
+
+# Средний лимит запросов в секунду (лимит Notion - 3 запроса/с на интеграцию)
+NOTION_RATE_LIMIT = float(os.getenv("NOTION_RATE_LIMIT", "3"))
+# Количество страниц, загружаемых параллельно
+NOTION_FETCH_WORKERS = int(os.getenv("NOTION_FETCH_WORKERS", "4"))
+# Максимальное количество попыток одного запроса (429, 5xx, сетевые ошибки)
+NOTION_MAX_RETRIES = int(os.getenv("NOTION_MAX_RETRIES", "5"))
+# Каталог кэша деревьев блоков
+NOTION_BLOCK_CACHE_DIR = Path(os.getenv("NOTION_BLOCK_CACHE_DIR", "output/notion_block_cache"))
+# Минимальный оставшийся срок подписанных URL файлов Notion, при котором дерево берется из кэша (минуты)
+NOTION_FILE_URL_MIN_TTL_MINUTES = int(os.getenv("NOTION_FILE_URL_MIN_TTL_MINUTES", "15"))
+
+# HTTP статусы, при которых имеет смысл повторить запрос
+RETRYABLE_STATUSES = {409, 429, 500, 502, 503, 504}
+# Блоки-ссылки на отдельные страницы и базы: их содержимое не входит в дерево страницы
+SEPARATE_CHILD_TYPES = {"child_page", "child_database"}
+
+
+class RateLimiter:
+    """
+    Ограничитель частоты запросов для всех потоков процесса.
+    Каждый запрос занимает слот через 1/rate секунд после предыдущего;
+    при 429 все потоки приостанавливаются на время из Retry-After.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Ждет свободного слота."""
+        with self._lock:
+            slot = max(time.monotonic(), self.next_slot)
+            self.next_slot = slot + self.interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds: float):
+        """Откладывает все следующие запросы на указанное время."""
+        with self._lock:
+            self.next_slot = max(self.next_slot, time.monotonic() + seconds)
+
+
+_rate_limiter = RateLimiter(NOTION_RATE_LIMIT)
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def _get_session() -> requests.Session:
+    """Возвращает HTTP сессию Notion с пулом соединений."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(NOTION_FETCH_WORKERS, 4))
+            session.mount("https://", adapter)
+            session.headers.update({
+                "Authorization": f"Bearer {NOTION_API_KEY}",
+                "Content-Type": "application/json",
+                "Notion-Version": NOTION_VERSION
+            })
+            _session = session
+        return _session
+
+
+def _retry_delay(response: Optional[requests.Response], attempt: int) -> float:
+    """Задержка перед следующей попыткой (учитывает Retry-After)."""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(float(retry_after), 60.0)
+            except ValueError:
+                pass
+    return min(2 ** attempt, 30)
+
+
+def notion_request(method: str, path: str, params: Optional[Dict] = None, json: Optional[Dict] = None,
+                   timeout: int = 30, max_retries: int = NOTION_MAX_RETRIES) -> Dict:
+    """
+    Выполняет запрос к Notion API с ограничением частоты и повторами.
+
+    Args:
+        method: HTTP метод ('GET', 'POST', ...)
+        path: Путь относительно NOTION_API_URL (например, '/blocks/{id}/children')
+        params: Query параметры
+        json: Тело запроса
+        timeout: Таймаут запроса
+        max_retries: Максимальное количество попыток
+
+    Returns:
+        JSON ответа
+
+    Raises:
+        requests.exceptions.RequestException: Если запрос не удался после всех попыток
+    """
+    session = _get_session()
+    for attempt in range(max_retries):
+        _rate_limiter.acquire()
+        response = None
+        try:
+            response = session.request(method, f"{NOTION_API_URL}{path}", params=params, json=json,
+                                       timeout=timeout)
+            if response.status_code not in RETRYABLE_STATUSES:
+                response.raise_for_status()
+                return response.json()
+            error: requests.exceptions.RequestException = requests.exceptions.HTTPError(
+                f"{response.status_code} для {path}", response=response)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            error = e
+
+        if attempt == max_retries - 1:
+            raise error
+        delay = _retry_delay(response, attempt)
+        if response is not None and response.status_code == 429:
+            # Лимит общий для интеграции - приостанавливаем все потоки
+            _rate_limiter.pause(delay)
+            print(f"⏳ Notion rate limit, пауза {delay:.0f}с")
+        else:
+            time.sleep(delay)
+
+
+def _cache_file(kind: str, block_id: str, last_edited_time: str) -> Path:
+    """Путь файла кэша для версии блока."""
+    version = hashlib.sha1(last_edited_time.encode("utf-8")).hexdigest()[:12]
+    return NOTION_BLOCK_CACHE_DIR / kind / f"{block_id}_{version}.json"
+
+
+def _cache_get(kind: str, block_id: str, last_edited_time: Optional[str]):
+    """Читает версию блока из кэша (None, если её нет)."""
+    if not last_edited_time:
+        return None
+    path = _cache_file(kind, block_id, last_edited_time)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"⚠️  Поврежденный кэш Notion {path.name}: {e}")
+        return None
+
+
+def _cache_put(kind: str, block_id: str, last_edited_time: Optional[str], data):
+    """Сохраняет версию блока в кэш, удаляя его предыдущие версии."""
+    if not last_edited_time:
+        return
+    path = _cache_file(kind, block_id, last_edited_time)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    for old_path in path.parent.glob(f"{block_id}_*.json"):
+        if old_path != path:
+            old_path.unlink(missing_ok=True)
+    # Запись через временный файл: параллельные потоки не видят частично записанный JSON
+    tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _file_urls_valid(data, min_ttl: timedelta) -> bool:
+    """
+    Проверяет, что подписанные URL файлов Notion ({"type": "file", "file": {"url", "expiry_time"}})
+    в дереве блоков действительны еще не меньше min_ttl.
+    """
+    if isinstance(data, list):
+        return all(_file_urls_valid(item, min_ttl) for item in data)
+    if not isinstance(data, dict):
+        return True
+    if data.get("type") == "file" and isinstance(data.get("file"), dict):
+        expiry_time = data["file"].get("expiry_time")
+        if not expiry_time:
+            return False
+        try:
+            expires_at = datetime.fromisoformat(expiry_time.replace("Z", "+00:00"))
+        except ValueError:
+            return False
+        if expires_at - datetime.now(timezone.utc) < min_ttl:
+            return False
+    return all(_file_urls_valid(value, min_ttl) for value in data.values() if isinstance(value, (dict, list)))
+
+
+def fetched_after_edit(last_edited_time: Optional[str], fetched_at: Optional[str]) -> bool:
+    """
+    Проверяет, что загрузка в момент fetched_at видела все правки с этим last_edited_time.
+    Notion округляет last_edited_time до минуты: правка в ту же минуту, что и загрузка,
+    не меняет last_edited_time, поэтому такой снимок нельзя считать актуальным.
+
+    Args:
+        last_edited_time: last_edited_time страницы (ISO 8601)
+        fetched_at: Время загрузки (ISO 8601 с часовым поясом)
+
+    Returns:
+        True если загрузка была не раньше следующей минуты после last_edited_time
+    """
+    if not last_edited_time or not fetched_at:
+        return False
+    try:
+        edited = datetime.fromisoformat(last_edited_time.replace("Z", "+00:00"))
+        fetched = datetime.fromisoformat(fetched_at.replace("Z", "+00:00"))
+    except ValueError:
+        return False
+    return fetched >= edited.replace(second=0, microsecond=0) + timedelta(minutes=1)
+
+
+def fetch_page(page_id: str) -> Dict:
+    """
+    Получает объект страницы.
+
+    Args:
+        page_id: ID страницы в Notion
+
+    Returns:
+        Объект страницы
+    """
+    return notion_request("GET", f"/pages/{page_id}")
+
+
+def fetch_block_children(block_id: str) -> List[Dict]:
+    """
+    Получает все дочерние блоки блока или страницы (со всеми страницами курсора).
+
+    Args:
+        block_id: ID блока или страницы
+
+    Returns:
+        Список блоков верхнего уровня
+    """
+    blocks = []
+    params = {"page_size": 100}
+    while True:
+        data = notion_request("GET", f"/blocks/{block_id}/children", params=params)
+        blocks.extend(data.get("results", []))
+        if not data.get("has_more"):
+            return blocks
+        params = {"page_size": 100, "start_cursor": data.get("next_cursor")}
+
+
+def fetch_block_tree(block_id: str, last_edited_time: Optional[str] = None,
+                     workers: int = NOTION_FETCH_WORKERS) -> List[Dict]:
+    """
+    Получает дерево блоков страницы или блока: у блоков с has_children дочерние
+    блоки загружаются рекурсивно (по уровням, параллельно) в поле 'children'.
+    Дерево кэшируется целиком по (id, last_edited_time) страницы: правка вложенного
+    блока не меняет last_edited_time его предков, поэтому поддеревья отдельно не
+    кэшируются. Дерево с истекающими ссылками на файлы Notion и дерево, загруженное
+    в минуту last_edited_time (правка могла не попасть в него), загружаются заново.
+
+    Args:
+        block_id: ID страницы или блока
+        last_edited_time: Время последнего изменения страницы/блока (без него кэш не используется)
+        workers: Количество потоков для загрузки одного уровня дерева
+
+    Returns:
+        Список блоков верхнего уровня с вложенными 'children'
+    """
+    cached = _cache_get("trees", block_id, last_edited_time)
+    if (isinstance(cached, dict) and fetched_after_edit(last_edited_time, cached.get("fetched_at"))
+            and _file_urls_valid(cached["blocks"], timedelta(minutes=NOTION_FILE_URL_MIN_TTL_MINUTES))):
+        return cached["blocks"]
+
+    fetched_at = datetime.now(timezone.utc).isoformat()
+    blocks = fetch_block_children(block_id)
+    level = blocks
+    while level:
+        pending = [block for block in level
+                   if block.get("has_children") and block.get("type") not in SEPARATE_CHILD_TYPES]
+        next_level = []
+        results = fetch_concurrently(lambda block: fetch_block_children(block["id"]), pending, workers)
+        for block, children in zip(pending, results):
+            block["children"] = children
+            next_level.extend(children)
+        level = next_level
+
+    _cache_put("trees", block_id, last_edited_time, {"fetched_at": fetched_at, "blocks": blocks})
+    return blocks
+
+
+def fetch_concurrently(func: Callable, items: Iterable, workers: int = NOTION_FETCH_WORKERS) -> List:
+    """
+    Выполняет загрузку для каждого элемента параллельно (с общим лимитом частоты).
+
+    Args:
+        func: Функция загрузки одного элемента
+        items: Элементы (например, ID страниц)
+        workers: Количество потоков
+
+    Returns:
+        Результаты в порядке элементов
+    """
+    items = list(items)
+    if len(items) <= 1 or workers <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(func, items))
+
+
+def fetch_block_trees(pages: Iterable[Dict], workers: int = NOTION_FETCH_WORKERS) -> Dict[str, List[Dict]]:
+    """
+    Загружает деревья блоков нескольких страниц параллельно (с кэшем).
+    Уровни дерева каждой страницы загружаются последовательно в её потоке, чтобы
+    число потоков не превышало workers (и размер пула соединений сессии).
+    Страницы, которые не удалось загрузить, в результат не попадают (ошибка выводится).
+
+    Args:
+        pages: Объекты страниц (нужны id и last_edited_time)
+        workers: Количество потоков
+
+    Returns:
+        Словарь {page_id: дерево блоков}
+    """
+    def fetch(page: Dict) -> Optional[List[Dict]]:
+        try:
+            return fetch_block_tree(page["id"], page.get("last_edited_time"), workers=1)
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Ошибка получения блоков страницы {page['id']}: {e}")
+            return None
+
+    pages = list(pages)
+    results = fetch_concurrently(fetch, pages, workers)
+    return {page["id"]: blocks for page, blocks in zip(pages, results) if blocks is not None}
@@ -4,13 +4,18 @@
 """
 import os
 import json
-import subprocess
 from pathlib import Path
+from functools import lru_cache
 from typing import List, Dict, Optional
-from datetime import datetime
+from datetime import datetime, date, timedelta, timezone
 from dotenv import load_dotenv
 import requests
 
+from notion_fetcher import notion_request, fetch_block_tree, fetch_block_trees, fetched_after_edit
+from site_build import build_site
+from posts_index import parse_article_html, content_hash, write_if_changed
+from news_api import article_summary, article_path, write_article, build_news_api
+
 load_dotenv()
 
 NOTION_API_KEY = os.getenv("NOTION_API_KEY")
@@ -18,13 +23,162 @@ NOTION_DATABASE_ID = os.getenv("NOTION_DATABASE_ID")
 NOTION_API_URL = "https://api.notion.com/v1"
 GITHUB_REPO_PATH = os.getenv("GITHUB_REPO_PATH", ".")
 SITE_URL = os.getenv("SITE_URL", "https://www.bench.energy")
+# Манифест синхронизации (относительно репозитория): page id → last_edited_time, хэш, slug
+SYNC_MANIFEST_PATH = Path(".notion_sync") / "manifest.json"
+# Теги списков по типу блока Notion
+LIST_TAGS = {"bulleted_list_item": "ul", "numbered_list_item": "ol"}
+# Свойства с описанием статьи для JSON API (в порядке приоритета, как во фронтенде)
+DESCRIPTION_PROPERTIES = ("Description", "description", "Summary", "summary")
 
-def fetch_notion_pages(today_only: bool = True) -> List[Dict]:
+def load_sync_manifest(repo_path: Path) -> Dict:
+    """
+    Загружает манифест синхронизации.
+    
+    Args:
+        repo_path: Путь к репозиторию сайта
+        
+    Returns:
+        Словарь {'watermark': last_edited_time последней синхронизации,
+        'complete': была ли полная синхронизация, 'pages': {page_id: запись}}
+    """
+    manifest_path = repo_path / SYNC_MANIFEST_PATH
+    if manifest_path.exists():
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            manifest.setdefault("pages", {})
+            return manifest
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"⚠️  Манифест синхронизации поврежден, выполняется полная обработка: {e}")
+    return {"watermark": None, "pages": {}}
+
+def save_sync_manifest(repo_path: Path, manifest: Dict) -> bool:
+    """Сохраняет манифест синхронизации (если он изменился)."""
+    manifest_path = repo_path / SYNC_MANIFEST_PATH
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    return write_if_changed(manifest_path, json.dumps(manifest, ensure_ascii=False, indent=2, sort_keys=True))
+
+def record_change(changes: Dict[str, List[str]], path: Path, repo_path: Path, changed: bool):
+    """Добавляет файл в сводку изменений (changed/unchanged)."""
+    changes["changed" if changed else "unchanged"].append(str(path.relative_to(repo_path)))
+
+def report_sync_changes(changes: Dict[str, List[str]]):
+    """
+    Выводит сводку измененных/неизмененных/удаленных файлов.
+    В GitHub Actions передает флаг site_changed в outputs шага (коммит только при изменениях).
+    """
+    print(f"📊 Файлы: {len(changes['changed'])} изменено, {len(changes['unchanged'])} без изменений, "
+          f"{len(changes['removed'])} удалено")
+    for path in changes["changed"]:
+        print(f"   ✏️  {path}")
+    for path in changes["removed"]:
+        print(f"   🗑️  {path}")
+    
+    github_output = os.getenv("GITHUB_OUTPUT")
+    if github_output:
+        site_changed = bool(changes["changed"] or changes["removed"])
+        with open(github_output, 'a', encoding='utf-8') as f:
+            f.write(f"site_changed={'true' if site_changed else 'false'}\n")
+
+@lru_cache(maxsize=4096)
+def parse_notion_date(value: Optional[str], local: bool = False) -> Optional[datetime]:
+    """
+    Разбирает дату Notion (дата 'YYYY-MM-DD' или дата-время ISO 8601 с 'Z'/смещением).
+    
+    Args:
+        value: Строка даты из Notion
+        local: Перевести дату со смещением в локальный часовой пояс (без tzinfo)
+        
+    Returns:
+        datetime (с tzinfo, если он был в строке и local=False) или None, если дата некорректна
+    """
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        print(f"⚠️  Ошибка парсинга даты '{value}'")
+        return None
+    if local and parsed.tzinfo:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+def get_page_date(page: Dict, local: bool = False) -> Optional[datetime]:
+    """
+    Дата публикации страницы: Published Date, если заполнена, иначе created_time.
+    
+    Args:
+        page: Объект страницы из Notion API
+        local: Перевести дату в локальный часовой пояс
+        
+    Returns:
+        datetime или None, если у страницы нет корректной даты
+    """
+    published = page.get("properties", {}).get("Published Date", {}).get("date")
+    if published and published.get("start"):
+        return parse_notion_date(published["start"], local)
+    return parse_notion_date(page.get("created_time"), local)
+
+def build_date_filter(date_from: Optional[date] = None, date_to: Optional[date] = None,
+                      base_conditions: Optional[List[Dict]] = None) -> Optional[Dict]:
+    """
+    Фильтр Notion по дате публикации: Published Date в окне, а для страниц без неё - created_time.
+    Окно расширено на день с каждой стороны: Notion сравнивает даты в UTC,
+    точная проверка по локальной дате выполняется после получения страниц.
+    
+    Notion допускает только два уровня вложенности составного фильтра, поэтому
+    фильтр - это or из двух and-групп, и общие условия (Published, last_edited_time)
+    повторяются в каждой группе, а не оборачивают or.
+    
+    Args:
+        date_from: Первый день окна (включительно)
+        date_to: Последний день окна (включительно)
+        base_conditions: Простые условия, обязательные для обеих групп
+        
+    Returns:
+        Фильтр {"or": [{"and": [...]}, {"and": [...]}]} или None, если окно не задано
+    """
+    if date_from is None and date_to is None:
+        return None
+    
+    published_conditions = list(base_conditions or [])
+    created_conditions = [*(base_conditions or []), {"property": "Published Date", "date": {"is_empty": True}}]
+    if date_from is not None:
+        bound = (date_from - timedelta(days=1)).isoformat()
+        published_conditions.append({"property": "Published Date", "date": {"on_or_after": bound}})
+        created_conditions.append({"timestamp": "created_time", "created_time": {"on_or_after": bound}})
+    if date_to is not None:
+        bound = (date_to + timedelta(days=1)).isoformat()
+        published_conditions.append({"property": "Published Date", "date": {"on_or_before": bound}})
+        created_conditions.append({"timestamp": "created_time", "created_time": {"on_or_before": bound}})
+    
+    return {
+        "or": [
+            {"and": published_conditions},
+            {"and": created_conditions}
+        ]
+    }
+
+def is_page_published(page: Dict) -> bool:
+    """Отмечен ли у страницы чекбокс Published."""
+    return bool(page.get("properties", {}).get("Published", {}).get("checkbox"))
+
+def fetch_notion_pages(today_only: bool = True, edited_after: Optional[str] = None,
+                       date_from: Optional[date] = None, date_to: Optional[date] = None,
+                       strict: bool = False, published_only: bool = True) -> List[Dict]:
     """
     Получает опубликованные страницы из Notion базы данных.
     
     Args:
-        today_only: Если True, возвращает только новости за сегодня
+        today_only: Если True, возвращает только новости за сегодня (то же, что date_from = date_to = сегодня)
+        edited_after: Только страницы с last_edited_time не раньше этого момента (ISO 8601),
+            фильтр выполняется на стороне Notion; страницы сортируются по last_edited_time
+            по возрастанию
+        date_from: Первый день публикации (локальная дата, включительно)
+        date_to: Последний день публикации (локальная дата, включительно)
+        strict: Пробрасывать ошибку запроса вместо возврата частичного списка
+        published_only: Только страницы с отмеченным Published (False - также снятые
+            с публикации, чтобы удалить их с сайта)
     
     Returns:
         Список словарей с данными страниц
@@ -34,47 +188,41 @@ def fetch_notion_pages(today_only: bool = True) -> List[Dict]:
         print("   Установите секреты NOTION_API_KEY и NOTION_DATABASE_ID в GitHub Secrets")
         return []
     
-    headers = {
-        "Authorization": f"Bearer {NOTION_API_KEY}",
-        "Content-Type": "application/json",
-        "Notion-Version": "2022-06-28"
-    }
+    if today_only:
+        date_from = date_to = datetime.now().date()
     
     # Фильтр: только опубликованные статьи
-    filter_conditions = {
-        "and": [
-            {
-                "property": "Published",
-                "checkbox": {
-                    "equals": True
-                }
+    base_conditions = []
+    if published_only:
+        base_conditions.append({
+            "property": "Published",
+            "checkbox": {
+                "equals": True
             }
-        ]
-    }
+        })
+    
+    # Инкрементальная синхронизация: только страницы, измененные после прошлой синхронизации
+    if edited_after:
+        base_conditions.append({
+            "timestamp": "last_edited_time",
+            "last_edited_time": {
+                "on_or_after": edited_after
+            }
+        })
     
-    # Не фильтруем по дате в запросе - получим все и отфильтруем в коде
-    # Это более надежно, так как Notion хранит даты в UTC, а нужно учитывать локальный часовой пояс
-    filter_payload = {
-        "filter": filter_conditions
-    }
+    # Окно дат фильтруется на стороне Notion - пагинация только по нужным страницам
+    date_filter = build_date_filter(date_from, date_to, base_conditions)
+    filter_conditions = date_filter or ({"and": base_conditions} if base_conditions else None)
     
-    # Сортировка по дате создания (если Published Date отсутствует)
-    # Используем created_time как fallback
-    try:
-        filter_payload["sorts"] = [
-            {
-                "property": "Published Date",
-                "direction": "descending"
-            }
-        ]
-    except:
-        # Если Published Date отсутствует, сортируем по created_time
-        filter_payload["sorts"] = [
-            {
-                "timestamp": "created_time",
-                "direction": "descending"
-            }
-        ]
+    # Инкрементальная выборка идет от старых правок к новым: при обрыве пагинации
+    # полученные страницы - префикс по last_edited_time, и водяной знак не перескочит пропущенные
+    if edited_after:
+        sort = {"timestamp": "last_edited_time", "direction": "ascending"}
+    else:
+        sort = {"property": "Published Date", "direction": "descending"}
+    filter_payload = {"sorts": [sort]}
+    if filter_conditions:
+        filter_payload["filter"] = filter_conditions
     
     all_pages = []
     start_cursor = None
@@ -85,14 +233,7 @@ def fetch_notion_pages(today_only: bool = True) -> List[Dict]:
             payload["start_cursor"] = start_cursor
         
         try:
-            response = requests.post(
-                f"{NOTION_API_URL}/databases/{NOTION_DATABASE_ID}/query",
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
-            response.raise_for_status()
-            data = response.json()
+            data = notion_request("POST", f"/databases/{NOTION_DATABASE_ID}/query", json=payload)
             
             all_pages.extend(data.get("results", []))
             
@@ -103,58 +244,36 @@ def fetch_notion_pages(today_only: bool = True) -> List[Dict]:
             
         except requests.exceptions.RequestException as e:
             print(f"❌ Ошибка получения страниц из Notion: {e}")
+            if strict:
+                raise
             break
     
-    # Если нужны только новости за сегодня, фильтруем по дате с учетом часового пояса
-    if today_only:
-        from datetime import timedelta
-        today_local = datetime.now().date()
-        filtered_pages = []
-        
-        for page in all_pages:
-            properties = page.get("properties", {})
-            if "Published Date" in properties and properties["Published Date"].get("date"):
-                date_str = properties["Published Date"]["date"]["start"]
-                try:
-                    # Парсим дату из Notion (может быть с временем и часовым поясом)
-                    if "T" in date_str:
-                        # Дата с временем - парсим и конвертируем в локальное время
-                        try:
-                            page_date = datetime.fromisoformat(date_str.replace("Z", "+00:00"))
-                        except:
-                            page_date = datetime.fromisoformat(date_str)
-                        # Если есть часовой пояс, конвертируем в локальное время
-                        if page_date.tzinfo:
-                            import time
-                            from datetime import timezone
-                            # Получаем локальный часовой пояс
-                            local_offset = time.timezone if (time.daylight == 0) else time.altzone
-                            local_tz = timezone(timedelta(seconds=-local_offset))
-                            page_date_local = page_date.astimezone(local_tz)
-                        else:
-                            page_date_local = page_date
-                    else:
-                        # Только дата без времени
-                        page_date_local = datetime.fromisoformat(date_str)
-                    
-                    # Проверяем, попадает ли дата в сегодняшний день
-                    if page_date_local.date() == today_local:
-                        filtered_pages.append(page)
-                except Exception as e:
-                    print(f"⚠️  Ошибка парсинга даты '{date_str}': {e}")
-        
-        print(f"✅ Получено {len(all_pages)} страниц из Notion, отфильтровано {len(filtered_pages)} за сегодня")
-        return filtered_pages
-    
-    print(f"✅ Получено {len(all_pages)} страниц из Notion")
-    return all_pages
+    if not date_filter:
+        print(f"✅ Получено {len(all_pages)} страниц из Notion")
+        return all_pages
+    
+    # Точная проверка окна по локальной дате (запрос к Notion захватывает соседние дни)
+    filtered_pages = []
+    for page in all_pages:
+        page_date = get_page_date(page, local=True)
+        if page_date is None:
+            continue
+        if date_from is not None and page_date.date() < date_from:
+            continue
+        if date_to is not None and page_date.date() > date_to:
+            continue
+        filtered_pages.append(page)
+    
+    print(f"✅ Получено {len(all_pages)} страниц из Notion, в окне дат {len(filtered_pages)}")
+    return filtered_pages
 
-def extract_page_content(page: Dict) -> Dict:
+def extract_page_content(page: Dict, blocks: Optional[List[Dict]] = None) -> Dict:
     """
     Извлекает контент из страницы Notion.
     
     Args:
         page: Объект страницы из Notion API
+        blocks: Уже загруженные блоки страницы (если None - загружаются)
         
     Returns:
         Словарь с данными статьи
@@ -196,28 +315,17 @@ def extract_page_content(page: Dict) -> Dict:
     if "SEO Description" in properties and properties["SEO Description"].get("rich_text"):
         seo_description = "".join([t.get("text", {}).get("content", "") for t in properties["SEO Description"]["rich_text"]])
     
-    # Извлекаем дату публикации из Notion
-    published_date = None
-    if "Published Date" in properties and properties["Published Date"].get("date"):
-        date_str = properties["Published Date"]["date"]["start"]
-        try:
-            # Парсим дату (может быть только дата или дата+время)
-            if "T" in date_str:
-                published_date = datetime.fromisoformat(date_str.replace("Z", "+00:00"))
-            else:
-                # Только дата без времени
-                published_date = datetime.fromisoformat(date_str)
-        except Exception as e:
-            print(f"⚠️  Ошибка парсинга даты '{date_str}': {e}")
+    # Описание для JSON API берется так же, как во фронтенде (app/api/news/route.ts):
+    # первое найденное свойство из DESCRIPTION_PROPERTIES, первый фрагмент текста
+    description = ""
+    description_property = next((properties[name] for name in DESCRIPTION_PROPERTIES if properties.get(name)), None)
+    if description_property:
+        parts = description_property.get("rich_text") or description_property.get("title") or []
+        if parts:
+            description = parts[0].get("plain_text") or ""
     
-    # Если дата не найдена, используем created_time страницы
-    if published_date is None:
-        created_time = page.get("created_time")
-        if created_time:
-            try:
-                published_date = datetime.fromisoformat(created_time.replace("Z", "+00:00"))
-            except:
-                pass
+    # Извлекаем дату публикации из Notion (Published Date, иначе created_time страницы)
+    published_date = get_page_date(page)
     
     # Если всё ещё нет даты, используем текущую (но это не должно происходить)
     if published_date is None:
@@ -226,7 +334,7 @@ def extract_page_content(page: Dict) -> Dict:
     
     # Получаем контент страницы (blocks)
     page_id = page.get("id")
-    content_blocks = fetch_page_blocks(page_id)
+    content_blocks = blocks if blocks is not None else fetch_page_blocks(page_id, page.get("last_edited_time"))
     
     # Конвертируем blocks в HTML
     html_content = convert_blocks_to_html(content_blocks)
@@ -239,56 +347,34 @@ def extract_page_content(page: Dict) -> Dict:
         "category": category,
         "seo_title": seo_title,
         "seo_description": seo_description,
+        "description": description,
         "published_date": published_date,
         "html_content": html_content,
         "notion_page_id": page_id
     }
 
-def fetch_page_blocks(page_id: str) -> List[Dict]:
+def fetch_page_blocks(page_id: str, last_edited_time: Optional[str] = None) -> List[Dict]:
     """
-    Получает все блоки страницы из Notion.
+    Получает все блоки страницы из Notion (с вложенными блоками в поле children).
     
     Args:
         page_id: ID страницы в Notion
+        last_edited_time: Время последнего изменения страницы (ключ кэша дерева блоков)
         
     Returns:
         Список блоков
     """
-    headers = {
-        "Authorization": f"Bearer {NOTION_API_KEY}",
-        "Content-Type": "application/json",
-        "Notion-Version": "2022-06-28"
-    }
-    
-    all_blocks = []
-    start_cursor = None
-    
-    while True:
-        url = f"{NOTION_API_URL}/blocks/{page_id}/children"
-        if start_cursor:
-            url += f"?start_cursor={start_cursor}"
-        
-        try:
-            response = requests.get(url, headers=headers, timeout=30)
-            response.raise_for_status()
-            data = response.json()
-            
-            all_blocks.extend(data.get("results", []))
-            
-            if not data.get("has_more"):
-                break
-            
-            start_cursor = data.get("next_cursor")
-            
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Ошибка получения блоков: {e}")
-            break
-    
-    return all_blocks
+    try:
+        return fetch_block_tree(page_id, last_edited_time)
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Ошибка получения блоков: {e}")
+        return []
 
 def convert_blocks_to_html(blocks: List[Dict]) -> str:
     """
     Конвертирует Notion blocks в HTML.
+    Вложенные блоки (поле children) рендерятся рекурсивно: вложенные списки,
+    toggle, колонки, содержимое callout и цитат.
     
     Args:
         blocks: Список блоков из Notion
@@ -297,33 +383,55 @@ def convert_blocks_to_html(blocks: List[Dict]) -> str:
         HTML строка
     """
     html_parts = []
+    # Открытый список (ul/ol): соседние элементы списка объединяются в один
+    list_tag = None
     
     for block in blocks:
         block_type = block.get("type")
+        block_list_tag = LIST_TAGS.get(block_type)
+        if list_tag and block_list_tag != list_tag:
+            html_parts.append(f"</{list_tag}>")
+            list_tag = None
+        if block_list_tag and not list_tag:
+            html_parts.append(f"<{block_list_tag}>")
+            list_tag = block_list_tag
         
-        if block_type == "heading_1":
-            text = extract_rich_text(block.get("heading_1", {}).get("rich_text", []))
-            html_parts.append(f"<h1>{text}</h1>")
-        
-        elif block_type == "heading_2":
-            text = extract_rich_text(block.get("heading_2", {}).get("rich_text", []))
-            html_parts.append(f"<h2>{text}</h2>")
+        children_html = convert_blocks_to_html(block.get("children", []))
         
-        elif block_type == "heading_3":
-            text = extract_rich_text(block.get("heading_3", {}).get("rich_text", []))
-            html_parts.append(f"<h3>{text}</h3>")
+        if block_type in ("heading_1", "heading_2", "heading_3"):
+            text = extract_rich_text(block.get(block_type, {}).get("rich_text", []))
+            tag = f"h{block_type[-1]}"
+            html_parts.append(f"<{tag}>{text}</{tag}>")
+            # Раскрывающийся заголовок: содержимое выводится под ним
+            if children_html:
+                html_parts.append(children_html)
         
         elif block_type == "paragraph":
             text = extract_rich_text(block.get("paragraph", {}).get("rich_text", []))
             html_parts.append(f"<p>{text}</p>")
+            if children_html:
+                html_parts.append(children_html)
         
-        elif block_type == "bulleted_list_item":
-            text = extract_rich_text(block.get("bulleted_list_item", {}).get("rich_text", []))
-            html_parts.append(f"<li>{text}</li>")
+        elif block_type in LIST_TAGS:
+            text = extract_rich_text(block.get(block_type, {}).get("rich_text", []))
+            html_parts.append(f"<li>{text}{children_html}</li>")
         
-        elif block_type == "numbered_list_item":
-            text = extract_rich_text(block.get("numbered_list_item", {}).get("rich_text", []))
-            html_parts.append(f"<li>{text}</li>")
+        elif block_type == "toggle":
+            text = extract_rich_text(block.get("toggle", {}).get("rich_text", []))
+            html_parts.append(f"<details><summary>{text}</summary>{children_html}</details>")
+        
+        elif block_type == "quote":
+            text = extract_rich_text(block.get("quote", {}).get("rich_text", []))
+            html_parts.append(f"<blockquote>{text}{children_html}</blockquote>")
+        
+        elif block_type == "column_list":
+            html_parts.append(f'<div class="columns">{children_html}</div>')
+        
+        elif block_type == "column":
+            html_parts.append(f'<div class="column">{children_html}</div>')
+        
+        elif block_type == "synced_block":
+            html_parts.append(children_html)
         
         elif block_type == "image":
             image_data = block.get("image", {})
@@ -339,7 +447,10 @@ def convert_blocks_to_html(blocks: List[Dict]) -> str:
         
         elif block_type == "callout":
             text = extract_rich_text(block.get("callout", {}).get("rich_text", []))
-            html_parts.append(f'<div class="callout">{text}</div>')
+            html_parts.append(f'<div class="callout">{text}{children_html}</div>')
+    
+    if list_tag:
+        html_parts.append(f"</{list_tag}>")
     
     return "\n".join(html_parts)
 
@@ -396,123 +507,42 @@ def sync_notion_to_github():
     import sys
     full_sync = "--full" in sys.argv or os.getenv("FULL_SYNC", "false").lower() == "true"
     
+    repo_path = Path(GITHUB_REPO_PATH).expanduser().resolve()
+    manifest = load_sync_manifest(repo_path)
+    watermark = manifest.get("watermark")
+    if not full_sync and not (watermark and manifest.get("complete")):
+        # Без водяного знака (первый запуск, поврежденный манифест) или с манифестом, который
+        # не прошел полную синхронизацию, загружаются все статьи: иначе старые статьи
+        # не попадут в манифест и JSON API и не удалятся при снятии с публикации
+        print("🆕 Манифест синхронизации неполный: загружаются все статьи")
+        full_sync = True
+    # Время загрузки сохраняется в манифесте: last_edited_time в Notion округлено до минуты
+    fetched_at = datetime.now(timezone.utc).isoformat()
+    
     if full_sync:
         print("🔄 РЕЖИМ ПОЛНОЙ СИНХРОНИЗАЦИИ: обновление всех новостей из Notion")
-        pages = fetch_notion_pages(today_only=False)
+        # Полный список нужен целиком: по нему удаляются снятые с публикации статьи
+        pages = fetch_notion_pages(today_only=False, strict=True)
     else:
-        # Синхронизируем новости за последние 30 дней для более полного охвата
-        from datetime import timedelta
-        today = datetime.now().date()
-        days_ago = today - timedelta(days=30)
-        print(f"📅 Фильтр: новости за последние 30 дней (с {days_ago} по {today})")
-        all_pages = fetch_notion_pages(today_only=False)
-        # Фильтруем по дате в коде
-        pages = []
-        for page in all_pages:
-            properties = page.get("properties", {})
-            if "Published Date" in properties and properties["Published Date"].get("date"):
-                date_str = properties["Published Date"]["date"]["start"]
-                try:
-                    if "T" in date_str:
-                        page_date = datetime.fromisoformat(date_str.replace("Z", "+00:00"))
-                    else:
-                        page_date = datetime.fromisoformat(date_str)
-                    if page_date.tzinfo:
-                        import time
-                        from datetime import timezone
-                        local_offset = time.timezone if (time.daylight == 0) else time.altzone
-                        local_tz = timezone(timedelta(seconds=-local_offset))
-                        page_date_local = page_date.astimezone(local_tz)
-                    else:
-                        page_date_local = page_date
-                    page_date_only = page_date_local.date()
-                    # Включаем новости за последние 30 дней
-                    if days_ago <= page_date_only <= today:
-                        pages.append(page)
-                    # Всегда включаем новости за сегодня (дополнительная проверка для надежности)
-                    elif page_date_only == today:
-                        pages.append(page)
-                    # Также включаем новости за вчера, если они созданы поздно вечером (могут быть за сегодня)
-                    elif page_date_only == (today - timedelta(days=1)) and page_date_local.hour >= 20:
-                        pages.append(page)
-                    # Включаем новости за завтра, если часовой пояс делает их сегодняшними (раннее утро)
-                    elif page_date_only == (today + timedelta(days=1)) and page_date_local.hour < 12:
-                        pages.append(page)
-                    # Дополнительно: если дата в пределах 1 дня от сегодня, включаем (на случай проблем с часовым поясом)
-                    elif abs((page_date_only - today).days) <= 1:
-                        print(f"📅 Включаем новость с датой {page_date_only} (близко к сегодня {today})")
-                        pages.append(page)
-                except Exception as e:
-                    print(f"⚠️  Ошибка парсинга даты '{date_str}': {e}")
-                    # Если не удалось распарсить дату, включаем страницу (на случай старых новостей без даты)
-                    pages.append(page)
-            else:
-                # Если нет Published Date, проверяем created_time
-                created_time = page.get("created_time")
-                if created_time:
-                    try:
-                        created_date = datetime.fromisoformat(created_time.replace("Z", "+00:00"))
-                        if created_date.tzinfo:
-                            import time
-                            from datetime import timezone
-                            local_offset = time.timezone if (time.daylight == 0) else time.altzone
-                            local_tz = timezone(timedelta(seconds=-local_offset))
-                            created_date_local = created_date.astimezone(local_tz)
-                        else:
-                            created_date_local = created_date
-                        created_date_only = created_date_local.date()
-                        # Включаем новости за последние 30 дней
-                        if days_ago <= created_date_only <= today:
-                            pages.append(page)
-                        # Всегда включаем новости за сегодня
-                        elif created_date_only == today:
-                            pages.append(page)
-                        # Включаем новости за вчера, если они созданы поздно вечером
-                        elif created_date_only == (today - timedelta(days=1)) and created_date_local.hour >= 20:
-                            pages.append(page)
-                        # Включаем новости за завтра, если часовой пояс делает их сегодняшними
-                        elif created_date_only == (today + timedelta(days=1)) and created_date_local.hour < 12:
-                            pages.append(page)
-                    except Exception as e:
-                        print(f"⚠️  Ошибка парсинга created_time: {e}")
-                        # Если не удалось распарсить created_time, включаем страницу
-                        pages.append(page)
-                else:
-                    # Если нет ни Published Date, ни created_time, проверяем created_time напрямую
-                    created_time = page.get("created_time")
-                    if created_time:
-                        try:
-                            created_date = datetime.fromisoformat(created_time.replace("Z", "+00:00"))
-                            if created_date.tzinfo:
-                                import time
-                                from datetime import timezone
-                                local_offset = time.timezone if (time.daylight == 0) else time.altzone
-                                local_tz = timezone(timedelta(seconds=-local_offset))
-                                created_date_local = created_date.astimezone(local_tz)
-                            else:
-                                created_date_local = created_date
-                            created_date_only = created_date_local.date()
-                            # Включаем если создана сегодня или вчера (может быть новая)
-                            if created_date_only >= (today - timedelta(days=1)):
-                                pages.append(page)
-                        except Exception as e:
-                            print(f"⚠️  Ошибка парсинга created_time для страницы без Published Date: {e}")
-                            # Если не удалось распарсить, не включаем (старая страница без даты)
-                    # Если вообще нет даты, не включаем
+        # Запрашиваем только страницы, измененные после последней синхронизации, включая
+        # снятые с публикации (снятие галочки Published тоже меняет last_edited_time).
+        # Удаленные в корзину страницы Notion не возвращает - их убирает только --full
+        print(f"🔄 Инкрементальная синхронизация: страницы, измененные с {watermark}")
+        pages = fetch_notion_pages(today_only=False, edited_after=watermark, strict=True, published_only=False)
     
     if not pages:
         if full_sync:
             print("⚠️  Нет опубликованных статей в Notion")
         else:
-            print(f"⚠️  Нет опубликованных статей в Notion за {today}")
+            print("✅ Нет измененных статей с последней синхронизации")
+        report_sync_changes({"changed": [], "unchanged": [], "removed": []})
         return
     
     if full_sync:
         print(f"✅ Найдено {len(pages)} новостей в Notion (полная синхронизация)")
     else:
-        print(f"✅ Найдено {len(pages)} новостей за сегодня")
+        print(f"✅ Найдено {len(pages)} измененных новостей")
     
-    repo_path = Path(GITHUB_REPO_PATH).expanduser().resolve()
     print(f"📁 Репозиторий: {repo_path}")
     print(f"📁 GITHUB_REPO_PATH: {GITHUB_REPO_PATH}")
     
@@ -528,11 +558,58 @@ def sync_notion_to_github():
         print(f"❌ Ошибка импорта web_publisher: {e}")
         raise
     
-    articles_data = []
-    
+    changes = {"changed": [], "unchanged": [], "removed": []}
+    failed_pages = []
+    
+    def remove_article(page_id: str):
+        """Удаляет статью, снятую с публикации (JSON API чистит build_news_api)."""
+        old_file = posts_dir / f"{manifest['pages'][page_id]['slug']}.html"
+        if old_file.exists():
+            old_file.unlink()
+            changes["removed"].append(str(old_file.relative_to(repo_path)))
+            print(f"🗑️  Удалена снятая с публикации статья: {old_file.name}")
+        del manifest["pages"][page_id]
+    
+    # Инкрементальная синхронизация: измененные страницы без Published удаляются с сайта
+    unpublished_ids = {page.get("id") for page in pages if not is_page_published(page)}
+    for page_id in unpublished_ids & set(manifest["pages"]):
+        remove_article(page_id)
+    
+    # Страницы, не менявшиеся с прошлой синхронизации, не запрашиваем и не рендерим.
+    # Если прошлая загрузка была в ту же минуту, что и last_edited_time, правка могла
+    # остаться незамеченной (Notion округляет время до минуты) - страница рендерится заново
+    changed_pages = []
     for page in pages:
+        if page.get("id") in unpublished_ids:
+            continue
+        entry = manifest["pages"].get(page.get("id"))
+        if (not full_sync and entry and entry.get("last_edited_time") == page.get("last_edited_time")
+                and fetched_after_edit(entry.get("last_edited_time"), entry.get("fetched_at"))
+                and (posts_dir / f"{entry['slug']}.html").exists()
+                and (repo_path / article_path(entry["slug"])).exists()):
+            record_change(changes, posts_dir / f"{entry['slug']}.html", repo_path, False)
+        else:
+            changed_pages.append(page)
+    
+    # Блоки всех измененных страниц загружаются параллельно (с лимитом частоты Notion API)
+    if changed_pages:
+        print(f"📥 Загрузка блоков {len(changed_pages)} страниц...")
+    blocks_by_page = fetch_block_trees(changed_pages)
+    known = {}
+    
+    for page in changed_pages:
+        page_id = page.get("id")
+        last_edited_time = page.get("last_edited_time")
+        entry = manifest["pages"].get(page_id)
+        
+        # Блоки не загрузились - страница остается со старой версией в манифесте до следующего запуска
+        if page_id not in blocks_by_page:
+            print(f"⚠️  Пропуск страницы {page_id}: не удалось загрузить блоки")
+            failed_pages.append(page)
+            continue
+        
         try:
-            article_data = extract_page_content(page)
+            article_data = extract_page_content(page, blocks_by_page[page_id])
             print(f"📄 Обработка: {article_data.get('title', 'Unknown')[:50]}...")
             
             # Создаем HTML статью
@@ -551,18 +628,43 @@ def sync_notion_to_github():
                 article_data["published_date"]  # Передаем дату публикации из Notion
             )
             
-            # Сохраняем HTML файл
+            # Сохраняем HTML файл, только если отрендеренный контент изменился
             html_file = posts_dir / f"{slug}.html"
-            print(f"💾 Сохранение: {html_file}")
-            with open(html_file, 'w', encoding='utf-8') as f:
-                f.write(html_content)
+            html_hash = content_hash(html_content)
+            if write_if_changed(html_file, html_content):
+                print(f"💾 Сохранение: {html_file}")
+                record_change(changes, html_file, repo_path, True)
+            else:
+                print(f"⏭️  Контент не изменился: {html_file.name}")
+                record_change(changes, html_file, repo_path, False)
             
-            articles_data.append({
+            # Заголовок изменился → slug другой, старый файл удаляем
+            if entry and entry.get("slug") and entry["slug"] != slug:
+                old_file = posts_dir / f"{entry['slug']}.html"
+                if old_file.exists():
+                    old_file.unlink()
+                    changes["removed"].append(str(old_file.relative_to(repo_path)))
+                    print(f"🗑️  Удален файл со старым slug: {old_file.name}")
+            
+            manifest["pages"][page_id] = {
+                "last_edited_time": last_edited_time,
+                "fetched_at": fetched_at,
+                "content_hash": html_hash,
                 "slug": slug,
                 "url": article_url,
                 "title": article_data["title"],
-                "date": article_data["published_date"]
-            })
+                "date": article_data["published_date"].isoformat(),
+                "description": article_data["description"],
+                "source_url": article_data["source_url"],
+                "source_name": article_data["source_name"],
+                "category": article_data["category"]
+            }
+            # JSON статьи для статического API (блоки уже загружены)
+            api_changed = write_article(repo_path, article_summary(page_id, manifest["pages"][page_id]),
+                                        blocks_by_page[page_id], article_data["html_content"])
+            record_change(changes, repo_path / article_path(slug), repo_path, api_changed)
+            # Метаданные для индекса статей - без повторного разбора файла при сборке сайта
+            known[html_file.name] = parse_article_html(html_content, html_file.name)
             
             print(f"✅ Синхронизировано: {article_data['title'][:50]}...")
             
@@ -570,75 +672,44 @@ def sync_notion_to_github():
             print(f"❌ Ошибка обработки страницы: {e}")
             import traceback
             traceback.print_exc()
+            failed_pages.append(page)
     
-    # Обновляем sitemap
-    print("🗺️  Обновление sitemap.xml...")
-    update_sitemap_from_articles(articles_data, repo_path)
+    # Полная синхронизация: статьи, которых больше нет среди опубликованных, удаляются
+    if full_sync:
+        published_ids = {page.get("id") for page in pages}
+        for page_id in [page_id for page_id in manifest["pages"] if page_id not in published_ids]:
+            remove_article(page_id)
+    
+    # Водяной знак - самое позднее last_edited_time среди полученных страниц, но не позже
+    # необработанных (они будут запрошены снова). Фильтр on_or_after включает границу,
+    # повторно полученные страницы отсекаются по манифесту
+    edited_times = [page.get("last_edited_time") for page in pages if page.get("last_edited_time")]
+    failed_times = [page.get("last_edited_time") for page in failed_pages if page.get("last_edited_time")]
+    if edited_times:
+        new_watermark = max([watermark or ""] + edited_times)
+        if failed_times:
+            new_watermark = min([new_watermark] + failed_times)
+        manifest["watermark"] = new_watermark
+    if full_sync:
+        # Манифест содержит все опубликованные статьи - дальше достаточно инкрементальной синхронизации
+        manifest["complete"] = True
+    record_change(changes, repo_path / SYNC_MANIFEST_PATH, repo_path, save_sync_manifest(repo_path, manifest))
     
-    # Обновляем index.html
-    print("📄 Обновление index.html...")
-    update_index_from_articles(articles_data, repo_path)
+    # Статический JSON API: карта slug и страницы списка статей
+    for path, changed in build_news_api(repo_path, manifest["pages"]).items():
+        record_change(changes, repo_path / path, repo_path, changed)
     
-    # Обновляем RSS feed
-    print("📡 Обновление RSS feed...")
-    update_rss_from_articles(articles_data, repo_path)
+    # index.html, архив, фиды и sitemap.xml собираются в процессе за один проход;
+    # метаданные статей берутся из индекса posts_index (записанные сейчас - из known)
+    print("🏗️  Сборка index.html, архива, фидов и sitemap.xml...")
+    for path, changed in build_site(repo_path, known, SITE_URL).items():
+        record_change(changes, repo_path / path, repo_path, changed)
     
+    report_sync_changes(changes)
     print("=" * 80)
-    print(f"✅ Синхронизация завершена: {len(articles_data)} статей")
+    print(f"✅ Синхронизация завершена: {len(manifest['pages'])} статей")
     print("=" * 80)
 
-def update_sitemap_from_articles(articles: List[Dict], repo_path: Path):
-    """Обновляет sitemap.xml на основе статей."""
-    sitemap_path = repo_path / "sitemap.xml"
-    
-    sitemap_content = """<?xml version="1.0" encoding="UTF-8"?>
-<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
-  <url>
-    <loc>{}</loc>
-    <lastmod>{}</lastmod>
-    <changefreq>daily</changefreq>
-    <priority>1.0</priority>
-  </url>
-""".format(SITE_URL, datetime.now().strftime("%Y-%m-%d"))
-    
-    for article in articles:
-        lastmod = article["date"].strftime("%Y-%m-%d")
-        sitemap_content += f"""  <url>
-    <loc>{article["url"]}</loc>
-    <lastmod>{lastmod}</lastmod>
-    <changefreq>monthly</changefreq>
-    <priority>0.8</priority>
-  </url>
-"""
-    
-    sitemap_content += "</urlset>"
-    
-    with open(sitemap_path, 'w', encoding='utf-8') as f:
-        f.write(sitemap_content)
-    
-    print(f"✅ Sitemap обновлен: {len(articles)} статей")
-
-def update_index_from_articles(articles: List[Dict], repo_path: Path):
-    """Обновляет index.html на основе статей."""
-    # Используем существующий скрипт update_index.py
-    update_script = repo_path / "update_index.py"
-    if update_script.exists():
-        subprocess.run(
-            ["python3", str(update_script)],
-            cwd=str(repo_path),
-            timeout=30
-        )
-
-def update_rss_from_articles(articles: List[Dict], repo_path: Path):
-    """Обновляет RSS feed на основе статей."""
-    rss_script = repo_path / "generate_rss.py"
-    if rss_script.exists():
-        subprocess.run(
-            ["python3", str(rss_script)],
-            cwd=str(repo_path),
-            timeout=30
-        )
-
 if __name__ == "__main__":
     import sys
     from datetime import datetime
@@ -0,0 +1,314 @@
+"""
+Модуль чекпоинтов пайплайна публикации.
+Сохраняет результат каждого этапа process_news в SQLite (ключ - канонический URL новости),
+чтобы после падения процесса следующий запуск продолжил с последнего завершенного этапа,
+не повторяя поиск, платный вызов LLM и публикацию в Telegram.
+"""
+import os
+import json
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+
+from dotenv import load_dotenv
+
+from published_news_db import get_connection
+
+load_dotenv()
+
+# Чекпоинты старше этого возраста не возобновляются (новость уже не свежая)
+CHECKPOINT_MAX_AGE_HOURS = int(os.getenv("CHECKPOINT_MAX_AGE_HOURS", "24"))
+# Максимальное количество возобновлений одной новости
+CHECKPOINT_MAX_RESUMES = int(os.getenv("CHECKPOINT_MAX_RESUMES", "3"))
+
+# Этапы пайплайна в порядке выполнения
+STAGES = ["selected", "validated", "image", "generated", "telegram", "notion", "completed"]
+
+# Поля чекпоинта, хранящиеся в JSON
+_JSON_FIELDS = ("candidate", "versions")
+
+# Query-параметры, не влияющие на содержимое статьи
+_TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid", "ref", "cmpid")
+
+
+def canonicalize_news_url(url: str) -> str:
+    """
+    Приводит URL новости к каноническому виду для использования в качестве ключа.
+    Убирает www., фрагмент, трекинг-параметры и завершающий слэш.
+
+    Args:
+        url: URL новости
+
+    Returns:
+        Канонический URL или пустая строка
+    """
+    if not url:
+        return ""
+
+    parsed = urlparse(url.strip())
+    netloc = parsed.netloc.lower()
+    if netloc.startswith("www."):
+        netloc = netloc[4:]
+
+    query = [(k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+             if not k.lower().startswith(_TRACKING_PARAMS)]
+    path = parsed.path.rstrip("/") or "/"
+
+    return urlunparse((parsed.scheme.lower() or "https", netloc, path, "", urlencode(sorted(query)), ""))
+
+
+def init_checkpoints():
+    """Создает таблицу pipeline_checkpoints если её нет."""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS pipeline_checkpoints (
+            news_key TEXT PRIMARY KEY,
+            news_url TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            status TEXT DEFAULT 'in_progress',
+            candidate TEXT,
+            validated INTEGER DEFAULT 0,
+            image_path TEXT,
+            versions TEXT,
+            tg_message_id TEXT,
+            notion_page_id TEXT,
+            resume_count INTEGER DEFAULT 0,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP
+        )
+    """)
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_checkpoint_status ON pipeline_checkpoints(status, updated_at)
+    """)
+
+    conn.commit()
+    conn.close()
+
+
+def _row_to_checkpoint(row: sqlite3.Row) -> Dict:
+    """Преобразует строку БД в словарь чекпоинта с распарсенными JSON полями."""
+    checkpoint = dict(row)
+    for field in _JSON_FIELDS:
+        if checkpoint.get(field):
+            try:
+                checkpoint[field] = json.loads(checkpoint[field])
+            except (json.JSONDecodeError, TypeError):
+                checkpoint[field] = None
+    checkpoint["validated"] = bool(checkpoint.get("validated"))
+    return checkpoint
+
+
+def get_checkpoint(news_url: str, include_finished: bool = False) -> Optional[Dict]:
+    """
+    Возвращает чекпоинт новости.
+
+    Args:
+        news_url: URL новости
+        include_finished: Возвращать также завершенные и брошенные чекпоинты
+
+    Returns:
+        Словарь чекпоинта или None (по умолчанию - если пайплайн новости не в процессе)
+    """
+    news_key = canonicalize_news_url(news_url)
+    if not news_key:
+        return None
+
+    init_checkpoints()
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM pipeline_checkpoints WHERE news_key = ?", (news_key,))
+    row = cursor.fetchone()
+    conn.close()
+
+    if not row or (not include_finished and row["status"] != "in_progress"):
+        return None
+    return _row_to_checkpoint(row)
+
+
+def start_checkpoint(news_url: str, candidate: Dict) -> Optional[Dict]:
+    """
+    Начинает (или продолжает) пайплайн выбранной новости.
+    Создает чекпоинт на этапе "selected"; завершенный или брошенный чекпоинт
+    повторно выбранной новости снова переводится в работу (статус in_progress,
+    сброс ошибки и счетчика возобновлений) с сохранением результатов этапов -
+    уже опубликованное не публикуется повторно.
+
+    Args:
+        news_url: URL новости
+        candidate: Данные новости
+
+    Returns:
+        Словарь чекпоинта или None (пустой URL или ошибка БД)
+    """
+    news_key = canonicalize_news_url(news_url)
+    if not news_key:
+        return None
+
+    init_checkpoints()
+    conn = get_connection()
+    cursor = conn.cursor()
+    now = datetime.now().isoformat()
+
+    try:
+        cursor.execute("""
+            INSERT OR IGNORE INTO pipeline_checkpoints (news_key, news_url, stage, updated_at)
+            VALUES (?, ?, 'selected', ?)
+        """, (news_key, news_url, now))
+        cursor.execute("""
+            UPDATE pipeline_checkpoints
+            SET candidate = ?, updated_at = ?,
+                resume_count = CASE WHEN status = 'in_progress' THEN resume_count ELSE 0 END,
+                error = CASE WHEN status = 'in_progress' THEN error ELSE NULL END,
+                status = 'in_progress'
+            WHERE news_key = ?
+        """, (json.dumps(candidate, ensure_ascii=False), now, news_key))
+        conn.commit()
+        cursor.execute("SELECT * FROM pipeline_checkpoints WHERE news_key = ?", (news_key,))
+        return _row_to_checkpoint(cursor.fetchone())
+    except sqlite3.Error as e:
+        print(f"⚠️  Ошибка сохранения чекпоинта: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def save_checkpoint(news_url: str, stage: str, **fields) -> bool:
+    """
+    Сохраняет результат этапа пайплайна (обновляет только переданные поля).
+
+    Args:
+        news_url: URL новости
+        stage: Завершенный этап (см. STAGES)
+        **fields: Результаты этапа: candidate, validated, image_path, versions,
+                  tg_message_id, notion_page_id
+
+    Returns:
+        True если успешно сохранено
+    """
+    news_key = canonicalize_news_url(news_url)
+    if not news_key:
+        return False
+
+    values = {}
+    for key, value in fields.items():
+        if key in _JSON_FIELDS and value is not None:
+            value = json.dumps(value, ensure_ascii=False)
+        elif key == "validated":
+            value = int(bool(value))
+        elif key == "image_path" and value is not None:
+            value = str(value)
+        values[key] = value
+
+    init_checkpoints()
+    conn = get_connection()
+    cursor = conn.cursor()
+    now = datetime.now().isoformat()
+
+    try:
+        cursor.execute("""
+            INSERT OR IGNORE INTO pipeline_checkpoints (news_key, news_url, stage, updated_at)
+            VALUES (?, ?, ?, ?)
+        """, (news_key, news_url, stage, now))
+
+        # Этапы выполняются параллельно, поэтому stage не откатываем назад
+        cursor.execute("SELECT stage FROM pipeline_checkpoints WHERE news_key = ?", (news_key,))
+        current_stage = cursor.fetchone()["stage"]
+        if current_stage in STAGES and stage in STAGES and STAGES.index(current_stage) > STAGES.index(stage):
+            stage = current_stage
+
+        assignments = ", ".join(f"{key} = ?" for key in values)
+        sql = f"UPDATE pipeline_checkpoints SET stage = ?, updated_at = ?{', ' + assignments if assignments else ''} WHERE news_key = ?"
+        cursor.execute(sql, (stage, now, *values.values(), news_key))
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        print(f"⚠️  Ошибка сохранения чекпоинта: {e}")
+        return False
+    finally:
+        conn.close()
+
+
+def _set_status(news_url: str, status: str, error: str = ""):
+    """Обновляет статус чекпоинта."""
+    news_key = canonicalize_news_url(news_url)
+    if not news_key:
+        return
+
+    init_checkpoints()
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            UPDATE pipeline_checkpoints SET status = ?, error = ?, updated_at = ? WHERE news_key = ?
+        """, (status, error[:500], datetime.now().isoformat(), news_key))
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"⚠️  Ошибка обновления чекпоинта: {e}")
+    finally:
+        conn.close()
+
+
+def complete_checkpoint(news_url: str):
+    """
+    Помечает пайплайн новости как завершенный.
+
+    Args:
+        news_url: URL новости
+    """
+    save_checkpoint(news_url, "completed")
+    _set_status(news_url, "completed")
+
+
+def abandon_checkpoint(news_url: str, reason: str = ""):
+    """
+    Помечает пайплайн новости как брошенный (новость не будет возобновляться).
+
+    Args:
+        news_url: URL новости
+        reason: Причина отказа от новости
+    """
+    _set_status(news_url, "abandoned", reason)
+
+
+def get_resumable_checkpoint() -> Optional[Dict]:
+    """
+    Возвращает самый свежий незавершенный чекпоинт, который можно возобновить.
+    Увеличивает счетчик возобновлений; после CHECKPOINT_MAX_RESUMES чекпоинт бросается.
+
+    Returns:
+        Словарь чекпоинта (с кандидатом) или None
+    """
+    init_checkpoints()
+    conn = get_connection()
+    cursor = conn.cursor()
+    cutoff = (datetime.now() - timedelta(hours=CHECKPOINT_MAX_AGE_HOURS)).isoformat()
+    cursor.execute("""
+        SELECT * FROM pipeline_checkpoints
+        WHERE status = 'in_progress' AND candidate IS NOT NULL AND updated_at >= ?
+        ORDER BY updated_at DESC
+        LIMIT 1
+    """, (cutoff,))
+    row = cursor.fetchone()
+
+    if not row:
+        conn.close()
+        return None
+
+    checkpoint = _row_to_checkpoint(row)
+    resume_count = checkpoint.get("resume_count", 0) + 1
+    cursor.execute("UPDATE pipeline_checkpoints SET resume_count = ? WHERE news_key = ?",
+                   (resume_count, checkpoint["news_key"]))
+    conn.commit()
+    conn.close()
+
+    if resume_count > CHECKPOINT_MAX_RESUMES:
+        abandon_checkpoint(checkpoint["news_url"], f"Превышено число возобновлений ({CHECKPOINT_MAX_RESUMES})")
+        return None
+
+    checkpoint["resume_count"] = resume_count
+    return checkpoint
@@ -3,10 +3,10 @@
 Использует промпт из Coal daily.json для создания Telegram-форматированных анализов.
 """
 import os
-import time
-import requests
 from typing import Dict
 
+from model_router import route_completion
+
 
 def create_coal_analysis(news: Dict, max_retries: int = 3) -> str:
     """
@@ -27,13 +27,6 @@ def create_coal_analysis(news: Dict, max_retries: int = 3) -> str:
     if not api_key:
         raise ValueError("ANTHROPIC_API_KEY not set in environment")
     
-    # Используем OpenRouter API для доступа к Claude
-    url = "https://openrouter.ai/api/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    
     # Промпт из Coal daily.json (улучшенный для строгого контроля длины и специфики угольного рынка)
     system_prompt = """You are Bench Energy — a leading global coal market expert with 15+ years of experience in commodities trading, supply chain analysis, and market forecasting. You provide expert market intelligence that explains deeper implications of coal market news.
 
@@ -162,79 +155,59 @@ CRITICAL INSTRUCTIONS:
 <a href="{source_url}">Source: {source_name}</a>
 5. Total length must be under 1024 characters including category header, content, hashtags, and source link"""
     
-    backoff = 1
-    last_error = None
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
     
-    payload = {
-        "model": "anthropic/claude-3.5-haiku",
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ],
-        "max_tokens": 1600,
-        "temperature": 1
-    }
+    # Модель и резервного провайдера выбирает маршрутизатор (повторы, лимиты и учет токенов - в llm_client)
+    try:
+        result = route_completion("coal_analysis", messages, max_tokens=1600, temperature=1, timeout=60,
+                                  max_retries=max_retries, cache_system=True)["text"]
+    except Exception as e:
+        raise Exception(f"Не удалось создать пост после {max_retries} попыток: {e}") from e
     
-    for attempt in range(max_retries):
-        try:
-            response = requests.post(url, headers=headers, json=payload, timeout=60)
-            response.raise_for_status()
-            data = response.json()
-            
-            result = data['choices'][0]['message']['content'].strip()
-            
-            # КРИТИЧНО: Обрезаем пост ДО добавления ссылки, чтобы поместился в caption (1024 символа)
-            # Учитываем: категория в заголовке (~50), хештеги (~80), ссылка (~30) = ~160 символов
-            # Расширенное экспертное мнение теперь ~250 символов вместо ~80
-            MAX_LENGTH = 950  # Оставляем ~74 символа для категории, хештегов и ссылки (расширенное экспертное мнение учтено)
-            if len(result) > MAX_LENGTH:
-                print(f"   ⚠️  Пост слишком длинный ({len(result)} символов), обрезаю до {MAX_LENGTH}...")
-                # Пытаемся обрезать по последнему полному предложению или параграфу
-                text_to_trim = result[:MAX_LENGTH]
-                last_period = text_to_trim.rfind('.')
-                last_newline = text_to_trim.rfind('\n')
-                last_tag_close = text_to_trim.rfind('>')
-                cut_point = max(last_period, last_newline, last_tag_close)
-                if cut_point > 600:  # Если нашли хорошую точку обрезки
-                    result = result[:cut_point + 1]
-                else:
-                    result = result[:MAX_LENGTH] + "..."
-                print(f"   ✅ Пост обрезан до {len(result)} символов")
-            
-            # ВСЕГДА добавляем ссылку на источник (если есть URL и название)
-            if source_url and source_name:
-                source_link = f'<a href="{source_url}">Source: {source_name}</a>'
-                # Проверяем, есть ли уже ссылка
-                if source_link not in result and f"Source: {source_name}" not in result:
-                    # Добавляем ссылку в конец, после хэштегов
-                    result = result.rstrip() + f"\n\n{source_link}"
-                    # Проверяем финальную длину
-                    if len(result) > 1024:
-                        print(f"   ⚠️  Финальный пост слишком длинный ({len(result)} символов), обрезаю ссылку...")
-                        # Обрезаем сам пост еще больше, чтобы поместилась ссылка
-                        available_length = 1024 - len(source_link) - 10  # 10 символов запас
-                        if len(result) - len(source_link) - 2 > available_length:
-                            result = result[:available_length].rstrip() + f"\n\n{source_link}"
-            else:
-                print(f"⚠️  Нет URL или названия источника, ссылка не добавлена")
-            
-            # Финальная проверка длины
+    # КРИТИЧНО: Обрезаем пост ДО добавления ссылки, чтобы поместился в caption (1024 символа)
+    # Учитываем: категория в заголовке (~50), хештеги (~80), ссылка (~30) = ~160 символов
+    # Расширенное экспертное мнение теперь ~250 символов вместо ~80
+    MAX_LENGTH = 950  # Оставляем ~74 символа для категории, хештегов и ссылки (расширенное экспертное мнение учтено)
+    if len(result) > MAX_LENGTH:
+        print(f"   ⚠️  Пост слишком длинный ({len(result)} символов), обрезаю до {MAX_LENGTH}...")
+        # Пытаемся обрезать по последнему полному предложению или параграфу
+        text_to_trim = result[:MAX_LENGTH]
+        last_period = text_to_trim.rfind('.')
+        last_newline = text_to_trim.rfind('\n')
+        last_tag_close = text_to_trim.rfind('>')
+        cut_point = max(last_period, last_newline, last_tag_close)
+        if cut_point > 600:  # Если нашли хорошую точку обрезки
+            result = result[:cut_point + 1]
+        else:
+            result = result[:MAX_LENGTH] + "..."
+        print(f"   ✅ Пост обрезан до {len(result)} символов")
+    
+    # ВСЕГДА добавляем ссылку на источник (если есть URL и название)
+    if source_url and source_name:
+        source_link = f'<a href="{source_url}">Source: {source_name}</a>'
+        # Проверяем, есть ли уже ссылка
+        if source_link not in result and f"Source: {source_name}" not in result:
+            # Добавляем ссылку в конец, после хэштегов
+            result = result.rstrip() + f"\n\n{source_link}"
+            # Проверяем финальную длину
             if len(result) > 1024:
-                print(f"   ⚠️  ФИНАЛЬНАЯ проверка: пост все еще слишком длинный ({len(result)} символов), обрезаю до 1020...")
-                result = result[:1020] + "..."
-            
-            return result
-            
-        except Exception as e:
-            last_error = e
-            if attempt < max_retries - 1:
-                wait_time = backoff * (2 ** attempt)
-                print(f"Ошибка создания поста (попытка {attempt + 1}/{max_retries}): {e}. Ожидание {wait_time} секунд...")
-                time.sleep(wait_time)
-            else:
-                raise Exception(f"Не удалось создать пост после {max_retries} попыток: {last_error}") from last_error
+                print(f"   ⚠️  Финальный пост слишком длинный ({len(result)} символов), обрезаю ссылку...")
+                # Обрезаем сам пост еще больше, чтобы поместилась ссылка
+                available_length = 1024 - len(source_link) - 10  # 10 символов запас
+                if len(result) - len(source_link) - 2 > available_length:
+                    result = result[:available_length].rstrip() + f"\n\n{source_link}"
+    else:
+        print(f"⚠️  Нет URL или названия источника, ссылка не добавлена")
+    
+    # Финальная проверка длины
+    if len(result) > 1024:
+        print(f"   ⚠️  ФИНАЛЬНАЯ проверка: пост все еще слишком длинный ({len(result)} символов), обрезаю до 1020...")
+        result = result[:1020] + "..."
     
-    raise Exception(f"Не удалось создать пост: {last_error}")
+    return result
 
 
 def _is_valid_source(source_url: str, source_name: str) -> bool:
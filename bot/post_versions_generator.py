@@ -3,22 +3,96 @@
 LinkedIn версия отключена.
 """
 import os
-import requests
-import time
-from typing import Dict
+import json
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 
+from llm_client import LLMError
+from model_router import route_completion
+from llm_batch import is_batch_enabled, has_pending_job, enqueue_job, take_ready_job
+from json_stream import IncrementalJSONParser
+from json_repair import (repair_json, validate_post_versions, fit_telegram_caption, TELEGRAM_CAPTION_LIMIT,
+                         TRUNCATED_FIELDS_KEY)
+from market_snapshot import get_snapshot, format_snapshot_context
+
 load_dotenv()
 
+# bench.energy/coal-market не существует, ссылки на полный анализ ведут на раздел новостей
+FULL_ANALYSIS_URL = "https://www.bench.energy/news/"
+
+
+def _normalize_links(text: str) -> str:
+    """Заменяет несуществующую ссылку bench.energy/coal-market на FULL_ANALYSIS_URL."""
+    return text.replace("bench.energy/coal-market", FULL_ANALYSIS_URL) if text else text
+
 
-def generate_post_versions(news: Dict, max_retries: int = 3) -> Dict[str, str]:
+def _fallback_web_version(news_title: str, news_summary: str) -> str:
+    """Минимальная Web версия, если модель не вернула полную статью."""
+    return f"<h1>{news_title}</h1><p>{news_summary}</p><h3>Bench Energy Expert View</h3><p><strong>What this means:</strong> Analysis of market implications.</p><p><strong>Market impact:</strong> Regional and price effects.</p><p><strong>Risks & Opportunities:</strong> Key factors to watch.</p>"
+
+
+# Подсказки для точечной перегенерации одного поля ответа
+FIELD_REGENERATION_HINTS = {
+    "tg_version": "Telegram version only: max 1024 characters total including HTML tags and the source link.",
+    "web_version": "Web version only: the full comprehensive HTML article as described in the rules.",
+}
+
+
+def _regenerate_field(messages: List[Dict], field: str, temperature: float, task: str) -> Optional[str]:
+    """
+    Перегенерирует одно невалидное поле ответа вместо повторения всего вызова.
+    Системный промпт тот же, поэтому он берется из кэша промптов.
+    
+    Args:
+        messages: Исходные сообщения запроса
+        field: Имя поля (tg_version, web_version)
+        temperature: Температура
+        task: Название задачи для журнала LLM
+        
+    Returns:
+        Новое значение поля или None
+    """
+    print(f"🔁 Поле {field} невалидно, запрашиваю только его")
+    request = [dict(message) for message in messages]
+    request[-1]["content"] += (
+        f"\n\nThe previous answer had a missing or invalid \"{field}\". Regenerate ONLY this field. "
+        f"{FIELD_REGENERATION_HINTS.get(field, '')}\n"
+        f"Return ONLY the JSON object: {{\"{field}\": \"...\"}}"
+    )
+    
+    def field_value(text: str) -> Optional[str]:
+        data = repair_json(text, mark_truncated=True) or {}
+        if field in data.get(TRUNCATED_FIELDS_KEY, []):
+            return None
+        value = data.get(field)
+        return value if isinstance(value, str) and value.strip() else None
+    
+    try:
+        result = route_completion(f"{task}:{field}", request, validate=lambda text: field_value(text) is not None,
+                                  max_tokens=4000 if field == "web_version" else 1000,
+                                  temperature=temperature, timeout=90, cache_system=True)["text"]
+    except LLMError as e:
+        print(f"⚠️  Не удалось перегенерировать {field}: {e}")
+        return None
+    
+    return field_value(result)
+
+
+def generate_post_versions(news: Dict, max_retries: int = 3,
+                           on_tg_version: Optional[Callable[[str], None]] = None) -> Dict[str, str]:
     """
     Генерирует две версии поста через Claude 3.5 (Telegram и Web).
     LinkedIn версия отключена.
     
+    Если передан on_tg_version, ответ читается потоком: Telegram версия отдается в
+    on_tg_version сразу после получения, пока Web версия еще генерируется. После этого
+    возвращаемая tg_version всегда совпадает с отданной.
+    
     Args:
         news: Словарь с данными новости
-        max_retries: Максимальное количество попыток
+        max_retries: Максимальное количество сетевых попыток на каждую модель
+        on_tg_version: Вызывается (из потока генерации) с готовой Telegram версией
         
     Returns:
         Словарь с ключами: tg_version, web_version
@@ -27,12 +101,6 @@ def generate_post_versions(news: Dict, max_retries: int = 3) -> Dict[str, str]:
     if not api_key:
         raise ValueError("ANTHROPIC_API_KEY not set in environment")
     
-    url = "https://openrouter.ai/api/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    
     news_title = news.get('title', '')
     news_summary = news.get('summary', '')
     source_name = news.get('source_name', 'Unknown')
@@ -151,6 +219,18 @@ WEB VERSION (web_version):
 - Optimize for "Query Fan-Out": Cover multiple facets (definitions, comparisons, costs, regional differences, historical context) in one article
 - DO NOT repeat the title as h1 in the content - the title is already provided separately"""
 
+    # Текущие цены бенчмарков из снимка дневной сводки (без новых поисковых запросов)
+    # Контекст цен необязателен: ошибка снимка не должна срывать генерацию поста
+    try:
+        snapshot_prices = format_snapshot_context(get_snapshot())
+    except Exception as e:
+        print(f"⚠️  Не удалось получить цены из снимка рыночных данных: {e}")
+        snapshot_prices = ""
+    market_context = ""
+    if snapshot_prices:
+        market_context = (f"\nCurrent benchmark prices (Bench Energy market data): {snapshot_prices}\n"
+                          f"Use these only if directly relevant to the news; do not invent other prices.\n")
+
     user_prompt = f"""Generate two platform-specific versions of this coal market news:
 
 Title: {news_title}
@@ -159,7 +239,7 @@ Summary: {news_summary}
 
 Source: {source_name}
 URL: {source_url}
-
+{market_context}
 IMPORTANT FOR WEB VERSION:
 - Write a COMPREHENSIVE, EXPANDED article (800-1500 words)
 - DO NOT just summarize - provide deep analysis, context, background
@@ -171,125 +251,115 @@ IMPORTANT FOR WEB VERSION:
 
 Return ONLY the JSON object with tg_version and web_version."""
     
-    payload = {
-        "model": "anthropic/claude-3.5-haiku",
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ],
-        "max_tokens": 4000,
-        "temperature": 0.7
-    }
-    
-    for attempt in range(max_retries):
-        try:
-            response = requests.post(url, headers=headers, json=payload, timeout=90)
-            response.raise_for_status()
-            data = response.json()
-            
-            result = data['choices'][0]['message']['content'].strip()
-            
-            # Парсим JSON из ответа
-            import json
-            # Убираем markdown код блоки если есть
-            if result.startswith("```json"):
-                result = result[7:]
-            if result.startswith("```"):
-                result = result[3:]
-            if result.endswith("```"):
-                result = result[:-3]
-            result = result.strip()
-            
-            # Извлекаем JSON
-            json_start = result.find("{")
-            json_end = result.rfind("}") + 1
-            if json_start >= 0 and json_end > json_start:
-                json_text = result[json_start:json_end]
-                versions = json.loads(json_text)
-                
-                # Проверяем наличие всех версий
-                if "tg_version" in versions and "web_version" in versions:
-                    # Нормализуем ссылку: bench.energy/coal-market не существует → https://www.bench.energy/news/
-                    full_analysis_url = "https://www.bench.energy/news/"
-                    for key in ("tg_version", "web_version"):
-                        if key in versions and versions[key]:
-                            versions[key] = versions[key].replace("bench.energy/coal-market", full_analysis_url)
-                    print(f"✅ Две версии поста сгенерированы (Telegram, Web)")
-                    return versions
-                else:
-                    print(f"⚠️  Не все версии найдены в ответе")
-                    # Пробуем создать недостающие версии
-                    if "tg_version" not in versions:
-                        # Извлекаем текст из web_version для Telegram версии
-                        import re
-                        web_text = versions.get("web_version", "")
-                        # Убираем HTML теги для Telegram версии
-                        clean_text = re.sub(r'<[^>]+>', '', web_text)
-                        versions["tg_version"] = f"<b>⛏ [COAL] | {news_title}</b>\n\n{clean_text[:800]}...\n\n#Coal #Markets #BenchEnergy\n<a href=\"{source_url}\">Source: {source_name}</a>"
-                    if "web_version" not in versions:
-                        versions["web_version"] = f"<h1>{news_title}</h1><p>{news_summary}</p>"
-                    return versions
-            else:
-                raise ValueError("JSON не найден в ответе")
-                
-        except json.JSONDecodeError as e:
-            print(f"⚠️  Ошибка парсинга JSON (попытка {attempt + 1}/{max_retries}): {e}")
-            if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)
-            else:
-                # Fallback: создаем версии вручную (Telegram blueprint optimized)
-                print(f"⚠️  Использую fallback версии")
-                # Для Telegram версии добавляем экспертное мнение с мягким началом
-                trigger = "Coal market update:"
-                expert_view = "\n\n<b>🧭 Expert View</b>\n• Market significance\n• Regional impact\n• Key factors to watch"
-                cta = "\n👉 Follow @benchenergy for daily updates"
-                tg_content = f"{trigger}\n\n<b>⛏ [COAL] | {news_title}</b>\n\n• {news_summary[:400]}\n{expert_view}\n\n#Coal #Markets #BenchEnergy{cta}\n<a href=\"{source_url}\">📰 Source: {source_name}</a>"
-                # Обрезаем если превышает 1024 символа
-                if len(tg_content) > 1024:
-                    tg_content = f"<b>⛏ [COAL] | {news_title}</b>\n\n{news_summary[:500]}{expert_view}\n\n#Coal #Markets #BenchEnergy\n<a href=\"{source_url}\">Source: {source_name}</a>"
-                    if len(tg_content) > 1024:
-                        # Еще больше обрезаем
-                        tg_content = f"<b>⛏ [COAL] | {news_title}</b>\n\n{news_summary[:400]}{expert_view}\n\n#Coal #Markets #BenchEnergy\n<a href=\"{source_url}\">Source: {source_name}</a>"
-                return {
-                    "tg_version": tg_content[:1024],
-                    "web_version": f"<h1>{news_title}</h1><p>{news_summary}</p><h3>Bench Energy Expert View</h3><p><strong>What this means:</strong> Analysis of market implications.</p><p><strong>Market impact:</strong> Regional and price effects.</p><p><strong>Risks & Opportunities:</strong> Key factors to watch.</p>"
-                }
-        except Exception as e:
-            print(f"❌ Ошибка генерации версий (попытка {attempt + 1}/{max_retries}): {e}")
-            if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)
-            else:
-                raise Exception(f"Не удалось сгенерировать версии после {max_retries} попыток: {e}") from e
-    
-    raise Exception("Не удалось сгенерировать версии поста")
-
-
-def generate_freight_post(max_retries: int = 3) -> Dict[str, str]:
-    """
-    Генерирует специальный пост о проблемах фрахта для bulk трейдинг компаний через Claude 3.5.
-    Создает контент самостоятельно, без примеров, в стиле канала.
-    Избегает дублей, генерируя новые темы каждый раз.
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
     
-    Args:
-        max_retries: Максимальное количество попыток
+    parser = IncrementalJSONParser()
+    emitted_tg = None
+    
+    def on_text(text: str):
+        nonlocal emitted_tg
+        fields = parser.feed_text(text)
+        if emitted_tg is None and fields.get("tg_version"):
+            emitted_tg = fit_telegram_caption(_normalize_links(fields["tg_version"]))
+            print(f"⚡ Telegram версия получена из потока ({len(emitted_tg)} символов), Web версия генерируется")
+            on_tg_version(emitted_tg)
+    
+    # Парсим JSON из ответа, восстанавливая структуру локально
+    # (markdown блоки, текст вокруг JSON, незакрытые скобки, неэкранированные кавычки)
+    parsed = {}
+    
+    def is_parsable(text: str) -> bool:
+        parsed["versions"] = repair_json(text, mark_truncated=True)
+        return parsed["versions"] is not None
+    
+    # Модель выбирает маршрутизатор: дешевая модель, эскалация на более сильную, если JSON не
+    # восстанавливается, и резервный провайдер при сбоях. Сетевые повторы выполняет llm_client
+    try:
+        result = route_completion("post_versions", messages, validate=is_parsable, max_tokens=4000,
+                                  temperature=0.7, timeout=90, cache_system=True, max_retries=max_retries,
+                                  on_text=on_text if on_tg_version else None)["text"]
         
-    Returns:
-        Словарь с ключами: tg_version, web_version, topic
+        versions = parsed.get("versions")
+        if versions is None:
+            raise json.JSONDecodeError("JSON не найден или не восстановлен", result, 0)
+        
+        if emitted_tg is not None:
+            versions["tg_version"] = emitted_tg
+        
+        # Длинная Telegram версия обрезается локально, пустые/короткие поля перегенерируются точечно
+        for field in validate_post_versions(versions):
+            if field == "tg_version" and emitted_tg is not None:
+                continue
+            value = _regenerate_field(messages, field, 0.7, "post_versions")
+            if value:
+                versions[field] = value
+        
+        if not versions.get("tg_version"):
+            # Извлекаем текст из web_version для Telegram версии
+            import re
+            web_text = versions.get("web_version") or ""
+            # Убираем HTML теги для Telegram версии
+            clean_text = re.sub(r'<[^>]+>', '', web_text)
+            versions["tg_version"] = f"<b>⛏ [COAL] | {news_title}</b>\n\n{clean_text[:800]}...\n\n#Coal #Markets #BenchEnergy\n<a href=\"{source_url}\">Source: {source_name}</a>"
+        if not versions.get("web_version"):
+            versions["web_version"] = f"<h1>{news_title}</h1><p>{news_summary}</p>"
+        
+        # Нормализуем ссылку: bench.energy/coal-market не существует → https://www.bench.energy/news/
+        for key in ("tg_version", "web_version"):
+            versions[key] = _normalize_links(versions[key])
+        if len(versions["tg_version"]) > TELEGRAM_CAPTION_LIMIT:
+            versions["tg_version"] = fit_telegram_caption(versions["tg_version"])
+        print(f"✅ Две версии поста сгенерированы (Telegram, Web)")
+        return versions
+    
+    except json.JSONDecodeError as e:
+        print(f"⚠️  Ошибка парсинга JSON: {e}")
+        # Fallback: создаем версии вручную (Telegram blueprint optimized)
+        print(f"⚠️  Использую fallback версии")
+        # Для Telegram версии добавляем экспертное мнение с мягким началом
+        trigger = "Coal market update:"
+        expert_view = "\n\n<b>🧭 Expert View</b>\n• Market significance\n• Regional impact\n• Key factors to watch"
+        cta = "\n👉 Follow @benchenergy for daily updates"
+        tg_content = f"{trigger}\n\n<b>⛏ [COAL] | {news_title}</b>\n\n• {news_summary[:400]}\n{expert_view}\n\n#Coal #Markets #BenchEnergy{cta}\n<a href=\"{source_url}\">📰 Source: {source_name}</a>"
+        # Обрезаем если превышает 1024 символа
+        if len(tg_content) > 1024:
+            tg_content = f"<b>⛏ [COAL] | {news_title}</b>\n\n{news_summary[:500]}{expert_view}\n\n#Coal #Markets #BenchEnergy\n<a href=\"{source_url}\">Source: {source_name}</a>"
+            if len(tg_content) > 1024:
+                # Еще больше обрезаем
+                tg_content = f"<b>⛏ [COAL] | {news_title}</b>\n\n{news_summary[:400]}{expert_view}\n\n#Coal #Markets #BenchEnergy\n<a href=\"{source_url}\">Source: {source_name}</a>"
+        return {
+            "tg_version": emitted_tg if emitted_tg is not None else tg_content[:1024],
+            "web_version": _fallback_web_version(news_title, news_summary)
+        }
+    except LLMError as e:
+        if emitted_tg is not None:
+            # Telegram версия уже отдана на публикацию - не теряем её из-за обрыва Web версии
+            print(f"⚠️  Web версия не получена ({e}), использую fallback Web версию")
+            return {"tg_version": emitted_tg, "web_version": _fallback_web_version(news_title, news_summary)}
+        raise Exception(f"Не удалось сгенерировать версии: {e}") from e
+    except Exception as e:
+        print(f"❌ Ошибка генерации версий: {e}")
+        if emitted_tg is not None:
+            return {"tg_version": emitted_tg, "web_version": _fallback_web_version(news_title, news_summary)}
+        raise Exception(f"Не удалось сгенерировать версии: {e}") from e
+
+
+def build_freight_post_request() -> Tuple[List[Dict], str]:
     """
-    api_key = os.getenv("ANTHROPIC_API_KEY")
-    if not api_key:
-        raise ValueError("ANTHROPIC_API_KEY not set in environment")
+    Формирует запрос на специальный пост о фрахте: выбирает новую тему (избегая
+    уже опубликованных) и собирает сообщения для модели.
+    Используется и при интерактивной генерации, и при постановке в пакетную очередь.
     
+    Returns:
+        Кортеж (messages, topic)
+    """
     # Получаем список уже опубликованных тем
     from storage import get_published_freight_topics
     published_topics = get_published_freight_topics()
     
-    url = "https://openrouter.ai/api/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    
     # Список возможных тем для вариативности
     freight_topics = [
         "freight rate volatility and market unpredictability",
@@ -457,73 +527,135 @@ IMPORTANT: Make this post UNIQUE and DIFFERENT from previous freight posts. Use
     
     user_prompt += "\n\nReturn ONLY the JSON object with tg_version and web_version."
     
-    payload = {
-        "model": "anthropic/claude-3.5-sonnet",  # Используем Sonnet для более качественного контента
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ],
-        "max_tokens": 4000,
-        "temperature": 0.8  # Немного выше для креативности
-    }
-    
-    for attempt in range(max_retries):
-        try:
-            response = requests.post(url, headers=headers, json=payload, timeout=120)
-            response.raise_for_status()
-            data = response.json()
-            
-            result = data['choices'][0]['message']['content'].strip()
-            
-            # Парсим JSON из ответа
-            import json
-            # Убираем markdown код блоки если есть
-            if result.startswith("```json"):
-                result = result[7:]
-            if result.startswith("```"):
-                result = result[3:]
-            if result.endswith("```"):
-                result = result[:-3]
-            result = result.strip()
-            
-            # Извлекаем JSON
-            json_start = result.find("{")
-            json_end = result.rfind("}") + 1
-            if json_start >= 0 and json_end > json_start:
-                json_text = result[json_start:json_end]
-                versions = json.loads(json_text)
-                
-                # Проверяем наличие всех версий
-                if "tg_version" in versions and "web_version" in versions:
-                    # Добавляем тему в результат для сохранения
-                    versions["topic"] = selected_topic
-                    print(f"✅ Специальный пост о фрахте сгенерирован (тема: {selected_topic[:50]}...)")
-                    return versions
-                else:
-                    print(f"⚠️  Не все версии найдены в ответе")
-                    # Пробуем создать недостающие версии
-                    if "tg_version" not in versions:
-                        # Извлекаем текст из web_version для Telegram
-                        import re
-                        web_text = versions.get("web_version", "")
-                        # Убираем HTML теги для Telegram версии
-                        clean_text = re.sub(r'<[^>]+>', '', web_text)
-                        versions["tg_version"] = f"<b>🚢 [FREIGHT] | Freight Challenges</b>\n\n{clean_text[:800]}...\n\n#Freight #BulkTrading #Logistics #Coal #BenchEnergy"
-                    if "web_version" not in versions:
-                        versions["web_version"] = f"<h1>Freight Challenges for Bulk Trading</h1><p>Analysis of freight logistics problems.</p>"
-                    versions["topic"] = selected_topic
-                    return versions
-            else:
-                raise ValueError("JSON не найден в ответе")
-                
-        except json.JSONDecodeError as e:
-            print(f"⚠️  Ошибка парсинга JSON (попытка {attempt + 1}/{max_retries}): {e}")
-            if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)
-            else:
-                # Fallback: создаем версии вручную (мягкий тон)
-                print(f"⚠️  Использую fallback версии для поста о фрахте")
-                tg_content = """<b>🚢 [FREIGHT] | Freight Rate Volatility Challenges Bulk Traders</b>
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+    return messages, selected_topic
+
+
+def generate_freight_post(max_retries: int = 3) -> Dict[str, str]:
+    """
+    Генерирует специальный пост о проблемах фрахта для bulk трейдинг компаний через Claude 3.5.
+    Создает контент самостоятельно, без примеров, в стиле канала.
+    Избегает дублей, генерируя новые темы каждый раз.
+    
+    Args:
+        max_retries: Максимальное количество сетевых попыток на каждую модель
+        
+    Returns:
+        Словарь с ключами: tg_version, web_version, topic
+    """
+    api_key = os.getenv("ANTHROPIC_API_KEY")
+    if not api_key:
+        raise ValueError("ANTHROPIC_API_KEY not set in environment")
+    
+    messages, selected_topic = build_freight_post_request()
+    
+    # Парсим JSON из ответа, восстанавливая структуру локально
+    parsed = {}
+    
+    def is_parsable(text: str) -> bool:
+        parsed["versions"] = repair_json(text, mark_truncated=True)
+        return parsed["versions"] is not None
+    
+    # Модель выбирает маршрутизатор (эскалация на более сильную модель при невалидном JSON),
+    # температура выше для креативности. Сетевые повторы выполняет llm_client
+    try:
+        route_completion("freight_post", messages, validate=is_parsable, max_tokens=4000,
+                         temperature=0.8, timeout=120, cache_system=True, max_retries=max_retries)
+    except LLMError as e:
+        raise Exception(f"Не удалось сгенерировать пост о фрахте: {e}") from e
+    
+    return complete_freight_post(parsed.get("versions"), messages, selected_topic)
+
+
+def queue_freight_post() -> bool:
+    """
+    Ставит следующий пост о фрахте в пакетную очередь, чтобы к очередной ротации
+    он был готов без интерактивного вызова. Ничего не делает, если пакетный режим
+    выключен или в очереди уже есть незабранный пост.
+    
+    Returns:
+        True если задание поставлено в очередь
+    """
+    if not is_batch_enabled() or has_pending_job("freight_post"):
+        return False
+    
+    messages, selected_topic = build_freight_post_request()
+    job_key = f"freight_post:{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    return enqueue_job(job_key, "freight_post", messages, max_tokens=4000, temperature=0.8,
+                       metadata={"topic": selected_topic})
+
+
+def take_batched_freight_post() -> Optional[Dict[str, str]]:
+    """
+    Забирает готовый пост о фрахте из пакетной очереди.
+    
+    Returns:
+        Словарь с ключами: tg_version, web_version, topic или None, если готового поста нет
+        или его JSON не удалось восстановить (вызывающий код генерирует пост интерактивно,
+        а не публикует fallback версии)
+    """
+    job = take_ready_job("freight_post")
+    if not job:
+        return None
+
+    versions = repair_json(job["result_text"] or "", mark_truncated=True)
+    if versions is None:
+        print(f"⚠️  Пакетный пост о фрахте ({job['job_key']}) без валидного JSON, генерируем заново")
+        return None
+
+    print(f"📦 Пост о фрахте взят из пакетной генерации ({job['job_key']})")
+    return complete_freight_post(versions, job["request"]["messages"], job["metadata"].get("topic", ""))
+
+
+def complete_freight_post(versions: Optional[Dict], messages: List[Dict], selected_topic: str) -> Dict[str, str]:
+    """
+    Доводит ответ модели до готового поста о фрахте: точечно перегенерирует
+    невалидные поля, подгоняет Telegram версию под лимит, при отсутствии JSON
+    возвращает fallback версии.
+    
+    Args:
+        versions: Распарсенный ответ модели (None, если JSON не восстановлен)
+        messages: Сообщения исходного запроса (для точечной перегенерации)
+        selected_topic: Тема поста
+        
+    Returns:
+        Словарь с ключами: tg_version, web_version, topic
+    """
+    try:
+        if versions is None:
+            raise json.JSONDecodeError("JSON не найден или не восстановлен", "", 0)
+        
+        # Длинная Telegram версия обрезается локально, пустые/короткие поля перегенерируются точечно
+        for field in validate_post_versions(versions):
+            value = _regenerate_field(messages, field, 0.8, "freight_post")
+            if value:
+                versions[field] = value
+        
+        if not versions.get("tg_version"):
+            # Извлекаем текст из web_version для Telegram
+            import re
+            web_text = versions.get("web_version") or ""
+            # Убираем HTML теги для Telegram версии
+            clean_text = re.sub(r'<[^>]+>', '', web_text)
+            versions["tg_version"] = f"<b>🚢 [FREIGHT] | Freight Challenges</b>\n\n{clean_text[:800]}...\n\n#Freight #BulkTrading #Logistics #Coal #BenchEnergy"
+        if not versions.get("web_version"):
+            versions["web_version"] = f"<h1>Freight Challenges for Bulk Trading</h1><p>Analysis of freight logistics problems.</p>"
+        if len(versions["tg_version"]) > TELEGRAM_CAPTION_LIMIT:
+            versions["tg_version"] = fit_telegram_caption(versions["tg_version"])
+        
+        # Добавляем тему в результат для сохранения
+        versions["topic"] = selected_topic
+        print(f"✅ Специальный пост о фрахте сгенерирован (тема: {selected_topic[:50]}...)")
+        return versions
+    
+    except json.JSONDecodeError as e:
+        print(f"⚠️  Ошибка парсинга JSON: {e}")
+        # Fallback: создаем версии вручную (мягкий тон)
+        print(f"⚠️  Использую fallback версии для поста о фрахте")
+        tg_content = """<b>🚢 [FREIGHT] | Freight Rate Volatility Challenges Bulk Traders</b>
 
 Bulk trading companies face increasing freight rate volatility, making cost planning difficult. Port congestion and vessel availability issues compound the problem.
 
@@ -533,17 +665,12 @@ If you face similar challenges, Bench Energy's FreightTender can help. Our close
 💡 Interested? Learn more: bench.energy/freighttender
 
 #Freight #BulkTrading #Logistics #Coal #BenchEnergy"""
-                return {
-                    "tg_version": tg_content[:1024],
-                    "web_version": "<h1>Freight Challenges for Bulk Trading Companies</h1><p>Analysis of freight logistics problems and solutions.</p><p>Bench Energy's closed freight tender for traders helps address these challenges.</p>",
-                    "topic": selected_topic
-                }
-        except Exception as e:
-            print(f"❌ Ошибка генерации поста о фрахте (попытка {attempt + 1}/{max_retries}): {e}")
-            if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)
-            else:
-                raise Exception(f"Не удалось сгенерировать пост о фрахте после {max_retries} попыток: {e}") from e
-    
-    raise Exception("Не удалось сгенерировать пост о фрахте")
+        return {
+            "tg_version": tg_content[:1024],
+            "web_version": "<h1>Freight Challenges for Bulk Trading Companies</h1><p>Analysis of freight logistics problems and solutions.</p><p>Bench Energy's closed freight tender for traders helps address these challenges.</p>",
+            "topic": selected_topic
+        }
+    except Exception as e:
+        print(f"❌ Ошибка генерации поста о фрахте: {e}")
+        raise Exception(f"Не удалось сгенерировать пост о фрахте: {e}") from e
 
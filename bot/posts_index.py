@@ -0,0 +1,307 @@
+"""
+Индекс метаданных статей posts/.
+Метаданные каждой статьи (заголовок, описание, изображение, дата публикации,
+раздел, ключевые слова, Expert View) хранятся в JSON-индексе в корне репозитория
+сайта вместе с mtime, размером и SHA-256 файла. При обновлении индекса файл
+разбирается регулярными выражениями, только если он новый или изменился:
+неизмененные статьи проверяются по stat, после checkout (другой mtime) - по хэшу.
+Индекс читают сборка сайта (index.html, фиды, sitemap), месячный прогноз и
+миграция в Notion.
+"""
+import os
+import re
+import json
+import heapq
+import hashlib
+from datetime import datetime
+from html import unescape
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# URL сайта для ссылок на статьи без og:url
+SITE_URL = os.getenv("SITE_URL", "https://www.bench.energy")
+DEFAULT_IMAGE_URL = "https://marfa77.github.io/bench-energy-news/assets/default-news.jpg"
+
+# Индекс относительно корня репозитория сайта (локальный файл, в git не коммитится)
+POSTS_INDEX_PATH = Path(".site_build") / "posts_index.json"
+# Версия формата: при изменении полей индекс пересобирается
+POSTS_INDEX_VERSION = 1
+
+# Ключевые слова, которые не выводятся хэштегами
+EXCLUDED_HASHTAGS = {"Bench Energy", "@benchenergy", "Telegram channel"}
+
+
+def content_hash(content: str) -> str:
+    """SHA-256 текста (для пропуска перезаписи неизмененных файлов)."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def file_hash(path: Path) -> Optional[str]:
+    """SHA-256 содержимого файла (None, если файла нет)."""
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def write_if_changed(path: Path, content: str) -> bool:
+    """
+    Записывает файл, только если его содержимое отличается от нового.
+
+    Args:
+        path: Путь к файлу
+        content: Новое содержимое
+
+    Returns:
+        True если файл записан, False если содержимое совпало
+    """
+    if file_hash(path) == content_hash(content):
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return True
+
+
+def _meta_content(content: str, attribute: str, name: str) -> Optional[str]:
+    """Значение content мета-тега (name=... или property=...)."""
+    match = re.search(rf'<meta {attribute}="{re.escape(name)}" content="([^"]+)"', content)
+    return unescape(match.group(1).strip()) if match else None
+
+
+def parse_article_html(content: str, filename: str, mtime: Optional[float] = None) -> Dict:
+    """
+    Извлекает метаданные статьи из её HTML.
+
+    Args:
+        content: HTML статьи
+        filename: Имя файла в posts/
+        mtime: Время изменения файла (дата публикации, если в HTML её нет)
+
+    Returns:
+        Словарь: title, description, image_url, source_url, source_name, keywords,
+        hashtags, expert_view, section, origin_url, origin_name, date (datetime), filename
+    """
+    # Заголовок без суффикса " | Bench Energy"
+    title_match = re.search(r'<title>(.*?)</title>', content, re.DOTALL)
+    if title_match:
+        title = unescape(title_match.group(1).strip())
+        title = re.sub(r'\s*\|\s*Bench Energy\s*$', '', title, flags=re.IGNORECASE)
+    else:
+        title = Path(filename).stem.replace('-', ' ').title()
+
+    # Описание: meta description, иначе первый абзац статьи, иначе заголовок
+    description = _meta_content(content, "name", "description")
+    if not description:
+        description = title
+        body_match = re.search(r'<article[^>]*>(.*?)</article>', content, re.DOTALL)
+        if body_match:
+            p_match = re.search(r'<p[^>]*>(.*?)</p>', body_match.group(1), re.DOTALL)
+            if p_match:
+                description = re.sub(r'<[^>]+>', '', unescape(p_match.group(1).strip()))
+                description = description[:300] + "..." if len(description) > 300 else description
+
+    # Источник - последняя часть заголовка после " - " или " | "
+    source_name = "Bench Energy"
+    for separator in (" - ", " | "):
+        if separator in title:
+            source_name = title.split(separator)[-1].strip()
+            break
+
+    # Первоисточник новости - ссылка "Source:" в тексте статьи
+    origin_url, origin_name = "", "Unknown"
+    origin_match = re.search(r'<strong>Source:</strong>\s*<a[^>]*href="([^"]+)"[^>]*>([^<]+)</a>', content)
+    if origin_match:
+        origin_url = unescape(origin_match.group(1))
+        origin_name = unescape(origin_match.group(2).strip())
+
+    # Раздел: article:section, иначе бейдж категории
+    section = _meta_content(content, "property", "article:section")
+    if not section:
+        badge_match = re.search(r'<span class="category-badge">([^<]+)</span>', content)
+        section = unescape(badge_match.group(1).strip()) if badge_match else "Coal"
+
+    keywords = _meta_content(content, "name", "keywords") or "Coal"
+    hashtags = [f"#{tag.strip()}" for tag in keywords.split(',')[:5]
+                if tag.strip() and tag.strip() not in EXCLUDED_HASHTAGS]
+
+    # Раздел "Bench Energy Expert View" (выводится в RSS)
+    expert_view = ""
+    expert_match = re.search(
+        r'<h3[^>]*>Bench Energy Expert View</h3>(.*?)(?:<hr\s*/?>|<h2|</div>|</article>)',
+        content,
+        re.DOTALL | re.IGNORECASE
+    )
+    if expert_match:
+        expert_view = re.sub(r'<[^>]+>', ' ', expert_match.group(1))
+        expert_view = unescape(re.sub(r'\s+', ' ', expert_view).strip())
+
+    published_date = None
+    date_str = _meta_content(content, "property", "article:published_time")
+    if date_str:
+        try:
+            published_date = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+        except ValueError:
+            print(f"⚠️  Ошибка парсинга даты '{date_str}' в {filename}")
+    if published_date is None:
+        published_date = datetime.fromtimestamp(mtime) if mtime else datetime.now()
+
+    return {
+        "title": title,
+        "description": description,
+        "image_url": _meta_content(content, "property", "og:image") or DEFAULT_IMAGE_URL,
+        "source_url": _meta_content(content, "property", "og:url") or f"{SITE_URL}/posts/{filename}",
+        "source_name": source_name,
+        "keywords": keywords,
+        "hashtags": hashtags,
+        "expert_view": expert_view,
+        "section": section,
+        "origin_url": origin_url,
+        "origin_name": origin_name,
+        "date": published_date,
+        "filename": filename,
+    }
+
+
+def metadata_to_json(metadata: Dict) -> Dict:
+    """Метаданные статьи в JSON-совместимом виде (дата - ISO 8601)."""
+    return {**metadata, "date": metadata["date"].isoformat()}
+
+
+def metadata_from_json(data: Dict) -> Dict:
+    """Метаданные статьи из JSON (обратное преобразование metadata_to_json)."""
+    return {**data, "date": datetime.fromisoformat(data["date"])}
+
+
+def local_naive(value: datetime) -> datetime:
+    """Дата в локальном времени без часового пояса (для сравнения с наивными границами)."""
+    return value.astimezone().replace(tzinfo=None) if value.tzinfo else value
+
+
+def load_posts_index(repo_path: Path) -> Dict[str, Dict]:
+    """
+    Загружает индекс статей без проверки файлов posts/.
+
+    Args:
+        repo_path: Корень репозитория сайта
+
+    Returns:
+        Словарь {имя файла: запись индекса} (пустой, если индекса нет или версия другая)
+    """
+    index_path = repo_path / POSTS_INDEX_PATH
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"⚠️  Поврежденный индекс статей {index_path}: {e}, индекс будет пересобран")
+        return {}
+    if data.get("version") != POSTS_INDEX_VERSION:
+        return {}
+    return data.get("posts", {})
+
+
+def save_posts_index(repo_path: Path, posts: Dict[str, Dict]) -> bool:
+    """
+    Сохраняет индекс статей (только если он изменился).
+
+    Args:
+        repo_path: Корень репозитория сайта
+        posts: Словарь {имя файла: запись индекса}
+
+    Returns:
+        True если файл индекса записан
+    """
+    data = {"version": POSTS_INDEX_VERSION, "posts": posts}
+    return write_if_changed(repo_path / POSTS_INDEX_PATH,
+                            json.dumps(data, ensure_ascii=False, indent=1, sort_keys=True))
+
+
+def update_posts_index(repo_path: Path, known: Optional[Dict[str, Dict]] = None) -> Dict[str, Dict]:
+    """
+    Приводит индекс в соответствие с posts/: добавляет новые и измененные статьи,
+    удаляет записи удаленных файлов. Неизмененные файлы не читаются (совпали
+    mtime и размер) или читаются без разбора (совпал хэш).
+
+    Args:
+        repo_path: Корень репозитория сайта
+        known: Метаданные только что записанных статей {имя файла: метаданные} -
+            для них HTML не разбирается
+
+    Returns:
+        Словарь {имя файла: запись индекса} (JSON-совместимые метаданные + mtime, size, hash)
+    """
+    known = known or {}
+    posts_dir = repo_path / "posts"
+    index = load_posts_index(repo_path)
+    posts = {}
+    parsed = 0
+
+    if posts_dir.is_dir():
+        with os.scandir(posts_dir) as entries:
+            for dir_entry in entries:
+                if not dir_entry.name.endswith('.html') or not dir_entry.is_file():
+                    continue
+                name = dir_entry.name
+                stat = dir_entry.stat()
+                entry = index.get(name)
+                if entry and entry.get("mtime") == stat.st_mtime and entry.get("size") == stat.st_size:
+                    posts[name] = entry
+                    continue
+
+                try:
+                    data = Path(dir_entry.path).read_bytes()
+                except OSError as e:
+                    print(f"❌ Ошибка чтения {dir_entry.path}: {e}")
+                    continue
+                digest = hashlib.sha256(data).hexdigest()
+                if entry and entry.get("hash") == digest:
+                    posts[name] = {**entry, "mtime": stat.st_mtime, "size": stat.st_size}
+                    continue
+
+                metadata = known.get(name) or parse_article_html(data.decode('utf-8', errors='replace'),
+                                                                 name, stat.st_mtime)
+                posts[name] = {**metadata_to_json(metadata), "mtime": stat.st_mtime,
+                               "size": stat.st_size, "hash": digest}
+                parsed += 1
+
+    removed = len(set(index) - set(posts))
+    if save_posts_index(repo_path, posts) and (parsed or removed):
+        print(f"🗂️  Индекс статей обновлен: разобрано {parsed}, удалено {removed}, всего {len(posts)}")
+    return posts
+
+
+def list_posts(repo_path: Path, known: Optional[Dict[str, Dict]] = None) -> List[Dict]:
+    """
+    Метаданные всех статей posts/ из индекса (новые сверху).
+
+    Args:
+        repo_path: Корень репозитория сайта
+        known: Метаданные только что записанных статей (см. update_posts_index)
+
+    Returns:
+        Список метаданных (date - datetime), отсортированный по дате публикации
+    """
+    articles = [metadata_from_json(entry) for entry in update_posts_index(repo_path, known).values()]
+    articles.sort(key=lambda article: article["date"].timestamp(), reverse=True)
+    return articles
+
+
+def latest_posts(repo_path: Path, limit: int, known: Optional[Dict[str, Dict]] = None) -> List[Dict]:
+    """
+    Метаданные последних статей по дате публикации (не по mtime файла).
+    Выбирает top-K кучей по записям индекса - остальные статьи не сортируются
+    и не преобразуются.
+
+    Args:
+        repo_path: Корень репозитория сайта
+        limit: Количество статей
+        known: Метаданные только что записанных статей (см. update_posts_index)
+
+    Returns:
+        Список метаданных (date - datetime), новые сверху
+    """
+    entries = update_posts_index(repo_path, known).values()
+    latest = heapq.nlargest(limit, entries, key=lambda entry: datetime.fromisoformat(entry["date"]).timestamp())
+    return [metadata_from_json(entry) for entry in latest]
@@ -0,0 +1,268 @@
+"""
+Модуль outbox для неудачных публикаций.
+Неудачные записи на платформы (Telegram, Notion) сохраняются в SQLite и
+повторяются фоновым воркером с экспоненциальной задержкой, чтобы ни одна
+публикация не терялась молча.
+"""
+import os
+import json
+import asyncio
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from published_news_db import get_connection
+from async_io import run_blocking
+
+load_dotenv()
+
+# Базовая задержка перед повтором (удваивается с каждой попыткой)
+OUTBOX_BASE_DELAY_SECONDS = int(os.getenv("OUTBOX_BASE_DELAY_SECONDS", "60"))
+# Максимальная задержка между повторами
+OUTBOX_MAX_DELAY_SECONDS = int(os.getenv("OUTBOX_MAX_DELAY_SECONDS", "21600"))  # 6 часов
+# После стольких попыток запись помечается как dead и больше не повторяется
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+# Интервал опроса outbox фоновым воркером
+OUTBOX_POLL_SECONDS = int(os.getenv("OUTBOX_POLL_SECONDS", "300"))
+
+# Обработчик повтора: получает запись outbox и возвращает ID публикации или None
+OutboxHandler = Callable[[Dict], Awaitable[Optional[str]]]
+
+
+def init_outbox():
+    """Создает таблицу publish_outbox если её нет."""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS publish_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            platform TEXT NOT NULL,
+            news_url TEXT,
+            payload TEXT NOT NULL,
+            status TEXT DEFAULT 'pending',
+            attempts INTEGER DEFAULT 0,
+            last_error TEXT,
+            platform_id TEXT,
+            next_attempt_at TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP
+        )
+    """)
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_outbox_due ON publish_outbox(status, next_attempt_at)
+    """)
+
+    conn.commit()
+    conn.close()
+
+
+def _backoff_delay(attempts: int) -> timedelta:
+    """
+    Вычисляет задержку до следующей попытки.
+
+    Args:
+        attempts: Количество уже сделанных попыток
+
+    Returns:
+        Задержка до следующей попытки
+    """
+    delay = OUTBOX_BASE_DELAY_SECONDS * (2 ** max(attempts - 1, 0))
+    return timedelta(seconds=min(delay, OUTBOX_MAX_DELAY_SECONDS))
+
+
+def enqueue_publication(platform: str, news_url: str, payload: Dict, error: str = "") -> Optional[int]:
+    """
+    Сохраняет неудачную публикацию в outbox для повтора.
+
+    Args:
+        platform: Платформа ('telegram', 'notion')
+        news_url: URL новости (может быть пустым для специальных постов)
+        payload: Данные, необходимые для повтора публикации (JSON-сериализуемые)
+        error: Текст ошибки первой попытки
+
+    Returns:
+        ID записи outbox или None при ошибке
+    """
+    init_outbox()
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    now = datetime.now()
+    try:
+        cursor.execute("""
+            INSERT INTO publish_outbox
+            (platform, news_url, payload, status, attempts, last_error, next_attempt_at, updated_at)
+            VALUES (?, ?, ?, 'pending', 1, ?, ?, ?)
+        """, (platform, news_url, json.dumps(payload, ensure_ascii=False), error[:500],
+              (now + _backoff_delay(1)).isoformat(), now.isoformat()))
+        conn.commit()
+        item_id = cursor.lastrowid
+        print(f"📮 Публикация ({platform}) сохранена в outbox для повтора (#{item_id})")
+        return item_id
+    except sqlite3.Error as e:
+        print(f"❌ Ошибка сохранения в outbox: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def get_due_publications(limit: int = 20) -> List[Dict]:
+    """
+    Возвращает записи outbox, время повтора которых наступило.
+
+    Args:
+        limit: Максимальное количество записей
+
+    Returns:
+        Список записей (payload уже распарсен в словарь)
+    """
+    init_outbox()
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        SELECT * FROM publish_outbox
+        WHERE status = 'pending' AND next_attempt_at <= ?
+        ORDER BY next_attempt_at
+        LIMIT ?
+    """, (datetime.now().isoformat(), limit))
+    rows = cursor.fetchall()
+    conn.close()
+
+    items = []
+    for row in rows:
+        item = dict(row)
+        try:
+            item["payload"] = json.loads(item["payload"])
+        except (json.JSONDecodeError, TypeError):
+            item["payload"] = {}
+        items.append(item)
+    return items
+
+
+def mark_publication_done(item_id: int, platform_id: str = ""):
+    """
+    Помечает запись outbox как успешно опубликованную.
+
+    Args:
+        item_id: ID записи outbox
+        platform_id: ID публикации на платформе
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            UPDATE publish_outbox SET status = 'done', platform_id = ?, updated_at = ?
+            WHERE id = ?
+        """, (platform_id, datetime.now().isoformat(), item_id))
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"❌ Ошибка обновления outbox: {e}")
+    finally:
+        conn.close()
+
+
+def mark_publication_failed(item_id: int, attempts: int, error: str):
+    """
+    Регистрирует неудачную попытку и планирует следующую (или помечает запись как dead).
+
+    Args:
+        item_id: ID записи outbox
+        attempts: Количество попыток с учетом текущей
+        error: Текст ошибки
+    """
+    now = datetime.now()
+    status = "dead" if attempts >= OUTBOX_MAX_ATTEMPTS else "pending"
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            UPDATE publish_outbox
+            SET status = ?, attempts = ?, last_error = ?, next_attempt_at = ?, updated_at = ?
+            WHERE id = ?
+        """, (status, attempts, error[:500], (now + _backoff_delay(attempts)).isoformat(), now.isoformat(), item_id))
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"❌ Ошибка обновления outbox: {e}")
+    finally:
+        conn.close()
+
+    if status == "dead":
+        print(f"💀 Публикация #{item_id} не удалась после {attempts} попыток, требуется ручная проверка")
+
+
+def get_outbox_stats() -> Dict:
+    """
+    Возвращает количество записей outbox по статусам.
+
+    Returns:
+        Словарь {status: count}
+    """
+    init_outbox()
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT status, COUNT(*) as count FROM publish_outbox GROUP BY status")
+    stats = {row["status"]: row["count"] for row in cursor.fetchall()}
+    conn.close()
+    return stats
+
+
+async def process_outbox(handlers: Dict[str, OutboxHandler]) -> int:
+    """
+    Повторяет все публикации outbox, время которых наступило.
+
+    Args:
+        handlers: Обработчики по платформам ({'telegram': handler, 'notion': handler})
+
+    Returns:
+        Количество успешно повторенных публикаций
+    """
+    # Запросы к SQLite выполняются в пуле потоков, не блокируя event loop
+    items = await run_blocking(get_due_publications)
+    if not items:
+        return 0
+
+    print(f"📮 Повтор публикаций из outbox: {len(items)}")
+    succeeded = 0
+    for item in items:
+        handler = handlers.get(item["platform"])
+        if not handler:
+            continue
+
+        attempts = item.get("attempts", 0) + 1
+        try:
+            platform_id = await handler(item)
+        except Exception as e:
+            print(f"⚠️  Ошибка повтора публикации #{item['id']} ({item['platform']}): {e}")
+            await run_blocking(mark_publication_failed, item["id"], attempts, str(e))
+            continue
+
+        if platform_id:
+            await run_blocking(mark_publication_done, item["id"], platform_id)
+            succeeded += 1
+            print(f"✅ Публикация #{item['id']} ({item['platform']}) повторена успешно")
+        else:
+            await run_blocking(mark_publication_failed, item["id"], attempts, "Платформа вернула ошибку")
+
+    return succeeded
+
+
+async def outbox_worker(handlers: Dict[str, OutboxHandler], poll_seconds: int = OUTBOX_POLL_SECONDS):
+    """
+    Фоновый воркер: периодически повторяет публикации из outbox.
+
+    Args:
+        handlers: Обработчики по платформам
+        poll_seconds: Интервал опроса outbox в секундах
+    """
+    while True:
+        try:
+            await process_outbox(handlers)
+        except Exception as e:
+            print(f"⚠️  Ошибка воркера outbox: {e}")
+        await asyncio.sleep(poll_seconds)
@@ -0,0 +1,586 @@
+"""
+Сборка артефактов статического сайта: index.html (фиксированное число последних
+статей), страницы архива (постранично, по месяцам и разделам), фиды (RSS 2.0,
+Atom, JSON Feed) и sitemap.xml.
+Выполняется в процессе вызывающего кода за один проход по метаданным статей
+из индекса posts_index: HTML разбирается только у новых и измененных статей.
+Файлы записываются, только если содержимое изменилось.
+Скрипты update_index.py и generate_rss.py в корне репозитория - тонкие
+CLI-обертки над этим модулем.
+"""
+import os
+import re
+import json
+from datetime import datetime
+from email.utils import formatdate
+from html import escape
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from posts_index import list_posts, latest_posts, local_naive, content_hash, write_if_changed
+
+# URL сайта для sitemap.xml
+SITE_URL = os.getenv("SITE_URL", "https://www.bench.energy")
+# URL сайта для ссылок RSS feed (feed публикуется на основном домене)
+FEED_SITE_URL = os.getenv("FEED_SITE_URL", "https://www.bench.energy")
+# Количество статей в фидах
+FEED_LIMIT = 30
+
+# Артефакты сайта относительно корня репозитория
+INDEX_PATH = Path("index.html")
+FEED_PATH = Path("public") / "feed.xml"
+ATOM_PATH = Path("public") / "atom.xml"
+JSON_FEED_PATH = Path("public") / "feed.json"
+# Все форматы фида собираются целью 'feed' из одной выборки статей
+FEED_PATHS = (FEED_PATH, ATOM_PATH, JSON_FEED_PATH)
+SITEMAP_PATH = Path("sitemap.xml")
+ARCHIVE_DIR = Path("archive")
+ALL_TARGETS = ("index", "archive", "feed", "sitemap")
+
+# Количество статей на главной и на одной странице архива
+FRONT_PAGE_SIZE = int(os.getenv("FRONT_PAGE_SIZE", "20"))
+ARCHIVE_PAGE_SIZE = int(os.getenv("ARCHIVE_PAGE_SIZE", "50"))
+# Ключи отрисованных страниц архива (локальный файл рядом с индексом статей)
+ARCHIVE_MANIFEST_PATH = Path(".site_build") / "archive_shards.json"
+
+
+def _sort_key(article: Dict) -> float:
+    """Ключ сортировки по дате публикации (даты с часовым поясом и без)."""
+    return article["date"].timestamp()
+
+
+def _display_date(published_date: datetime) -> str:
+    """Дата публикации для карточки (в локальном часовом поясе)."""
+    if published_date.tzinfo:
+        published_date = published_date.astimezone()
+    return published_date.strftime('%B %d, %Y')
+
+
+def render_index_cards(articles: List[Dict], heading: str = "Latest Articles", base: str = "") -> List[str]:
+    """
+    Строки HTML списка статей (карточки в стиле Telegram).
+
+    Args:
+        articles: Метаданные статей
+        heading: Заголовок списка
+        base: Префикс относительных ссылок на posts/ (для страниц в подкаталогах)
+
+    Returns:
+        Строки HTML
+    """
+    if not articles:
+        return [f'        <h2>{escape(heading)}</h2>',
+                '        <p>Articles will appear here automatically as they are published.</p>',
+                '        <p>Check back soon for the latest coal market news!</p>']
+
+    html_lines = [f'        <h2>{escape(heading)}</h2>', '        <div class="articles-grid">']
+    for article in articles:
+        hashtags_html = ' '.join(article.get('hashtags', []))
+        source_name = article.get('source_name', 'Bench Energy')
+        description = article.get('description', article['title'])[:200]
+        post_href = f'{base}posts/{article["filename"]}'
+
+        html_lines.append(f'        <div class="news-card">')
+        html_lines.append(f'            <div class="news-header">')
+        html_lines.append(f'                <h3 class="news-title"><a href="{post_href}">{article["title"]}</a></h3>')
+        html_lines.append(f'                <p class="news-description">{description}</p>')
+        if hashtags_html:
+            html_lines.append(f'                <div class="news-hashtags">{hashtags_html}</div>')
+        html_lines.append(f'                <div class="news-source">Source: <a href="{article.get("source_url", "#")}" target="_blank" rel="noopener">{source_name}</a></div>')
+        html_lines.append(f'            </div>')
+        html_lines.append(f'            <div class="news-preview-card">')
+        html_lines.append(f'                <div class="preview-source">{source_name}</div>')
+        html_lines.append(f'                <a href="{post_href}" class="preview-link">📖 Read Article</a>')
+        html_lines.append(f'            </div>')
+        html_lines.append(f'            <div class="news-meta">Published: {_display_date(article["date"])}</div>')
+        html_lines.append(f'        </div>')
+    html_lines.append('        </div>')
+    return html_lines
+
+
+def replace_articles_section(index_html: str, section_lines: List[str]) -> Optional[str]:
+    """
+    Заменяет содержимое секции articles-list в HTML страницы.
+
+    Args:
+        index_html: HTML страницы (index.html)
+        section_lines: Новые строки секции
+
+    Returns:
+        Новый HTML или None, если секция articles-list не найдена
+    """
+    lines = index_html.splitlines(keepends=True)
+
+    start_idx = next((i for i, line in enumerate(lines) if 'class="articles-list"' in line), None)
+    if start_idx is None:
+        print("⚠️  В index.html не найдена секция articles-list")
+        return None
+
+    # Парный закрывающий </div>
+    end_idx = None
+    div_count = 0
+    for i in range(start_idx, len(lines)):
+        div_count += lines[i].count('<div')
+        div_count -= lines[i].count('</div>')
+        if div_count == 0 and i > start_idx:
+            end_idx = i
+            break
+    if end_idx is None:
+        print("⚠️  В index.html не найден закрывающий тег секции articles-list")
+        return None
+
+    new_lines = lines[:start_idx + 1]
+    new_lines.extend(line + '\n' for line in section_lines)
+    new_lines.append('    </div>\n')
+    new_lines.extend(lines[end_idx + 1:])
+    return "".join(new_lines)
+
+
+def render_index(index_html: str, articles: List[Dict], limit: int = FRONT_PAGE_SIZE) -> Optional[str]:
+    """
+    Заменяет секцию articles-list в index.html последними статьями.
+    На главной фиксированное количество статей, остальные - в архиве.
+
+    Args:
+        index_html: Текущий index.html
+        articles: Метаданные статей (новые сверху)
+        limit: Количество статей на главной
+
+    Returns:
+        Новый index.html или None, если секция articles-list не найдена
+    """
+    section_lines = render_index_cards(articles[:limit])
+    if len(articles) > limit:
+        section_lines.append(f'        <p class="archive-link"><a href="{ARCHIVE_DIR}/index.html">'
+                             f'📚 Browse the archive: all articles by month and category</a></p>')
+    return replace_articles_section(index_html, section_lines)
+
+
+def _feed_description(article: Dict) -> str:
+    """Описание статьи для RSS с разделом Expert View."""
+    description = article["description"]
+    expert_view = article.get("expert_view", "")
+    if expert_view:
+        if len(expert_view) > 500:
+            expert_view = expert_view[:497] + "..."
+        description = f"{description} 🧭 Bench Energy Expert View: {expert_view}"
+        if len(description) > 1500:
+            description = description[:1497] + "..."
+    return description
+
+
+def render_rss(articles: List[Dict], site_url: str = FEED_SITE_URL, limit: int = FEED_LIMIT) -> str:
+    """
+    Формирует RSS 2.0 feed по последним статьям.
+    Дата сборки - дата самой свежей статьи, чтобы feed без новых статей не менялся.
+
+    Args:
+        articles: Метаданные статей (новые сверху)
+        site_url: URL сайта для ссылок
+        limit: Количество статей в feed
+
+    Returns:
+        XML feed
+    """
+    items = articles[:limit]
+    feed_url = f"{site_url}/feed.xml"
+    last_build = formatdate(_sort_key(items[0]) if items else datetime.now().timestamp())
+
+    rss_xml = f"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom" xmlns:content="http://purl.org/rss/1.0/modules/content/">
+    <channel>
+        <title>Bench Energy News - Coal Market Updates</title>
+        <link>{site_url}</link>
+        <description>Latest news and analysis about coal market from Bench Energy. Follow our Telegram channel @benchenergy for real-time market insights.</description>
+        <language>en-US</language>
+        <lastBuildDate>{last_build}</lastBuildDate>
+        <pubDate>{last_build}</pubDate>
+        <ttl>60</ttl>
+        <atom:link href="{feed_url}" rel="self" type="application/rss+xml"/>
+        <image>
+            <url>{site_url}/assets/bench-energy-logo.png</url>
+            <title>Bench Energy News</title>
+            <link>{site_url}</link>
+        </image>
+"""
+    for article in items:
+        url_escaped = escape(f"{site_url}/posts/{article['filename']}")
+        rss_xml += f"""        <item>
+            <title>{escape(article['title'])}</title>
+            <link>{url_escaped}</link>
+            <guid isPermaLink="true">{url_escaped}</guid>
+            <description>{escape(_feed_description(article))}</description>
+            <pubDate>{formatdate(_sort_key(article))}</pubDate>
+        </item>
+"""
+    rss_xml += """    </channel>
+</rss>
+"""
+    return rss_xml
+
+
+def _rfc3339(published_date: datetime) -> str:
+    """Дата в формате RFC 3339 (наивные даты - в локальном часовом поясе)."""
+    if not published_date.tzinfo:
+        published_date = published_date.astimezone()
+    return published_date.isoformat()
+
+
+def render_atom(articles: List[Dict], site_url: str = FEED_SITE_URL, limit: int = FEED_LIMIT) -> str:
+    """
+    Формирует Atom feed по последним статьям.
+    updated - дата самой свежей статьи, чтобы feed без новых статей не менялся.
+
+    Args:
+        articles: Метаданные статей (новые сверху)
+        site_url: URL сайта для ссылок
+        limit: Количество статей в feed
+
+    Returns:
+        XML feed
+    """
+    items = articles[:limit]
+    updated = _rfc3339(items[0]["date"] if items else datetime.now())
+
+    atom_xml = f"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xml:lang="en-US">
+    <title>Bench Energy News - Coal Market Updates</title>
+    <subtitle>Latest news and analysis about coal market from Bench Energy.</subtitle>
+    <id>{site_url}/</id>
+    <link href="{site_url}"/>
+    <link href="{site_url}/atom.xml" rel="self" type="application/atom+xml"/>
+    <updated>{updated}</updated>
+    <author><name>Bench Energy</name></author>
+    <icon>{site_url}/assets/bench-energy-logo.png</icon>
+"""
+    for article in items:
+        url_escaped = escape(f"{site_url}/posts/{article['filename']}")
+        atom_xml += f"""    <entry>
+        <title>{escape(article['title'])}</title>
+        <link href="{url_escaped}"/>
+        <id>{url_escaped}</id>
+        <published>{_rfc3339(article['date'])}</published>
+        <updated>{_rfc3339(article['date'])}</updated>
+        <summary>{escape(_feed_description(article))}</summary>
+    </entry>
+"""
+    atom_xml += "</feed>\n"
+    return atom_xml
+
+
+def render_json_feed(articles: List[Dict], site_url: str = FEED_SITE_URL, limit: int = FEED_LIMIT) -> str:
+    """
+    Формирует JSON Feed 1.1 по последним статьям.
+
+    Args:
+        articles: Метаданные статей (новые сверху)
+        site_url: URL сайта для ссылок
+        limit: Количество статей в feed
+
+    Returns:
+        JSON feed
+    """
+    feed = {
+        "version": "https://jsonfeed.org/version/1.1",
+        "title": "Bench Energy News - Coal Market Updates",
+        "home_page_url": site_url,
+        "feed_url": f"{site_url}/feed.json",
+        "description": "Latest news and analysis about coal market from Bench Energy.",
+        "icon": f"{site_url}/assets/bench-energy-logo.png",
+        "language": "en-US",
+        "items": [],
+    }
+    for article in articles[:limit]:
+        url = f"{site_url}/posts/{article['filename']}"
+        item = {
+            "id": url,
+            "url": url,
+            "title": article["title"],
+            "content_text": _feed_description(article),
+            "summary": article["description"],
+            "date_published": _rfc3339(article["date"]),
+            "tags": [tag.lstrip('#') for tag in article.get("hashtags", [])],
+        }
+        if article.get("image_url"):
+            item["image"] = article["image_url"]
+        feed["items"].append(item)
+    return json.dumps(feed, ensure_ascii=False, indent=2) + "\n"
+
+
+def render_sitemap(articles: List[Dict], site_url: str = SITE_URL) -> str:
+    """
+    Формирует sitemap.xml: главная и все статьи.
+    lastmod главной - дата самой свежей статьи, чтобы sitemap без новых статей не менялся.
+
+    Args:
+        articles: Метаданные статей (новые сверху)
+        site_url: URL сайта
+
+    Returns:
+        XML sitemap
+    """
+    latest_date = articles[0]["date"] if articles else datetime.now()
+    sitemap_content = """<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url>
+    <loc>{}</loc>
+    <lastmod>{}</lastmod>
+    <changefreq>daily</changefreq>
+    <priority>1.0</priority>
+  </url>
+""".format(site_url, latest_date.strftime("%Y-%m-%d"))
+
+    for article in articles:
+        sitemap_content += f"""  <url>
+    <loc>{site_url}/posts/{article["filename"]}</loc>
+    <lastmod>{article["date"].strftime("%Y-%m-%d")}</lastmod>
+    <changefreq>monthly</changefreq>
+    <priority>0.8</priority>
+  </url>
+"""
+    sitemap_content += "</urlset>"
+    return sitemap_content
+
+
+def _slugify(value: str) -> str:
+    """Slug для имени файла шарда (раздел 'Coal & Freight' → 'coal-freight')."""
+    slug = re.sub(r'[^\w\s-]', '', value.lower())
+    return re.sub(r'[-\s]+', '-', slug).strip('-') or "other"
+
+
+def _paginate(prefix: str, title: str, articles: List[Dict], page_size: int) -> List[Dict]:
+    """
+    Делит статьи шарда на страницы. Страницы нумеруются от самых старых статей:
+    новая статья меняет только последнюю страницу, остальные не перерисовываются.
+
+    Args:
+        prefix: Префикс имени файла ('page', 'category-coal')
+        title: Заголовок шарда
+        articles: Метаданные статей (новые сверху)
+        page_size: Количество статей на странице
+
+    Returns:
+        Список страниц: name, title, articles (новые сверху), newer, older (имена соседних страниц)
+    """
+    chronological = articles[::-1]
+    count = max(1, -(-len(chronological) // page_size))
+    pages = []
+    for number in range(1, count + 1):
+        pages.append({
+            "name": f"{prefix}-{number}.html",
+            "title": f"{title} - page {number}" if count > 1 else title,
+            "articles": chronological[(number - 1) * page_size:number * page_size][::-1],
+            "newer": f"{prefix}-{number + 1}.html" if number < count else None,
+            "older": f"{prefix}-{number - 1}.html" if number > 1 else None,
+        })
+    return pages
+
+
+def archive_shards(articles: List[Dict], page_size: int = ARCHIVE_PAGE_SIZE) -> List[Dict]:
+    """
+    Шарды архива: все статьи постранично, по месяцам и по разделам (постранично).
+
+    Args:
+        articles: Метаданные статей (новые сверху)
+        page_size: Количество статей на странице
+
+    Returns:
+        Список шардов в формате _paginate (месяцы - одной страницей, 'month' - YYYY-MM)
+    """
+    shards = _paginate("page", "All Articles", articles, page_size)
+
+    months: Dict[str, List[Dict]] = {}
+    sections: Dict[str, List[Dict]] = {}
+    for article in articles:
+        months.setdefault(local_naive(article["date"]).strftime("%Y-%m"), []).append(article)
+        sections.setdefault(article.get("section") or "Coal", []).append(article)
+
+    for month, month_articles in months.items():
+        shards.append({
+            "name": f"{month}.html",
+            "title": datetime.strptime(month, "%Y-%m").strftime("%B %Y"),
+            "articles": month_articles,
+            "newer": None,
+            "older": None,
+            "month": month,
+        })
+    for section, section_articles in sections.items():
+        shards.extend(_paginate(f"category-{_slugify(section)}", section, section_articles, page_size))
+    return shards
+
+
+def render_archive_page(index_html: str, title: str, section_lines: List[str], rel_path: str,
+                        site_url: str = SITE_URL) -> Optional[str]:
+    """
+    Страница архива в оформлении главной: секция articles-list, title и canonical заменяются.
+
+    Args:
+        index_html: index.html (шаблон страницы)
+        title: Заголовок страницы
+        section_lines: Строки секции articles-list
+        rel_path: Путь страницы относительно корня сайта
+        site_url: URL сайта для canonical
+
+    Returns:
+        HTML страницы или None, если в index.html нет секции articles-list
+    """
+    page_html = replace_articles_section(index_html, section_lines)
+    if page_html is None:
+        return None
+    page_url = f"{site_url}/{rel_path}"
+    page_html = re.sub(r'<title>.*?</title>', lambda m: f'<title>{escape(title)} | Bench Energy News</title>',
+                       page_html, count=1, flags=re.DOTALL)
+    page_html = re.sub(r'<link rel="canonical" href="[^"]*">', lambda m: f'<link rel="canonical" href="{page_url}">',
+                       page_html, count=1)
+    page_html = re.sub(r'<meta property="og:url" content="[^"]*">',
+                       lambda m: f'<meta property="og:url" content="{page_url}">', page_html, count=1)
+    return page_html
+
+
+def _archive_nav(shard: Dict) -> str:
+    """Строка навигации страницы архива."""
+    links = ['<a href="../index.html">Home</a>', '<a href="index.html">Archive</a>']
+    if shard["newer"]:
+        links.append(f'<a href="{shard["newer"]}">← Newer</a>')
+    if shard["older"]:
+        links.append(f'<a href="{shard["older"]}">Older →</a>')
+    return f'        <p class="archive-nav">{" | ".join(links)}</p>'
+
+
+def _archive_index_lines(shards: List[Dict]) -> List[str]:
+    """Строки оглавления архива: страницы, месяцы и разделы."""
+    pages = [shard for shard in shards if shard["name"].startswith("page-")]
+    months = sorted((shard for shard in shards if "month" in shard), key=lambda shard: shard["month"], reverse=True)
+    # Раздел ведет на свою последнюю (самую свежую) страницу
+    sections = sorted((shard for shard in shards if shard["name"].startswith("category-") and not shard["newer"]),
+                      key=lambda shard: shard["title"])
+
+    lines = ['        <h2>Archive</h2>', '        <p class="archive-nav"><a href="../index.html">Home</a></p>',
+             '        <h3>All Articles</h3>', '        <ul>']
+    for shard in reversed(pages):
+        lines.append(f'            <li><a href="{shard["name"]}">{escape(shard["title"])}</a> '
+                     f'({len(shard["articles"])})</li>')
+    lines.extend(['        </ul>', '        <h3>By Month</h3>', '        <ul>'])
+    for shard in months:
+        lines.append(f'            <li><a href="{shard["name"]}">{escape(shard["title"])}</a> '
+                     f'({len(shard["articles"])})</li>')
+    lines.extend(['        </ul>', '        <h3>By Category</h3>', '        <ul>'])
+    for shard in sections:
+        section_title = shard["title"].rsplit(" - page ", 1)[0]
+        lines.append(f'            <li><a href="{shard["name"]}">{escape(section_title)}</a></li>')
+    lines.append('        </ul>')
+    return lines
+
+
+def build_archive(repo_path: Path, articles: List[Dict], index_html: str, site_url: str = SITE_URL) -> Dict[str, bool]:
+    """
+    Собирает страницы архива. Перерисовываются только шарды, у которых изменился
+    ключ (набор статей и их хэши, соседние страницы, шаблон главной); файлы
+    шардов, которых больше нет, удаляются.
+
+    Args:
+        repo_path: Корень репозитория сайта
+        articles: Метаданные статей из индекса (новые сверху)
+        index_html: index.html (шаблон страниц)
+        site_url: URL сайта для canonical
+
+    Returns:
+        Словарь {относительный путь страницы: изменился ли файл}
+    """
+    # Шаблон без списка статей: обновление главной не инвалидирует шарды
+    template = replace_articles_section(index_html, [])
+    if template is None:
+        return {}
+    template_hash = content_hash(template)
+
+    manifest_path = repo_path / ARCHIVE_MANIFEST_PATH
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        manifest = {}
+
+    shards = archive_shards(articles)
+    new_manifest = {}
+    results = {}
+    for shard in shards:
+        rel_path = str(ARCHIVE_DIR / shard["name"])
+        key = content_hash(json.dumps([template_hash, site_url, shard["title"], shard["newer"], shard["older"],
+                                       [[article["filename"], article.get("hash")] for article in shard["articles"]]]))
+        new_manifest[rel_path] = key
+        if manifest.get(rel_path) == key and (repo_path / rel_path).exists():
+            continue
+        section_lines = render_index_cards(shard["articles"], shard["title"], base="../") + [_archive_nav(shard)]
+        results[rel_path] = write_if_changed(repo_path / rel_path,
+                                             render_archive_page(template, shard["title"], section_lines,
+                                                                 rel_path, site_url))
+
+    rendered = len(results)
+    index_rel_path = str(ARCHIVE_DIR / "index.html")
+    results[index_rel_path] = write_if_changed(repo_path / index_rel_path,
+                                               render_archive_page(template, "Archive", _archive_index_lines(shards),
+                                                                   index_rel_path, site_url))
+
+    # Шарды, которых больше нет (раздел переименован, статья удалена)
+    for old_file in (repo_path / ARCHIVE_DIR).glob('*.html'):
+        rel_path = str(ARCHIVE_DIR / old_file.name)
+        if rel_path not in new_manifest and rel_path != index_rel_path:
+            old_file.unlink()
+            results[rel_path] = True
+
+    write_if_changed(manifest_path, json.dumps(new_manifest, indent=1, sort_keys=True))
+    print(f"📚 Архив: {len(shards)} страниц, перерисовано {rendered}")
+    return results
+
+
+def build_site(repo_path: Path, known: Optional[Dict[str, Dict]] = None, site_url: str = SITE_URL,
+               targets: Iterable[str] = ALL_TARGETS) -> Dict[str, bool]:
+    """
+    Собирает index.html, архив, фиды и sitemap.xml за один проход по статьям posts/.
+    Если нужны только фиды, из индекса выбираются последние FEED_LIMIT статей
+    по дате публикации без сортировки всего архива.
+
+    Args:
+        repo_path: Корень репозитория сайта
+        known: Метаданные, уже известные вызывающему коду {имя файла: метаданные}
+        site_url: URL сайта для sitemap.xml
+        targets: Какие артефакты собирать ('index', 'archive', 'feed', 'sitemap')
+
+    Returns:
+        Словарь {относительный путь артефакта: изменился ли файл}
+    """
+    targets = set(targets)
+    if targets <= {"feed"}:
+        articles = latest_posts(repo_path, FEED_LIMIT, known)
+    else:
+        articles = list_posts(repo_path, known)
+    results = {}
+
+    # index.html - и страница, и шаблон страниц архива
+    index_path = repo_path / INDEX_PATH
+    index_html = None
+    if targets & {"index", "archive"}:
+        if index_path.exists():
+            index_html = index_path.read_text(encoding='utf-8')
+        else:
+            print(f"⚠️  {index_path} не найден, index.html и архив не обновлены")
+
+    if "index" in targets and index_html is not None:
+        new_index_html = render_index(index_html, articles)
+        if new_index_html is not None:
+            results[str(INDEX_PATH)] = write_if_changed(index_path, new_index_html)
+
+    if "archive" in targets and index_html is not None:
+        results.update(build_archive(repo_path, articles, index_html, site_url))
+
+    if "feed" in targets:
+        results[str(FEED_PATH)] = write_if_changed(repo_path / FEED_PATH, render_rss(articles))
+        results[str(ATOM_PATH)] = write_if_changed(repo_path / ATOM_PATH, render_atom(articles))
+        results[str(JSON_FEED_PATH)] = write_if_changed(repo_path / JSON_FEED_PATH, render_json_feed(articles))
+
+    if "sitemap" in targets:
+        results[str(SITEMAP_PATH)] = write_if_changed(repo_path / SITEMAP_PATH, render_sitemap(articles, site_url))
+
+    changed = [path for path, was_changed in results.items() if was_changed]
+    print(f"🏗️  Сайт собран: {len(articles)} статей, изменено: {', '.join(changed) or 'ничего'}")
+    return results
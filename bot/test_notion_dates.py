@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Проверки разбора дат Notion и фильтра запроса notion_sync.
+Запуск: python -m pytest bot/test_notion_dates.py
+"""
+import sys
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+# Add bot directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from notion_sync import parse_notion_date, get_page_date, build_date_filter, fetch_notion_pages
+import notion_sync
+
+
+def _page(published_start=None, created_time="2026-10-18T09:00:00.000Z"):
+    """Страница Notion с Published Date (или без неё) и created_time."""
+    published = {"start": published_start} if published_start else None
+    return {"created_time": created_time, "properties": {"Published Date": {"date": published}}}
+
+
+def _compound_depth(node) -> int:
+    """Глубина вложенности составных условий (and/or) фильтра Notion."""
+    for key in ("and", "or"):
+        if key in node:
+            return 1 + max((_compound_depth(child) for child in node[key]), default=0)
+    return 0
+
+
+def test_parse_notion_date_formats():
+    assert parse_notion_date("2026-10-18") == datetime(2026, 10, 18)
+    assert parse_notion_date("2026-10-18T10:30:00.000Z") == datetime(2026, 10, 18, 10, 30, tzinfo=timezone.utc)
+    offset = parse_notion_date("2026-10-18T10:30:00+03:00")
+    assert offset.utcoffset() == timedelta(hours=3)
+
+
+def test_parse_notion_date_invalid():
+    assert parse_notion_date(None) is None
+    assert parse_notion_date("") is None
+    assert parse_notion_date("not a date") is None
+
+
+def test_parse_notion_date_local():
+    value = "2026-10-18T23:30:00.000Z"
+    expected = datetime(2026, 10, 18, 23, 30, tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    parsed = parse_notion_date(value, local=True)
+    assert parsed == expected
+    assert parsed.tzinfo is None
+    # Дата без времени не сдвигается
+    assert parse_notion_date("2026-10-18", local=True) == datetime(2026, 10, 18)
+
+
+def test_get_page_date_prefers_published_date():
+    page = _page("2026-10-15")
+    assert get_page_date(page) == datetime(2026, 10, 15)
+    assert get_page_date(page, local=True) == datetime(2026, 10, 15)
+
+
+def test_get_page_date_falls_back_to_created_time():
+    page = _page(None, "2026-10-18T09:00:00.000Z")
+    assert get_page_date(page) == datetime(2026, 10, 18, 9, tzinfo=timezone.utc)
+    local = get_page_date(page, local=True)
+    assert local.tzinfo is None
+    assert local == datetime(2026, 10, 18, 9, tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    assert get_page_date({"properties": {}}) is None
+
+
+def test_build_date_filter_without_window():
+    assert build_date_filter() is None
+    assert build_date_filter(None, None, [{"property": "Published", "checkbox": {"equals": True}}]) is None
+
+
+def test_build_date_filter_widens_window_by_a_day():
+    date_filter = build_date_filter(date(2026, 10, 10), date(2026, 10, 18))
+    published, created = date_filter["or"]
+    assert published["and"] == [
+        {"property": "Published Date", "date": {"on_or_after": "2026-10-09"}},
+        {"property": "Published Date", "date": {"on_or_before": "2026-10-19"}},
+    ]
+    assert created["and"] == [
+        {"property": "Published Date", "date": {"is_empty": True}},
+        {"timestamp": "created_time", "created_time": {"on_or_after": "2026-10-09"}},
+        {"timestamp": "created_time", "created_time": {"on_or_before": "2026-10-19"}},
+    ]
+
+
+def test_build_date_filter_repeats_base_conditions_in_each_group():
+    base = [
+        {"property": "Published", "checkbox": {"equals": True}},
+        {"timestamp": "last_edited_time", "last_edited_time": {"on_or_after": "2026-10-01T00:00:00.000Z"}},
+    ]
+    date_filter = build_date_filter(date(2026, 10, 10), None, base)
+    assert set(date_filter) == {"or"}
+    for group in date_filter["or"]:
+        assert group["and"][:2] == base
+    assert _compound_depth(date_filter) == 2
+
+
+def test_fetch_notion_pages_filter_nesting(monkeypatch):
+    payloads = []
+
+    def fake_request(method, path, json=None):
+        payloads.append(json)
+        return {"results": [], "has_more": False}
+
+    monkeypatch.setattr(notion_sync, "NOTION_API_KEY", "key")
+    monkeypatch.setattr(notion_sync, "NOTION_DATABASE_ID", "db")
+    monkeypatch.setattr(notion_sync, "notion_request", fake_request)
+
+    fetch_notion_pages(today_only=False, date_from=date(2026, 9, 18), date_to=date(2026, 10, 19),
+                       edited_after="2026-10-01T00:00:00.000Z")
+    fetch_notion_pages(today_only=True)
+    fetch_notion_pages(today_only=False, edited_after="2026-10-01T00:00:00.000Z", published_only=False)
+
+    windowed, today, incremental = (payload["filter"] for payload in payloads)
+    assert _compound_depth(windowed) == 2 and set(windowed) == {"or"}
+    assert all({"property": "Published", "checkbox": {"equals": True}} in group["and"]
+               for group in windowed["or"])
+    assert _compound_depth(today) == 2
+    assert incremental == {"and": [
+        {"timestamp": "last_edited_time", "last_edited_time": {"on_or_after": "2026-10-01T00:00:00.000Z"}}
+    ]}
+    assert payloads[2]["sorts"] == [{"timestamp": "last_edited_time", "direction": "ascending"}]
@@ -6,10 +6,51 @@ import requests
 from typing import Tuple
 from urllib.parse import urlparse
 
+from domain_health import (is_domain_blocked, is_redirector, record_domain_success, record_domain_failure,
+                           classify_http_status, get_resolved_redirect, save_resolved_redirect)
+
+# Статусы, которыми сервер отвечает на неподдерживаемый HEAD: это не ошибка домена, проверяем через GET
+HEAD_UNSUPPORTED_STATUSES = {405, 501}
+
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+}
+
+
+def resolve_redirect_url(url: str, timeout: int = 5) -> str:
+    """
+    Разворачивает URL домена-редиректора (vertexaisearch от Gemini) в URL источника.
+    Развернутые ссылки кэшируются в domain_health (повторная ссылка - без запроса).
+    
+    Args:
+        url: URL новости
+        timeout: Таймаут запроса в секундах
+        
+    Returns:
+        Финальный URL после редиректов (исходный URL, если это не редиректор или развернуть не удалось)
+    """
+    if not url or not is_redirector(url):
+        return url
+    cached = get_resolved_redirect(url)
+    if cached:
+        return cached
+    try:
+        response = requests.head(url, headers=REQUEST_HEADERS, timeout=timeout, allow_redirects=True)
+        if response.status_code in HEAD_UNSUPPORTED_STATUSES:
+            response = requests.get(url, headers=REQUEST_HEADERS, timeout=timeout, allow_redirects=True, stream=True)
+            response.close()
+        resolved = response.url or url
+        save_resolved_redirect(url, resolved)
+        return resolved
+    except requests.exceptions.RequestException as e:
+        print(f"   ⚠️  Не удалось развернуть редирект: {str(e)[:100]}")
+        return url
+
 
 def validate_news_url(url: str, timeout: int = 10) -> Tuple[bool, str]:
     """
     Проверяет, что URL новости валиден и доступен.
+    Домены из негативного кэша (403, пэйволл, таймауты) отклоняются без запроса.
     
     Args:
         url: URL для проверки
@@ -26,14 +67,27 @@ def validate_news_url(url: str, timeout: int = 10) -> Tuple[bool, str]:
     if not parsed.scheme or not parsed.netloc:
         return False, "Неверный формат URL"
     
+    # Проверяем негативный кэш доменов
+    blocked, reason = is_domain_blocked(url)
+    if blocked:
+        return False, reason
+    
     # Проверяем доступность
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        }
-        response = requests.head(url, headers=headers, timeout=timeout, allow_redirects=True)
+        response = requests.head(url, headers=REQUEST_HEADERS, timeout=timeout, allow_redirects=True)
+        # Сервер не поддерживает HEAD - повторяем проверку через GET (тело не загружаем)
+        if response.status_code in HEAD_UNSUPPORTED_STATUSES:
+            response = requests.get(url, headers=REQUEST_HEADERS, timeout=timeout, allow_redirects=True, stream=True)
+            response.close()
         
         # Проверяем статус код
+        final_url = response.url or url
+        error_class = classify_http_status(response.status_code)
+        if error_class:
+            record_domain_failure(final_url, error_class, f"HTTP {response.status_code}")
+        else:
+            record_domain_success(final_url)
+        
         if response.status_code == 403:
             return False, "Доступ запрещен (403)"
         elif response.status_code == 404:
@@ -47,11 +101,12 @@ def validate_news_url(url: str, timeout: int = 10) -> Tuple[bool, str]:
             return True, "OK"
             
     except requests.exceptions.Timeout:
+        record_domain_failure(url, "timeout", "Таймаут запроса")
         return False, "Таймаут запроса"
-    except requests.exceptions.ConnectionError:
+    except requests.exceptions.ConnectionError as e:
+        record_domain_failure(url, "connection", str(e))
         return False, "Ошибка подключения"
     except requests.exceptions.RequestException as e:
         return False, f"Ошибка запроса: {str(e)[:100]}"
     except Exception as e:
         return False, f"Неожиданная ошибка: {str(e)[:100]}"
-
@@ -13,6 +13,9 @@ from datetime import datetime
 from urllib.parse import quote
 from dotenv import load_dotenv
 
+from site_build import build_site, FEED_PATHS, ARCHIVE_DIR
+from posts_index import parse_article_html
+
 load_dotenv()
 
 # Настройка логирования
@@ -87,6 +90,7 @@ GOOGLE_INDEXING_KEY_PATH = os.getenv("GOOGLE_INDEXING_KEY_PATH", "google-indexin
 def create_slug(title: str) -> str:
     """
     Создает URL-friendly slug из заголовка.
+    Фронтенд (getSlugFromArticle в app/) повторяет этот алгоритм - менять вместе.
     
     Args:
         title: Заголовок новости
@@ -451,64 +455,6 @@ def create_html_article(news_data: Dict, web_version: str, image_url: Optional[s
     return html_template, article_url, slug
 
 
-def update_sitemap(article_url: str, slug: str, repo_path: str):
-    """
-    Обновляет sitemap.xml, добавляя новую статью.
-    Безопасно работает с существующим sitemap.xml, не перезаписывает его полностью.
-    
-    Args:
-        article_url: URL статьи
-        slug: Slug статьи
-        repo_path: Путь к репозиторию
-    """
-    sitemap_path = Path(repo_path) / "sitemap.xml"
-    posts_dir = Path(repo_path) / "posts"
-    posts_dir.mkdir(exist_ok=True)
-    
-    # Читаем существующий sitemap или создаем новый
-    if sitemap_path.exists():
-        print(f"   ℹ️  Обнаружен существующий sitemap.xml, обновляю...")
-        try:
-            with open(sitemap_path, 'r', encoding='utf-8') as f:
-                sitemap_content = f.read()
-        except:
-            sitemap_content = """<?xml version="1.0" encoding="UTF-8"?>
-<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
-</urlset>"""
-    else:
-        sitemap_content = """<?xml version="1.0" encoding="UTF-8"?>
-<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
-</urlset>"""
-    
-    # Проверяем, есть ли уже эта статья в sitemap
-    if article_url not in sitemap_content:
-        # Добавляем новую запись
-        lastmod = datetime.now().strftime("%Y-%m-%d")
-        new_entry = f"""  <url>
-    <loc>{article_url}</loc>
-    <lastmod>{lastmod}</lastmod>
-    <changefreq>monthly</changefreq>
-    <priority>0.8</priority>
-  </url>"""
-        
-        # Вставляем перед закрывающим тегом, сохраняя существующую структуру
-        if "</urlset>" in sitemap_content:
-            sitemap_content = sitemap_content.replace("</urlset>", new_entry + "\n</urlset>")
-        else:
-            # Если структура нестандартная, добавляем в конец перед закрывающим тегом
-            sitemap_content = sitemap_content.rstrip() + "\n" + new_entry + "\n</urlset>"
-        
-        # Сохраняем
-        try:
-            with open(sitemap_path, 'w', encoding='utf-8') as f:
-                f.write(sitemap_content)
-            log_info(f"Sitemap обновлен: {article_url}")
-        except Exception as e:
-            log_error(f"Ошибка обновления sitemap: {e}", exc_info=True)
-    else:
-        log_info(f"Статья уже есть в sitemap, пропускаю")
-
-
 def git_add_commit_push(repo_path: str, files: list, commit_message: str):
     """
     Добавляет файлы в Git, коммитит и пушит.
@@ -963,68 +909,16 @@ def publish_to_web(news_data: Dict, web_version: str, image_path: Optional[Path]
             log_error(error_msg, exc_info=True)
             return None
         
-        # Обновляем sitemap.xml
-        log_info(f"🗺️  ШАГ 6: Обновление sitemap.xml...")
+        # Обновляем индекс статей, sitemap.xml, index.html, архив и фиды в процессе (метаданные новой статьи уже известны)
+        log_info(f"🏗️  ШАГ 6-7: Сборка sitemap.xml, index.html, архива и фидов...")
+        results = {}
         try:
-            update_sitemap(article_url, slug, str(repo_path))
-            log_success("ШАГ 6: sitemap.xml обновлен")
+            known = {html_file.name: parse_article_html(html_content, html_file.name)}
+            results = build_site(repo_path, known, SITE_URL)
+            changed = [path for path, was_changed in results.items() if was_changed]
+            log_success(f"ШАГ 6-7: Сайт собран, изменено: {', '.join(changed) or 'ничего'}")
         except Exception as e:
-            log_error(f"ШАГ 6: Ошибка обновления sitemap.xml: {e}", exc_info=True)
-        
-        # Обновляем index.html автоматически
-        log_info(f"📋 ШАГ 7: Обновление index.html...")
-        try:
-            update_index_script = repo_path / "update_index.py"
-            if update_index_script.exists():
-                # Запускаем скрипт из корня репозитория
-                result = subprocess.run(
-                    ["python3", str(update_index_script)],
-                    cwd=str(repo_path),
-                    capture_output=True,
-                    text=True,
-                    timeout=30
-                )
-                if result.returncode == 0:
-                    log_success("ШАГ 7: index.html обновлен автоматически")
-                    if result.stdout:
-                        # Выводим только важные сообщения из скрипта
-                        for line in result.stdout.split('\n'):
-                            if 'Found' in line or 'Successfully' in line or '✓' in line:
-                                log_info(f"   {line}")
-                else:
-                    log_warning(f"ШАГ 7: Ошибка обновления index.html: {result.stderr}")
-            else:
-                log_warning("ШАГ 7: Скрипт update_index.py не найден, пропускаю обновление index.html")
-        except Exception as e:
-            log_warning(f"ШАГ 7: Ошибка при обновлении index.html: {e}")
-            # Не прерываем процесс, продолжаем публикацию
-        
-        # Обновляем RSS feed
-        log_info(f"📡 ШАГ 7.5: Генерация RSS feed...")
-        try:
-            generate_rss_script = repo_path / "generate_rss.py"
-            if generate_rss_script.exists():
-                # Запускаем скрипт из корня репозитория
-                result = subprocess.run(
-                    ["python3", str(generate_rss_script)],
-                    cwd=str(repo_path),
-                    capture_output=True,
-                    text=True,
-                    timeout=30
-                )
-                if result.returncode == 0:
-                    log_success("ШАГ 7.5: RSS feed обновлен")
-                    if result.stdout:
-                        # Выводим только важные сообщения из скрипта
-                        for line in result.stdout.split('\n'):
-                            if 'Found' in line or 'Successfully' in line or '✓' in line or 'RSS Feed URL' in line:
-                                log_info(f"   {line}")
-                else:
-                    log_warning(f"ШАГ 7.5: Ошибка генерации RSS feed: {result.stderr}")
-            else:
-                log_warning("ШАГ 7.5: Скрипт generate_rss.py не найден, пропускаю генерацию RSS feed")
-        except Exception as e:
-            log_warning(f"ШАГ 7.5: Ошибка при генерации RSS feed: {e}")
+            log_error(f"ШАГ 6-7: Ошибка сборки sitemap.xml/index.html/архива/фидов: {e}", exc_info=True)
             # Не прерываем процесс, продолжаем публикацию
         
         # Git операции
@@ -1061,11 +955,17 @@ def publish_to_web(news_data: Dict, web_version: str, image_path: Optional[Path]
             files_to_add.append("index.html")
             log_info(f"   📋 Добавляю в git: index.html")
         
-        # feed.xml: если был обновлен скриптом generate_rss.py (в public/)
-        feed_file = repo_path / "public" / "feed.xml"
-        if feed_file.exists():
-            files_to_add.append("public/feed.xml")
-            log_info(f"   📡 Добавляю в git: public/feed.xml")
+        # Перерисованные и удаленные страницы архива
+        for rel_path, was_changed in results.items():
+            if was_changed and rel_path.startswith(f"{ARCHIVE_DIR}/"):
+                files_to_add.append(rel_path)
+                log_info(f"   📚 Добавляю в git: {rel_path}")
+        
+        # Фиды (RSS, Atom, JSON Feed) в public/
+        for feed_path in FEED_PATHS:
+            if (repo_path / feed_path).exists():
+                files_to_add.append(str(feed_path))
+                log_info(f"   📡 Добавляю в git: {feed_path}")
         
         log_info(f"ШАГ 8: Всего файлов для коммита: {len(files_to_add)}")
         success = git_add_commit_push(str(repo_path), files_to_add, commit_message)